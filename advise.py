@@ -0,0 +1,30 @@
+# advise.py
+"""
+Query plan advisor; see utils.query_advisor.
+
+    python advise.py            # skip the whole-collection reads
+    python advise.py --full     # explain every catalog entry
+"""
+
+import asyncio
+import logging
+import sys
+
+from utils.query_advisor import explain_queries
+from utils.query_plans import render_advice
+
+
+async def _main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    unknown = [a for a in argv if a != "--full"]
+    if unknown:
+        print(f"Unknown argument(s): {', '.join(unknown)}. Usage: python advise.py [--full]")
+        return 2
+    rows = await explain_queries(include_full="--full" in argv)
+    print(render_advice(rows))
+    # non-zero when a query needs attention, so cron/CI can alert on it
+    return 1 if any(r["flags"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
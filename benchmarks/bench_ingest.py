@@ -0,0 +1,129 @@
+# benchmarks/bench_ingest.py
+"""
+Round trips and latency of logging one game: the old per-document /track writes
+vs utils.match_writes.insert_match.
+
+Needs a reachable MongoDB (a replica set to exercise the transaction path):
+
+    BENCH_MONGO_URI=mongodb://localhost:27017/?replicaSet=rs0 python -m benchmarks.bench_ingest
+
+Writes into a throwaway `camatchlogger_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+os.environ.setdefault("DISCORD_BOT_TOKEN", "bench")
+os.environ.setdefault("GUILD_ID", "0")
+os.environ["MONGO_URI_MATCH_LOGGER"] = os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017")
+os.environ["MONGO_DB_NAME"] = "camatchlogger_bench"
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+DECKS = [f"Bench Deck {i}" for i in range(60)]
+PLAYERS = list(range(1000, 1040))
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one command == one network round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name not in ("hello", "isMaster", "ping", "endSessions"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+monitoring.register(counter)  # must happen before db.py creates the client
+
+import db  # noqa: E402
+from utils.match_writes import insert_match  # noqa: E402
+
+
+async def legacy_insert(md: dict):
+    """The pre-batching Matches.insert_match_result, kept verbatim for comparison."""
+    await db.matches.insert_one(md)
+    for p in md["players"]:
+        await db.individual_results.insert_one({
+            "player_id": p["player_id"], "deck_name": p["deck_name"], "seat": p["position"],
+            "result": p["result"], "match_id": md["match_id"], "date": md["date"],
+        })
+    for p in md["players"]:
+        exists = await db.decks.find_one({"name": p["deck_name"], "players.player_id": p["player_id"]})
+        if not exists:
+            await db.decks.update_one(
+                {"name": p["deck_name"]},
+                {"$addToSet": {"players": {"player_id": p["player_id"], "wins": 0, "losses": 0, "draws": 0}}},
+            )
+        field = {"win": "players.$.wins", "loss": "players.$.losses", "draw": "players.$.draws"}.get(p["result"])
+        if field:
+            await db.decks.update_one({"name": p["deck_name"], "players.player_id": p["player_id"]}, {"$inc": {field: 1}})
+
+
+def make_match(match_id: int) -> dict:
+    seats = random.sample(PLAYERS, 4)
+    winner = random.randint(0, 4)  # 4 == draw
+    return {
+        "match_id": match_id,
+        "players": [
+            {"player_id": pid, "deck_name": random.choice(DECKS), "position": i + 1,
+             "result": "draw" if winner == 4 else ("win" if winner == i else "loss")}
+            for i, pid in enumerate(seats)
+        ],
+        "date": datetime.now(timezone.utc),
+    }
+
+
+async def run(label: str, write, first_id: int) -> dict:
+    latencies, trips = [], []
+    for i in range(ITERATIONS):
+        md = make_match(first_id + i)
+        before = counter.count
+        t0 = time.perf_counter()
+        await write(md)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        trips.append(counter.count - before)
+    latencies.sort()
+    return {
+        "label": label,
+        "round_trips": statistics.mean(trips),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def main():
+    await db.ping()
+    await db._client.drop_database("camatchlogger_bench")
+    await db.ensure_indexes()
+    await db.decks.insert_many([{"name": n} for n in DECKS])
+    try:
+        rows = [
+            await run("legacy (per-document)", legacy_insert, 1),
+            await run("insert_match (batched)", insert_match, 1_000_000),
+        ]
+    finally:
+        await db._client.drop_database("camatchlogger_bench")
+
+    print(f"{ITERATIONS} games per variant, transactions={'on' if db._txn_supported else 'off (standalone)'}")
+    print(f"{'variant':<26}{'round trips':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in rows:
+        print(f"{r['label']:<26}{r['round_trips']:>12.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
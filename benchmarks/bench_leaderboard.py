@@ -0,0 +1,158 @@
+# benchmarks/bench_leaderboard.py
+"""
+/leaderboard players 1m: the old two-aggregation + embed string-patching path over
+individual_results vs. the single $facet over daily_rollups with the structured
+renderer (utils.leaderboard).
+
+Seeds 100k individual_results rows (25k four-player games over ~14 months):
+
+    BENCH_MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_leaderboard
+
+Writes into a throwaway `camatchlogger_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DISCORD_BOT_TOKEN", "bench")
+os.environ.setdefault("GUILD_ID", "0")
+os.environ["MONGO_URI_MATCH_LOGGER"] = os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017")
+os.environ["MONGO_DB_NAME"] = "camatchlogger_bench"
+
+import discord  # noqa: E402
+
+import db  # noqa: E402
+from utils.leaderboard import leaderboard_pipeline, join_windows, render_leaderboard  # noqa: E402
+from utils.match_docs import build_match_doc, individual_result_docs  # noqa: E402
+from utils.rollups import rebuild_rollups  # noqa: E402
+from utils.time_ranges import previous_month_window  # noqa: E402
+
+RESULTS = int(os.getenv("BENCH_RESULTS", "100000"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "30"))
+PLAYERS = list(range(1000, 1300))
+DECKS = [f"Bench Deck {i}" for i in range(150)]
+DAYS = 420
+
+
+async def seed():
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    batch = []
+    for mid in range(1, RESULTS // 4 + 1):
+        winner = rng.randint(0, 4)
+        md = build_match_doc(
+            mid,
+            [(pid, rng.choice(DECKS)) for pid in rng.sample(PLAYERS, 4)],
+            None if winner == 4 else winner,
+            now - timedelta(minutes=rng.randint(0, DAYS * 24 * 60)),
+        )
+        batch.append(md)
+        if len(batch) == 2000:
+            await _flush(batch)
+            batch = []
+    if batch:
+        await _flush(batch)
+    await rebuild_rollups()
+
+
+async def _flush(mds):
+    await db.matches.insert_many(mds)
+    await db.individual_results.insert_many([d for md in mds for d in individual_result_docs(md)])
+
+
+def _legacy_group(match):
+    return [
+        {"$match": match},
+        {"$group": {"_id": "$player_id",
+                    "games_played": {"$sum": 1},
+                    "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
+                    "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
+                    "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}}}},
+        {"$addFields": {
+            "normal_win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+            "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
+        }},
+    ]
+
+
+async def legacy(start, prev_start, prev_end):
+    """The pre-rollup show_players body minus member lookups, kept for comparison."""
+    pipeline = _legacy_group({"date": {"$gte": start}}) + [
+        {"$match": {"games_played": {"$gte": 15}}},
+        {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
+    ]
+    embeds, embed, pos, fields, current = [], discord.Embed(title="Player Leaderboard"), 1, 0, {}
+    async for d in db.individual_results.aggregate(pipeline):
+        embed.add_field(
+            name=f"{pos}. **{d['_id']}**: {d['wins']}W | {d['losses']}L | {d['draws']}D",
+            value=f"• Win: **{int(d['normal_win_percentage'])}**% | *🏋Win%: **{int(d['weighted_win_percentage'])}**%* | (Games: {d['games_played']}) | ID: {d['_id']}",
+            inline=False,
+        )
+        current[d['_id']] = d['weighted_win_percentage']
+        pos += 1; fields += 1
+        if fields >= 25:
+            embeds.append(embed)
+            embed, fields = discord.Embed(), 0
+    if fields:
+        embeds.append(embed)
+    async for d in db.individual_results.aggregate(_legacy_group({"date": {"$gte": prev_start, "$lt": prev_end}})):
+        cur = current.get(d['_id'])
+        if cur is None:
+            continue
+        delta = cur - d['weighted_win_percentage']
+        mark = '🔄 0%' if -1 < delta < 1 else (f"{'⬆️' if delta>0 else '🔻'} {abs(int(delta))}%")
+        for em in embeds:
+            for i, field in enumerate(em.fields):
+                if f"ID: {d['_id']}" in field.value:
+                    em.set_field_at(i, name=field.name,
+                                    value=field.value.replace(f"**{int(cur)}**%*", f"**{int(cur)}**%* ({mark})"),
+                                    inline=field.inline)
+    for em in embeds:
+        for i, field in enumerate(em.fields):
+            em.set_field_at(i, name=field.name, value=field.value.split(" | ID:")[0], inline=field.inline)
+    return embeds
+
+
+async def facet(start, prev_start, prev_end):
+    pipeline = leaderboard_pipeline("player", start, (prev_start, prev_end))
+    doc = (await db.daily_rollups.aggregate(pipeline).to_list(length=1))[0]
+    rows = join_windows(doc["current"], doc.get("previous"))
+    return render_leaderboard("Player Leaderboard", rows, lambda d: str(d["_id"]), kind="player", color=0)
+
+
+async def timed(fn, *args) -> list:
+    out = []
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await fn(*args)
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+async def main():
+    await db.ping()
+    await db._client.drop_database("camatchlogger_bench")
+    await db.ensure_indexes()
+    try:
+        t0 = time.perf_counter()
+        await seed()
+        print(f"seeded {RESULTS} results in {time.perf_counter() - t0:.1f}s")
+        prev_start, prev_end = previous_month_window("1m")
+        rows = [
+            ("legacy (2 aggs + patching)", await timed(legacy, prev_end, prev_start, prev_end)),
+            ("$facet over rollups", await timed(facet, prev_end, prev_start, prev_end)),
+        ]
+    finally:
+        await db._client.drop_database("camatchlogger_bench")
+
+    print(f"{'variant':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, lat in rows:
+        print(f"{label:<28}{lat[len(lat) // 2]:>10.2f}{lat[int(len(lat) * 0.95) - 1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,23 +1,36 @@
 # cogs/admin.py
+from datetime import datetime, time, timezone
 from typing import Annotated, List, Dict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.commands import slash_command, Option
-from rapidfuzz import fuzz, process
 
-from config import GUILD_ID, IS_DEV
+from config import GUILD_ID, IS_DEV, PRIVATE_CHANNEL_ID, VERIFY_NIGHTLY
 from db import (
     decks,
     matches,
     individual_results,
+    deck_names,
+    jobs,
+    next_job_id,
     get_max_match_id,
-    delete_match_cascade,
     set_counter_to_max_match_id,
 )
 from utils.ephemeral import should_be_ephemeral
-from utils.text import capitalize_words
+from utils.text import MAX_EMBED_CHARS, MAX_MSG_CHARS, capitalize_words, deck_key, paginate_text
 from utils.perms import is_mod
+from utils.deck_index import deck_autocomplete, deck_index, load_deck_index
+from utils.fuzzy import deck_matcher
+from utils.deck_names import ensure_loaded as load_orphan_decks
+from utils.deck_jobs import conflict_filter, deck_job, job_title
+from utils.match_writes import delete_matches, edit_match, recompute_deck_players
+from utils.batch_import import parse_match_ids
+from utils.rollups import freeze_closed_months, rebuild_rollups
+from utils.integrity import render_report
+from utils.verification import verify_data
+from utils.query_plans import render_advice
+from utils.query_advisor import explain_queries
 
 import logging
 log = logging.getLogger("ca_match_logger")
@@ -25,77 +38,39 @@ log = logging.getLogger("ca_match_logger")
 
 # ---------- helpers ----------
 
-async def deck_autocomplete(ctx: discord.AutocompleteContext) -> List[str]:
-    """All deck names from DB, filtered by substring."""
-    cursor = decks.find({}, {"name": 1, "_id": 0})
-    all_decks = [doc["name"] async for doc in cursor]
-    q = (ctx.value or "").lower()
-    return [d for d in all_decks if q in d.lower()][:25]
-
-
 async def misnamed_deck_autocomplete(ctx: discord.AutocompleteContext) -> List[str]:
-    """Names present in logs but missing from decks collection (case-insensitive)."""
-    valid = await decks.distinct("name")
-    valid_lower = {v.lower() for v in valid if v}
-
-    ir_names = await individual_results.distinct("deck_name")
-    m_names = await matches.distinct("players.deck_name")
-    logged = {n for n in (ir_names + m_names) if isinstance(n, str) and n.strip()}
-
-    missing = [n for n in logged if n.lower() not in valid_lower]
-    q = (ctx.value or "").lower()
-    return [n for n in missing if q in n.lower()][:25]
-
-
-async def case_insensitive_doc(coll, field: str, value: str):
-    return await coll.find_one({field: {"$regex": f"^{value}$", "$options": "i"}})
-
-
-async def recompute_deck_players_for(decks_coll, ir_coll, deck_names: List[str]):
-    for dn in set(deck_names):
-        dn_stripped = (dn or "").strip()
-        if not dn_stripped:
-            continue
-
-        stats: Dict[int, Dict[str, int]] = {}
-        total_ir = 0
-
-        cursor = ir_coll.find({"deck_name": {"$regex": f"^{dn_stripped}$", "$options": "i"}})
-        async for r in cursor:
-            total_ir += 1
-            try:
-                pid = int(r["player_id"])
-            except Exception:
-                pid = int(str(r.get("player_id", "0")))
-            res = (r.get("result") or "").lower()
-            s = stats.setdefault(pid, {"wins": 0, "losses": 0, "draws": 0})
-            if res == "win":
-                s["wins"] += 1
-            elif res == "loss":
-                s["losses"] += 1
-            elif res == "draw":
-                s["draws"] += 1
-            else:
-                log.warning("recompute: deck='%s' unknown result '%s' in IR doc=%s",
-                            dn_stripped, r.get("result"), r.get("_id"))
-
-
-        # # per-player breakdown
-        # for pid, vals in stats.items():
-        #     log.info("recompute: deck='%s' pid=%s W=%s L=%s D=%s",
-        #              dn_stripped, pid, vals["wins"], vals["losses"], vals["draws"])
-
-        players_list = [{"player_id": pid, **vals} for pid, vals in stats.items()]
-        upd = await decks_coll.update_one(
-            {"name": {"$regex": f"^{dn_stripped}$", "$options": "i"}},
-            {"$set": {"players": players_list}},
-        )
+    """Names present in logs but missing from decks collection (case-insensitive); served from memory."""
+    await load_deck_index(decks)
+    registry = await load_orphan_decks(deck_names)
+    return registry.search(ctx.value or "")
+
+
+async def find_deck_doc(name: str):
+    """Deck document for `name`, matched exactly on its canonical deck_key."""
+    return await decks.find_one({"deck_key": deck_key(name)})
+
+
+async def enqueue_deck_job(ctx: discord.ApplicationContext, kind: str, old_name: str, new_name: str,
+                           *, drop_old: bool) -> discord.Embed:
+    """Queue a rename/merge for the Jobs cog and return the embed to answer with."""
+    job = deck_job(await next_job_id(), kind, old_name, new_name, drop_old=drop_old,
+                   channel_id=ctx.channel_id, requested_by=ctx.author.id, now=datetime.now(timezone.utc))
+    if await jobs.find_one(conflict_filter([job["old_key"], job["new_key"]])):
+        return discord.Embed(
+            title="Deck Busy",
+            description="Another job is already moving one of these decks. Check `/jobs` and try again when it's done.",
+            color=0xFF0000)
+    await jobs.insert_one(job)
+    return discord.Embed(
+        title="Job Queued",
+        description=f"{job_title(job)}\nProgress will be posted in this channel; the job resumes after a restart.",
+        color=0xFF0000 if IS_DEV else 0x00FF00)
 
 
 async def get_top_decks_for_player(player_id: int, limit: int = 5) -> List[str]:
     """Return most-used deck names for a player from individual_results."""
     pipeline = [
-        {"$match": {"player_id": {"$in": [player_id, str(player_id)]}}},
+        {"$match": {"player_id": player_id}},
         {"$group": {"_id": "$deck_name", "count": {"$sum": 1}}},
         {"$sort": {"count": -1}},
         {"$limit": limit},
@@ -443,42 +418,61 @@ class EditPlayerPanel(discord.ui.View):
 
     @classmethod
     async def create(cls, parent_view: "EditTrackView", idx: int, current: dict):
-        # figure out player_id (supports int/str)
-        pid_raw = current.get("player_id")
-        try:
-            pid_int = int(pid_raw)
-        except Exception:
-            pid_int = None
-
-        top = await get_top_decks_for_player(pid_int) if pid_int is not None else []
+        pid = current.get("player_id")
+        top = await get_top_decks_for_player(pid) if isinstance(pid, int) else []
         return cls(parent_view, idx, current, top)
     
 
+def _match_lines(m: dict) -> list[str]:
+    lines = []
+    def _mention(pid): return f"<@{pid}>"
+    for i, p in enumerate(m.get("players", [])[:4], start=1):
+        raw_pos = p.get("position")
+        try:
+            seat = int(raw_pos)
+        except (TypeError, ValueError):
+            seat = "?"
+        lines.append(
+            f"**P{i}** • {_mention(p.get('player_id','?'))} • "
+            f"Seat {seat if seat in {1,2,3,4} else '?'} • "
+            f"Deck: *{p.get('deck_name','?')}* • Result: **{p.get('result','?')}**"
+        )
+    return lines
+
+
+def _match_oneliner(m: dict) -> str:
+    """`#id` • date • decks, winner in bold: one line per match for multi-match deletes."""
+    date = m.get("date")
+    day = date.strftime("%Y-%m-%d") if date else "?"
+    decks_txt = ", ".join(
+        f"**{p.get('deck_name','?')}**" if p.get("result") == "win" else p.get("deck_name", "?")
+        for p in m.get("players", [])[:4]
+    )
+    return f"`#{m.get('match_id')}` • {day} • {decks_txt}"
+
+
 class DeleteTrackView(discord.ui.View):
-    def __init__(self, author_id: int, match_doc: dict):
+    def __init__(self, author_id: int, match_docs: list[dict]):
         super().__init__(timeout=90)
         self.author_id = author_id
-        self.m = match_doc
+        self.mds = match_docs
         self._done = False
 
     def _same_person(self, interaction: discord.Interaction) -> bool:
         return interaction.user.id == self.author_id
 
-    def _summary_lines(self) -> list[str]:
-        lines = []
-        def _mention(pid): return f"<@{pid}>"
-        for i, p in enumerate(self.m.get("players", [])[:4], start=1):
-            raw_pos = p.get("position")
-            try:
-                seat = int(raw_pos)
-            except (TypeError, ValueError):
-                seat = "?"
-            lines.append(
-                f"**P{i}** • {_mention(p.get('player_id','?'))} • "
-                f"Seat {seat if seat in {1,2,3,4} else '?'} • "
-                f"Deck: *{p.get('deck_name','?')}* • Result: **{p.get('result','?')}**"
-            )
-        return lines
+    def label(self) -> str:
+        ids = [m.get("match_id") for m in self.mds]
+        return f"match {ids[0]}" if len(ids) == 1 else f"{len(ids)} matches ({ids[0]}–{ids[-1]})"
+
+    def summary_lines(self) -> list[str]:
+        if len(self.mds) == 1:
+            return _match_lines(self.mds[0])
+        lines = [_match_oneliner(m) for m in self.mds]
+        body = paginate_text(lines, header="", limit=MAX_EMBED_CHARS - 100)[0].splitlines()  # first page fits the embed
+        if len(body) < len(lines):
+            body.append(f"… and {len(lines) - len(body)} more")
+        return body
 
     def _disable_all(self):
         for item in self.children:
@@ -495,45 +489,41 @@ class DeleteTrackView(discord.ui.View):
 
         await interaction.response.defer(ephemeral=True)
 
-        # collect affected deck names before deletion
-        affected = []
-        for p in self.m.get("players", []):
-            dn = (p.get("deck_name") or "").strip()
-            if dn:
-                affected.append(dn)
-
-        # which match are we deleting?
-        mid = int(self.m["match_id"])
+        # collect affected deck names before deletion (union over every match)
+        affected = sorted({
+            (p.get("deck_name") or "").strip()
+            for m in self.mds for p in m.get("players", [])
+        } - {""})
+        mids = {int(m["match_id"]) for m in self.mds}
 
         # get current max BEFORE delete
         pre_max = await get_max_match_id()
 
-        # delete match + its individual_results (single helper)
-        deleted = await delete_match_cascade(mid)
+        # delete matches + their individual_results + rollup rows (one transaction)
+        deleted = await delete_matches(self.mds)
         if not deleted:
-            await interaction.edit_original_response(content=f"❌ Track {mid} not found (nothing deleted).")
+            await interaction.edit_original_response(content=f"❌ {self.label().capitalize()} not found (nothing deleted).")
             return
 
-        # recompute players lists for affected decks
+        # recompute players lists for the affected decks, all in one pass
         try:
             if affected:
-                uniq = sorted(set(affected))
-                await recompute_deck_players_for(decks, individual_results, uniq)
+                await recompute_deck_players(affected)
         except Exception as e:
-            log.warning("recompute_deck_players_for failed after deletion: %s", e)
+            log.warning("recompute_deck_players failed after deletion: %s", e)
 
-        # Only adjust counter if this was the current max match_id
-        if mid == pre_max:
+        # Only adjust counter if the current max match_id went
+        if pre_max in mids:
             await set_counter_to_max_match_id()
 
         # feedback
         emb = discord.Embed(
-            title=f"🗑️ Match {mid} deleted",
-            description="\n".join(self._summary_lines()) or "_No players?_",
+            title=f"🗑️ {self.label().capitalize()} deleted" + (f" ({deleted} found)" if deleted != len(self.mds) else ""),
+            description="\n".join(self.summary_lines()) or "_No players?_",
             color=0xFF0000 if IS_DEV else 0x00FF00,
         )
         if affected:
-            emb.add_field(name="Deck stats updated", value=", ".join(sorted(set(affected))), inline=False)
+            emb.add_field(name="Deck stats updated", value=", ".join(affected)[:1024], inline=False)
 
         self._disable_all()
         self._done = True
@@ -547,8 +537,8 @@ class DeleteTrackView(discord.ui.View):
             return
         self._disable_all()
         emb = discord.Embed(
-            title=f"❎ Deletion cancelled for match {self.m.get('match_id')}",
-            description="\n".join(self._summary_lines()) or "_No players?_",
+            title=f"❎ Deletion cancelled for {self.label()}",
+            description="\n".join(self.summary_lines()) or "_No players?_",
         )
         await interaction.response.edit_message(embed=emb, view=self)
 
@@ -575,6 +565,47 @@ def _parse_match_id(inp: str) -> int | None:
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.archive_tick.start()
+        if VERIFY_NIGHTLY in ("repair", "report"):
+            self.verify_tick.start()
+
+    def cog_unload(self):
+        self.archive_tick.cancel()
+        self.verify_tick.cancel()
+
+    # Compact months into monthly_summaries as they close
+    @tasks.loop(hours=6)
+    async def archive_tick(self):
+        try:
+            frozen = await freeze_closed_months()
+            if frozen:
+                log.info("Archived %d closed month(s)", frozen)
+        except Exception as e:
+            log.warning("Monthly archive freeze failed: %s", e)
+
+    @archive_tick.before_loop
+    async def _before_archive(self):
+        await self.bot.wait_until_ready()
+
+    # Nightly integrity check over matches / individual_results / decks.players
+    @tasks.loop(time=time(hour=4, tzinfo=timezone.utc))
+    async def verify_tick(self):
+        repair = VERIFY_NIGHTLY == "repair"
+        try:
+            report = await verify_data(repair=repair)
+        except Exception as e:
+            log.warning("Nightly data verification failed: %s", e)
+            return
+        text = render_report(report)
+        log.info("Nightly data verification: %s", text)
+        channel = self.bot.get_channel(PRIVATE_CHANNEL_ID) if PRIVATE_CHANNEL_ID else None
+        if channel and any(report["counts"].values()):
+            await channel.send(embed=discord.Embed(
+                title="Nightly Data Check", description=text[:4000], color=0xFF0000))
+
+    @verify_tick.before_loop
+    async def _before_verify(self):
+        await self.bot.wait_until_ready()
 
     # /removedeckfromdatabase
     @slash_command(
@@ -598,7 +629,7 @@ class Admin(commands.Cog):
 
         await ctx.defer(ephemeral=eph)
 
-        old_doc = await case_insensitive_doc(decks, "name", old_deck)
+        old_doc = await find_deck_doc(old_deck)
         if not old_doc:
             await ctx.followup.send(
                 embed=discord.Embed(
@@ -610,9 +641,7 @@ class Admin(commands.Cog):
 
         # no transfer target: block removal if there’s associated data
         if not new_deck:
-            has_results = await individual_results.find_one(
-                {"deck_name": {"$regex": f"^{old_deck}$", "$options": "i"}}
-            )
+            has_results = await individual_results.find_one({"deck_key": deck_key(old_deck)})
             has_players = bool(old_doc.get("players"))
             if has_results or has_players:
                 await ctx.followup.send(
@@ -626,6 +655,7 @@ class Admin(commands.Cog):
 
             # safe to delete
             await decks.delete_one({"_id": old_doc["_id"]})
+            deck_index.discard(old_doc["name"])
             await ctx.followup.send(
                 embed=discord.Embed(
                     title="Deck Removed",
@@ -635,7 +665,7 @@ class Admin(commands.Cog):
             return
 
         # transfer path
-        new_doc = await case_insensitive_doc(decks, "name", new_deck)
+        new_doc = await find_deck_doc(new_deck)
         if not new_doc:
             await ctx.followup.send(
                 embed=discord.Embed(
@@ -645,47 +675,18 @@ class Admin(commands.Cog):
                 ephemeral=eph)
             return
 
-        # 1) Move individual_results
-        ir_res = await individual_results.update_many(
-            {"deck_name": {"$regex": f"^{old_deck}$", "$options": "i"}},
-            {"$set": {"deck_name": new_doc["name"]}}
-        )
-
-        # 2) Move matches player entries
-        m_res = await matches.update_many(
-            {"players.deck_name": {"$regex": f"^{old_deck}$", "$options": "i"}},
-            {"$set": {"players.$[elem].deck_name": new_doc["name"]}},
-            array_filters=[{"elem.deck_name": {"$regex": f"^{old_deck}$", "$options": "i"}}],
-        )
-
-        # 3) Merge players arrays into new deck
-        merged: Dict[int, Dict[str, int]] = {}
-        for p in (new_doc.get("players") or []):
-            merged[p["player_id"]] = {
-                "wins": p.get("wins", 0),
-                "losses": p.get("losses", 0),
-                "draws": p.get("draws", 0),
-            }
-        for p in (old_doc.get("players") or []):
-            s = merged.setdefault(p["player_id"], {"wins": 0, "losses": 0, "draws": 0})
-            s["wins"] += p.get("wins", 0)
-            s["losses"] += p.get("losses", 0)
-            s["draws"] += p.get("draws", 0)
-
-        merged_list = [{"player_id": pid, **stats} for pid, stats in merged.items()]
-        await decks.update_one({"_id": new_doc["_id"]}, {"$set": {"players": merged_list}})
-
-        # 4) Remove old deck doc
-        await decks.delete_one({"_id": old_doc["_id"]})
+        if deck_key(new_doc["name"]) == deck_key(old_doc["name"]):
+            await ctx.followup.send(
+                embed=discord.Embed(
+                    title="Same Deck",
+                    description="Pick a different deck to transfer the logs to.",
+                    color=0xFF0000),
+                ephemeral=eph)
+            return
 
-        await ctx.followup.send(
-            embed=discord.Embed(
-                title="Deck Removed + Logs Transferred",
-                description=(f"{capitalize_words(old_deck)} was removed and all logs "
-                             f"were transferred to {capitalize_words(new_doc['name'])}.\n"
-                             f"Updated IR: **{ir_res.modified_count}**, Matches: **{m_res.modified_count}**"),
-                color=0xFF0000 if IS_DEV else 0x00FF00),
-            ephemeral=eph)
+        # logs move in the background; the old deck doc goes first so nothing new lands on it
+        embed = await enqueue_deck_job(ctx, "merge", old_doc["name"], new_doc["name"], drop_old=True)
+        await ctx.followup.send(embed=embed, ephemeral=eph)
 
     # /findmisnameddecks
     @slash_command(
@@ -704,15 +705,8 @@ class Admin(commands.Cog):
 
         await ctx.defer(ephemeral=eph)
 
-        existing = await decks.distinct("name")
-        existing_set = set(n for n in existing if n)
-        existing_lower = {n.lower() for n in existing_set}
-
-        ir_names = await individual_results.distinct("deck_name")
-        m_names = await matches.distinct("players.deck_name")
-        logged = {n for n in (ir_names + m_names) if isinstance(n, str) and n.strip()}
-
-        missing = sorted([n for n in logged if n.lower() not in existing_lower])
+        await load_deck_index(decks)
+        missing = (await load_orphan_decks(deck_names)).orphans()
 
         if not missing:
             await ctx.followup.send(embed=discord.Embed(
@@ -723,12 +717,10 @@ class Admin(commands.Cog):
 
         # Suggest corrections
         embed = discord.Embed(title="Misnamed Decks Found", color=0xFF0000 if IS_DEV else 0x00FF00)
-        for name in missing[:20]:  # cap fields to avoid embed overflow
-            suggestions = [
-                cand for cand, score, _ in process.extract(
-                    name, list(existing_set), scorer=fuzz.token_set_ratio, limit=5
-                ) if score >= 60 or fuzz.partial_ratio(name, cand) >= 60
-            ]
+        shown = missing[:20]  # cap fields to avoid embed overflow
+        nearest = await deck_matcher.nearest(shown, limit=5, cutoff=60)
+        for name in shown:
+            suggestions = [cand for cand, _ in nearest[name]]
             embed.add_field(name=name, value=(", ".join(suggestions) or "_No close matches_"), inline=False)
 
         await ctx.followup.send(embed=embed, ephemeral=eph)
@@ -756,7 +748,7 @@ class Admin(commands.Cog):
         await ctx.defer(ephemeral=eph)
 
         # Ensure correct deck exists
-        correct_doc = await case_insensitive_doc(decks, "name", correct_deck)
+        correct_doc = await find_deck_doc(correct_deck)
         if not correct_doc:
             await ctx.followup.send(embed=discord.Embed(
                 title="Invalid Deck Name",
@@ -764,41 +756,8 @@ class Admin(commands.Cog):
                 color=0xFF0000), ephemeral=eph)
             return
 
-        # Update IR
-        ir_res = await individual_results.update_many(
-            {"deck_name": misnamed_deck},
-            {"$set": {"deck_name": correct_doc["name"]}}
-        )
-
-        # Update Matches
-        m_res = await matches.update_many(
-            {"players.deck_name": misnamed_deck},
-            {"$set": {"players.$[elem].deck_name": correct_doc["name"]}},
-            array_filters=[{"elem.deck_name": misnamed_deck}],
-        )
-
-        # Recalculate deck.players from IR
-        stats_acc: Dict[int, Dict[str, int]] = {}
-        async for r in individual_results.find({"deck_name": correct_doc["name"]}):
-            pid = int(r["player_id"])
-            t = r["result"]
-            s = stats_acc.setdefault(pid, {"wins": 0, "losses": 0, "draws": 0})
-            if t == "win":
-                s["wins"] += 1
-            elif t == "loss":
-                s["losses"] += 1
-            elif t == "draw":
-                s["draws"] += 1
-
-        players_list = [{"player_id": pid, **vals} for pid, vals in stats_acc.items()]
-        await decks.update_one({"_id": correct_doc["_id"]}, {"$set": {"players": players_list}})
-
-        await ctx.followup.send(embed=discord.Embed(
-            title="Deck Correction Successful",
-            description=(f"Replaced **{misnamed_deck}** → **{correct_doc['name']}**.\n"
-                         f"Updated IR: **{ir_res.modified_count}**, Matches: **{m_res.modified_count}**.\n"
-                         f"Deck stats recalculated."),
-            color=0xFF0000 if IS_DEV else 0x00FF00), ephemeral=eph)
+        embed = await enqueue_deck_job(ctx, "merge", misnamed_deck, correct_doc["name"], drop_old=False)
+        await ctx.followup.send(embed=embed, ephemeral=eph)
 
     # /editdeckindatabase
     @slash_command(
@@ -823,7 +782,7 @@ class Admin(commands.Cog):
         await ctx.defer(ephemeral=eph)
 
         # Reject if target already exists
-        exists = await case_insensitive_doc(decks, "name", new_deck_name)
+        exists = await find_deck_doc(new_deck_name)
         if exists:
             await ctx.followup.send(embed=discord.Embed(
                 title="Deck Name Already Exists",
@@ -832,35 +791,15 @@ class Admin(commands.Cog):
             return
 
         # Update decks doc
-        upd_decks = await decks.update_one(
-            {"name": {"$regex": f"^{old_deck_name}$", "$options": "i"}},
-            {"$set": {"name": new_deck_name}}
-        )
-        if upd_decks.matched_count == 0:
+        old_doc = await find_deck_doc(old_deck_name)
+        if not old_doc:
             await ctx.followup.send(embed=discord.Embed(
                 title="Deck Not Found",
                 description=f"'{old_deck_name}' was not found.",
                 color=0xFF0000), ephemeral=eph)
             return
-
-        # Update IR + Matches
-        upd_ir = await individual_results.update_many(
-            {"deck_name": {"$regex": f"^{old_deck_name}$", "$options": "i"}},
-            {"$set": {"deck_name": new_deck_name}}
-        )
-        upd_m = await matches.update_many(
-            {"players.deck_name": {"$regex": f"^{old_deck_name}$", "$options": "i"}},
-            {"$set": {"players.$[elem].deck_name": new_deck_name}},
-            array_filters=[{"elem.deck_name": {"$regex": f"^{old_deck_name}$", "$options": "i"}}],
-        )
-
-        await ctx.followup.send(embed=discord.Embed(
-            title="Database Deck Name Updated",
-            description=(f"Renamed '{old_deck_name}' → '{new_deck_name}'.\n"
-                         f"Deck doc updated: **{upd_decks.modified_count}**, "
-                         f"IR updated: **{upd_ir.modified_count}**, "
-                         f"Matches updated: **{upd_m.modified_count}**."),
-            color=0xFF0000 if IS_DEV else 0x00FF00), ephemeral=eph)
+        embed = await enqueue_deck_job(ctx, "rename", old_doc["name"], new_deck_name, drop_old=False)
+        await ctx.followup.send(embed=embed, ephemeral=eph)
         
     from discord.commands import slash_command, Option
 
@@ -904,42 +843,17 @@ class Admin(commands.Cog):
         new_pid = int(new_player.id)
 
         # No-op safety
-        if str(old_pid) == str(new_pid):
+        if old_pid == new_pid:
             await ctx.followup.send("That seat already has this player.", ephemeral=eph)
             return
 
-        # 1) Update matches at fixed index (no array filter needed)
-        await matches.update_one(
-            {"match_id": m["match_id"]},
-            {"$set": {f"players.{idx}.player_id": new_pid}}
-        )
-
-        # 2) Update individual_results for this match/seat: move old_pid -> new_pid
-        #    (defensively remove any existing IR rows for new_pid in this match to avoid dup)
-        await individual_results.delete_many(
-            {"match_id": m["match_id"], "player_id": {"$in": [str(new_pid), new_pid]}}
-        )
-        await individual_results.update_many(
-            {"match_id": m["match_id"], "player_id": {"$in": [str(old_pid), old_pid]}},
-            {"$set": {"player_id": new_pid}}
-        )
-
-        # 3) Recompute decks for all decks in this match (before+after), since attribution changed
-        m2 = await matches.find_one({"match_id": m["match_id"]})
-
-        def _deck_names_from_match(match_doc) -> set[str]:
-            names = set()
-            for p in (match_doc or {}).get("players", []):
-                dn = p.get("deck_name")
-                if isinstance(dn, str) and dn.strip():
-                    names.add(dn.strip())
-            return names
-
-        affected_decks = _deck_names_from_match(m) | _deck_names_from_match(m2)
-        if affected_decks:
-            await recompute_deck_players_for(decks, individual_results, list(affected_decks))
+        # Match, its IR rows and the deck/rollup deltas move together in one transaction
+        m2 = await edit_match(m, {idx: {"player_id": new_pid}})
+        if m2 is None:
+            await ctx.followup.send("Match changed while this ran; nothing was written. Try again.", ephemeral=eph)
+            return
 
-        # 4) Re-open the editor so the mod can continue
+        # Re-open the editor so the mod can continue
         # Build the same summary you use in /edittrack
         lines = []
         def _mention(pid): return f"<@{pid}>"
@@ -1010,31 +924,11 @@ class Admin(commands.Cog):
         idx = player - 1
         old = m["players"][idx].get("deck_name")
 
-        # Update matches + IR for this player (handle str/int ids)
-        pid = m["players"][idx]["player_id"]
-        pid_vals = {str(pid)}
-        try:
-            pid_vals.add(int(str(pid)))
-        except Exception:
-            pass
-
-        await matches.update_one(
-            {"match_id": m["match_id"]},
-            {"$set": {f"players.$[e].deck_name": deck}},
-            array_filters=[{"e.player_id": {"$in": list(pid_vals)}}],
-        )
-        await individual_results.update_many(
-            {"match_id": m["match_id"], "player_id": {"$in": list(pid_vals)}},
-            {"$set": {"deck_name": deck}},
-        )
-
-        # Recompute decks for old+new deck names
-        touched = [d for d in [old, deck] if isinstance(d, str) and d.strip()]
-        if touched:
-            await recompute_deck_players_for(decks, individual_results, touched)
-
-        # Re-fetch match and re-open the editor with a fresh view
-        m2 = await matches.find_one({"match_id": m["match_id"]})
+        # Match, IR and exact decks.players / rollup deltas in one transaction
+        m2 = await edit_match(m, {idx: {"deck_name": deck}})
+        if m2 is None:
+            await ctx.followup.send("Match changed while this ran; nothing was written. Try again.", ephemeral=eph)
+            return
 
         # Build the same summary lines you use in /edittrack
         lines = []
@@ -1082,6 +976,7 @@ class Admin(commands.Cog):
         self,
         ctx: discord.ApplicationContext,
         match_id: Annotated[str, Option(str, "Match ID")],
+        repair: Annotated[bool, Option(bool, "Also recount these decks' player stats from all logs", default=False)] = False,
     ):
         eph = should_be_ephemeral(ctx)
         if not is_mod(ctx.author):
@@ -1145,88 +1040,21 @@ class Admin(commands.Cog):
             return
         
 
-        # Apply updates
-        touched_decks: set[str] = set()
-
-        for idx, changes in view.edits.items():
-            if not changes:
-                continue
-
-            player = m["players"][idx]
-            pid_raw = player.get("player_id")
-
-            # match str/int player_id
-            pid_str = str(pid_raw)
-            pid_vals = {pid_str}
-            try:
-                pid_vals.add(int(pid_str))
-            except Exception:
-                pass
+        # Apply the before/after diff: match, IR, decks.players $inc and rollups in one transaction.
+        # The diff is taken against a fresh read; if the match moved while the editor was open, stop.
+        m2 = await edit_match(m, view.edits)
+        if m2 is None:
+            await ctx.followup.send(
+                f"❌ Match {m.get('match_id')} was changed or deleted while you were editing; nothing was written. "
+                "Run /edittrack again.",
+                ephemeral=True,
+            )
+            return
 
-            match_set: Dict[str, object] = {}
-            ir_set: Dict[str, object] = {}
-
-
-            # result
-            if "result" in changes:
-                match_set["players.$[elem].result"] = changes["result"]
-                ir_set["result"] = changes["result"]
-                # result affects deck stats even if deck stays the same
-                if isinstance(player.get("deck_name"), str) and player["deck_name"].strip():
-                    touched_decks.add(player["deck_name"])
-
-            # position / seat (doesn't affect stats, but safe to include)
-            if "position" in changes:
-                pos = int(changes["position"])
-                match_set["players.$[elem].position"] = pos
-                ir_set["seat"] = pos
-                # optional: include current deck for completeness
-                if isinstance(player.get("deck_name"), str) and player["deck_name"].strip():
-                    touched_decks.add(player["deck_name"])
-
-            # deck_name
-            if "deck_name" in changes:
-                new_deck = changes["deck_name"]
-                old_deck = player.get("deck_name")
-                match_set["players.$[elem].deck_name"] = new_deck
-                ir_set["deck_name"] = new_deck
-                if isinstance(old_deck, str) and old_deck.strip():
-                    touched_decks.add(old_deck)
-                if isinstance(new_deck, str) and new_deck.strip():
-                    touched_decks.add(new_deck)
-
-            if match_set:
-                m_res = await matches.update_one(
-                    {"match_id": m["match_id"]},
-                    {"$set": match_set},
-                    array_filters=[{"elem.player_id": {"$in": list(pid_vals)}}],
-                )
-
-            if ir_set:
-                ir_res = await individual_results.update_many(
-                    {"match_id": m["match_id"], "player_id": {"$in": list(pid_vals)}},
-                    {"$set": ir_set},
-                )
-
-        # Re-fetch match AFTER updates
-        m2 = await matches.find_one({"match_id": m["match_id"]})
-
-        # Gather all deck names appearing in this match before and after edits
-        def _deck_names_from_match(match_doc) -> set[str]:
-            names = set()
-            for p in (match_doc or {}).get("players", []):
-                dn = p.get("deck_name")
-                if isinstance(dn, str):
-                    dn = dn.strip()
-                    if dn:
-                        names.add(dn)
-            return names
-
-        affected_decks = _deck_names_from_match(m) | _deck_names_from_match(m2)
-
-        # Rebuild deck.stats from IR for all decks involved in this match
-        if affected_decks:
-            await recompute_deck_players_for(decks, individual_results, list(affected_decks))
+        if repair:
+            # fallback: recount every deck in the match from its full IR history
+            affected_decks = {p.get("deck_name") for p in m["players"] + m2["players"]} - {None, ""}
+            await recompute_deck_players(list(affected_decks))
 
         lines = []
         def _mention(pid): return f"<@{pid}>"
@@ -1262,12 +1090,12 @@ class Admin(commands.Cog):
     @slash_command(
         guild_ids=[GUILD_ID],
         name="deletetrack",
-        description="Delete a tracked match by ID (mods only) with confirm/cancel.",
+        description="Delete tracked matches by ID, range or list (mods only) with confirm/cancel.",
     )
     async def deletetrack(
         self,
         ctx: discord.ApplicationContext,
-        match: Annotated[str, Option(str, "Match ID or link")],
+        match: Annotated[str, Option(str, "Match ID or link, a range like 120-135, or a list like 120, 124")],
     ):
         eph = should_be_ephemeral(ctx)
         if not is_mod(ctx.author):
@@ -1277,47 +1105,85 @@ class Admin(commands.Cog):
             )
             return
 
-        mid = _parse_match_id(match)
-        if not mid:
-            await ctx.respond("Couldn't parse a match id from that input.", ephemeral=True)
-            return
+        if "/" in match:  # message link: first id-like number, as before
+            mid = _parse_match_id(match)
+            ids = [mid] if mid else []
+            if not ids:
+                await ctx.respond("Couldn't parse a match id from that input.", ephemeral=True)
+                return
+        else:
+            try:
+                ids = parse_match_ids(match)
+            except ValueError as e:
+                await ctx.respond(str(e), ephemeral=True)
+                return
 
-        m = await matches.find_one({"match_id": mid})
-        if not m:
-            await ctx.respond(f"No match found with id `{mid}`.", ephemeral=eph)
+        found = await matches.find({"match_id": {"$in": ids}}).sort("match_id", 1).to_list(length=None)
+        if not found:
+            what = f"id `{ids[0]}`" if len(ids) == 1 else "any of those ids"
+            await ctx.respond(f"No match found with {what}.", ephemeral=eph)
             return
 
         # show confirmation with buttons (only invoker can click)
-        lines = []
-        def _mention(pid): return f"<@{pid}>"
-        for i, p in enumerate(m.get("players", [])[:4], start=1):
-            try:
-                seat = int(p.get("position"))
-            except (TypeError, ValueError):
-                seat = "?"
-            lines.append(
-                f"**P{i}** • {_mention(p.get('player_id','?'))} • "
-                f"Seat {seat if seat in {1,2,3,4} else '?'} • "
-                f"Deck: *{p.get('deck_name','?')}* • Result: **{p.get('result','?')}**"
-            )
-
+        view = DeleteTrackView(author_id=ctx.author.id, match_docs=found)
+        missing = sorted(set(ids) - {m["match_id"] for m in found})
         embed = discord.Embed(
-            title=f"Confirm deletion of match {m.get('match_id')}",
-            description="\n".join(lines) or "_No players?_",
+            title=f"Confirm deletion of {view.label()}",
+            description="\n".join(view.summary_lines()) or "_No players?_",
             color=0xFF7F7F,
         )
-        view = DeleteTrackView(author_id=ctx.author.id, match_doc=m)
+        if missing:
+            shown = ", ".join(map(str, missing[:30])) + (" …" if len(missing) > 30 else "")
+            embed.add_field(name=f"Not found ({len(missing)})", value=shown, inline=False)
         await ctx.respond(embed=embed, view=view, ephemeral=eph, allowed_mentions=discord.AllowedMentions.none())
 
-        
-    @slash_command(guild_ids=[GUILD_ID], name="reindex", description="Ensure MongoDB indexes (mods only).")
-    async def reindex(self, ctx: discord.ApplicationContext):
+    @slash_command(guild_ids=[GUILD_ID], name="reindex",
+                   description="Ensure MongoDB indexes and explain the bot's queries against them (mods only).")
+    async def reindex(
+        self,
+        ctx: discord.ApplicationContext,
+        advise: Annotated[bool, Option(bool, "Explain the bot's queries and suggest indexes", required=False)] = False,
+        full: Annotated[bool, Option(bool, "With advise: also explain the whole-collection reads", required=False)] = False,
+    ):
         if not is_mod(ctx.author):
             return await ctx.respond("Nope.", ephemeral=True)
         await ctx.defer(ephemeral=True)
         from db import ensure_indexes
         await ensure_indexes()
-        await ctx.followup.send("Indexes ensured ✅", ephemeral=True)
+        if not advise:
+            return await ctx.followup.send("Indexes ensured ✅", ephemeral=True)
+        rows = await explain_queries(include_full=full)
+        lines = render_advice(rows).splitlines()
+        pages = paginate_text(lines[1:], header="", limit=MAX_MSG_CHARS - 10)
+        await ctx.followup.send(f"Indexes ensured ✅ {lines[0]}", ephemeral=True)
+        for page in pages:
+            await ctx.followup.send(f"```\n{page}\n```", ephemeral=True)
+
+    @slash_command(guild_ids=[GUILD_ID], name="rebuildrollups", description="Regenerate leaderboard rollups, seat stats and ratings from matches (mods only).")
+    async def rebuildrollups(self, ctx: discord.ApplicationContext):
+        if not is_mod(ctx.author):
+            return await ctx.respond("Nope.", ephemeral=True)
+        await ctx.defer(ephemeral=True)
+        counts = await rebuild_rollups()
+        summary = ", ".join(f"{name}: {n} rows" for name, n in counts.items())
+        await ctx.followup.send(f"Rollups rebuilt ✅ ({summary})", ephemeral=True)
+
+    @slash_command(guild_ids=[GUILD_ID], name="verifydata",
+                   description="Check matches, individual results and deck stats agree; optionally repair (mods only).")
+    async def verifydata(
+        self,
+        ctx: discord.ApplicationContext,
+        repair: Annotated[bool, Option(bool, "Apply the repair plan", required=False)] = False,
+    ):
+        if not is_mod(ctx.author):
+            return await ctx.respond("Nope.", ephemeral=True)
+        await ctx.defer(ephemeral=True)
+        report = await verify_data(repair=repair)
+        ok = not any(report["counts"].values())
+        await ctx.followup.send(embed=discord.Embed(
+            title="Data Check" + (" ✅" if ok else ""),
+            description=render_report(report)[:4000],
+            color=0x00FF00 if ok and not IS_DEV else 0xFF0000), ephemeral=True)
 
 
 
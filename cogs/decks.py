@@ -3,24 +3,14 @@ from typing import Annotated
 import discord
 from discord.ext import commands
 from discord.commands import slash_command, Option
-from collections import defaultdict
-from rapidfuzz import fuzz
 
 from config import GUILD_ID, IS_DEV
 from db import decks as decks_col
-from utils.text import capitalize_words, format_deck_name, paginate_text, MAX_EMBED_CHARS
+from utils.text import capitalize_words, format_deck_name, paginate_text, deck_key, MAX_EMBED_CHARS
 from utils.ephemeral import should_be_ephemeral
 from utils.views import PaginatorView
-
-
-
-
-# Top-level autocomplete so it works inside annotations (no self reference)
-async def deck_autocomplete(ctx: discord.AutocompleteContext):
-    cursor = decks_col.find({}, {"name": 1, "_id": 0})
-    names = [d["name"] async for d in cursor]
-    needle = (ctx.value or "").lower()
-    return [n for n in names if needle in n.lower()][:25]
+from utils.deck_index import deck_index, load_deck_index
+from utils.fuzzy import deck_matcher
 
 
 class Decks(commands.Cog):
@@ -71,19 +61,11 @@ class Decks(commands.Cog):
             )
             return
 
-        existing = [d["name"] async for d in decks_col.find({}, {"name": 1})]
-        matches = defaultdict(int)
-        for ex in existing:
-            score = fuzz.ratio(deck_to_save.lower(), ex.lower())
-            if score >= 85:
-                matches[ex] = max(matches[ex], score)
-            if deck_to_save.lower().startswith(ex.lower()) or ex.lower().startswith(deck_to_save.lower()):
-                matches[ex] = max(matches[ex], score)
+        await load_deck_index(decks_col)
+        matches = await deck_matcher.similar(deck_to_save)
 
         if matches:
-            suggestions = "\n".join(
-                f"- {capitalize_words(n)} ({s:.0f}% match)" for n, s in sorted(matches.items(), key=lambda x: x[1], reverse=True)
-            )
+            suggestions = "\n".join(f"- {capitalize_words(n)} ({s:.0f}% match)" for n, s in matches)
             warning = (
                 f"A similar deck already exists. Add **{display}** anyway?\n\n"
                 f"Possible matches:\n{suggestions}"
@@ -93,7 +75,8 @@ class Decks(commands.Cog):
             view = discord.ui.View(timeout=30)
 
             async def confirm(_):
-                await decks_col.insert_one({"name": deck_to_save})
+                await decks_col.insert_one({"name": deck_to_save, "deck_key": deck_key(deck_to_save)})
+                deck_index.add(deck_to_save)
                 await ctx.respond(
                     embed=discord.Embed(
                         title="New deck added",
@@ -120,7 +103,8 @@ class Decks(commands.Cog):
             await ctx.respond(warning, view=view, ephemeral=True)
             return
 
-        await decks_col.insert_one({"name": deck_to_save})
+        await decks_col.insert_one({"name": deck_to_save, "deck_key": deck_key(deck_to_save)})
+        deck_index.add(deck_to_save)
         await ctx.respond(
             embed=discord.Embed(
                 title="New deck added",
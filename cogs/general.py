@@ -1,18 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, List
-from datetime import datetime, timezone
+from typing import Annotated, Dict, List
 
 import discord
 from discord.ext import commands
-from discord.commands import slash_command
+from discord.commands import slash_command, Option
 import asyncio 
 
 
-from config import GUILD_ID, IS_DEV
+from config import GUILD_ID, IS_DEV, ANALYTICS_BACKEND, ERA_CUTOFFS
+from db import individual_results
 from utils.perms import is_mod
 from utils.ephemeral import should_be_ephemeral
-from db import individual_results
+from utils.result_cache import result_cache
+from utils.rollups import global_seat_split
+from utils.analytics import ensure_loaded
+from utils.eras import parse_cutoffs, is_default, era_labels, era_seat_pipeline, era_seat_rows
 
 
 # Public categories (anything not matched falls into "Other")
@@ -31,6 +34,9 @@ PUBLIC_CATEGORIES: dict[str, list[str]] = {
         "deckstats",
         "playerstats",
         "leaderboard",
+        "ratings",
+        "headtohead",
+        "matchup",
         "generalstats",
         "estousempreemultimo",
     ],
@@ -54,8 +60,12 @@ ADMIN_COMMANDS: dict[str, str] = {
     "findmisnameddecks": "Find deck names in logs that aren't in the DB.",
     "correctmisnameddecks": "Fix a misnamed deck across logs and stats.",
     "editdeckindatabase": "Rename a deck across DB and logs.",
-    "deletetrack": "Delete a tracked match by its ID.",
-    "reindex": "Ensure MongoDB indexes (mods only).",
+    "jobs": "Show background deck jobs; retry a failed one.",
+    "deletetrack": "Delete tracked matches by ID, range or list.",
+    "trackbatch": "Log many pods at once from a CSV/JSON upload.",
+    "reindex": "Ensure MongoDB indexes; with advise, also explain the bot's queries: flags collection scans, in-memory sorts and wasteful scans, and suggests indexes.",
+    "verifydata": "Check matches, results and deck stats agree; optionally repair.",
+    "rebuildrollups": "Regenerate the leaderboard rollups, seat stats, ratings, deck names and monthly archive from matches.",
     
 }
 
@@ -65,13 +75,17 @@ ADMIN_CATEGORIES: dict[str, list[str]] = {
         "findmisnameddecks",
         "correctmisnameddecks",
         "editdeckindatabase",
+        "jobs",
         "reindex"
     ],
     "Match Admin": [
         "edittrack",
         "setplayerdeck",
         "setplayer",
-        "deletetrack"
+        "deletetrack",
+        "trackbatch",
+        "rebuildrollups",
+        "verifydata",
     ],
 }
 
@@ -130,40 +144,15 @@ def _embed_from_buckets(
 
 # ---------- helpers for general stats ----------
 
-POSTBAN_START_DATE = datetime(2024, 9, 24, tzinfo=timezone.utc)
-
-async def _get_win_stats(match_criteria: dict) -> tuple[Dict[int, int], int]:
-    total_per_seat: Dict[int, int] = {1: 0, 2: 0, 3: 0, 4: 0}
-    total_ir = 0
-
-    pipeline_total = [
-        {"$match": match_criteria},
-        {"$group": {"_id": "$seat", "cnt": {"$sum": 1}}},
-    ]
-    async for row in individual_results.aggregate(pipeline_total):
-        seat = int(row["_id"]) if row["_id"] in (1, 2, 3, 4) else None
-        if seat:
-            total_per_seat[seat] = int(row["cnt"])
-            total_ir += int(row["cnt"])
-
-    wins_by_seat: Dict[int, int] = {}
-    pipeline_wins = [
-        {"$match": {**match_criteria, "result": "win"}},
-        {"$group": {"_id": "$seat", "wins": {"$sum": 1}}},
-    ]
-    async for row in individual_results.aggregate(pipeline_wins):
-        seat = int(row["_id"]) if row["_id"] in (1, 2, 3, 4) else None
-        if seat:
-            wins_by_seat[seat] = int(row["wins"])
-
+def _win_stats(seat_rows: List[dict]) -> tuple[Dict[int, int], int]:
+    """Win % per seat and number of games from seat_stats rows for one era."""
+    totals = {r["_id"]: r for r in seat_rows}
     win_pct: Dict[int, int] = {}
     for seat in (1, 2, 3, 4):
-        total = total_per_seat.get(seat, 0)
-        wins = wins_by_seat.get(seat, 0)
-        pct = round((wins / total) * 100) if total > 0 else 0
-        win_pct[seat] = pct
-
-    total_games = total_ir // 4
+        row = totals.get(seat) or {}
+        games = row.get("games", 0)
+        win_pct[seat] = round((row.get("wins", 0) / games) * 100) if games > 0 else 0
+    total_games = sum(r.get("games", 0) for r in seat_rows) // 4
     return win_pct, total_games
 
 
@@ -180,35 +169,35 @@ def _format_stats_field(stats_by_seat: Dict[int, int]) -> str:
 
 
 def _build_general_stats_embed(stats: dict) -> discord.Embed:
-    preban_stats = stats["preban_stats"]
-    postban_stats = stats["postban_stats"]
-    preban_total = stats["preban_total_games"]
-    postban_total = stats["postban_total_games"]
-
     embed = discord.Embed(title="General Stats", color=0xFF0000 if IS_DEV else 0x00FF00)
-    embed.add_field(
-        name=f"Global Win Percentage by Seat (PRE-BAN) ({preban_total} games)",
-        value=_format_stats_field(preban_stats) or "_no data_",
-        inline=False,
-    )
-    embed.add_field(
-        name=f"Global Win Percentage by Seat (POST-BAN) ({postban_total} games)",
-        value=_format_stats_field(postban_stats) or "_no data_",
-        inline=False,
-    )
-    embed.set_footer(text="Cutover date: 2024-09-24 (UTC)")
+    for era in stats["eras"]:
+        embed.add_field(
+            name=f"Global Win Percentage by Seat ({era['label']}) ({era['total_games']} games)",
+            value=_format_stats_field(era["stats"]) or "_no data_",
+            inline=False,
+        )
+    dates = ", ".join(stats["cutoffs"])
+    embed.set_footer(text=f"Cutover date{'s' if len(stats['cutoffs']) > 1 else ''}: {dates} (UTC)")
     return embed
 
 
-async def _fetch_general_stats() -> dict:
-    preban_stats, preban_total = await _get_win_stats({"date": {"$lt": POSTBAN_START_DATE}})
-    postban_stats, postban_total = await _get_win_stats({"date": {"$gte": POSTBAN_START_DATE}})
-    return {
-        "preban_stats": preban_stats,
-        "preban_total_games": preban_total,
-        "postban_stats": postban_stats,
-        "postban_total_games": postban_total,
-    }
+async def _era_seat_split(cutoffs: list) -> List[List[dict]]:
+    if ANALYTICS_BACKEND == "numpy":
+        return (await ensure_loaded(individual_results)).era_seat_split(cutoffs)
+    if is_default(cutoffs):
+        split = await global_seat_split()  # reads at most eight seat_stats rows
+        return [split["preban"], split["postban"]]
+    # any other cut-overs: one $group over (era, seat, result), however many dates
+    docs = await individual_results.aggregate(era_seat_pipeline(cutoffs)).to_list(length=None)
+    return era_seat_rows(docs, len(cutoffs) + 1)
+
+
+async def _fetch_general_stats(cutoffs: list) -> dict:
+    eras = []
+    for label, rows in zip(era_labels(cutoffs), await _era_seat_split(cutoffs)):
+        stats, total = _win_stats(rows)
+        eras.append({"label": label, "stats": stats, "total_games": total})
+    return {"eras": eras, "cutoffs": [c.strftime("%Y-%m-%d") for c in cutoffs]}
 
 
 # ---------- Cog ----------
@@ -267,13 +256,26 @@ class General(commands.Cog):
     @slash_command(
         guild_ids=[GUILD_ID],
         name="generalstats",
-        description="Show global seat win% pre-/post-ban",
+        description="Show global seat win% pre-/post-ban (mods: any cut-over dates)",
     )
-    async def generalstats(self, ctx: discord.ApplicationContext):
+    async def generalstats(
+        self,
+        ctx: discord.ApplicationContext,
+        cutoffs: Annotated[str | None, Option(str, "Mods: cut-over dates, e.g. 2024-09-24, 2025-04-01", required=False)] = None,
+    ):
         eph = should_be_ephemeral(ctx)
+        if cutoffs and not is_mod(ctx.author):
+            return await ctx.respond("Only mods can pick cut-over dates.", ephemeral=True)
+        try:
+            dates = parse_cutoffs(cutoffs or ERA_CUTOFFS)
+        except ValueError as e:
+            return await ctx.respond(str(e), ephemeral=True)
         await ctx.defer(ephemeral=eph)
 
-        stats = await _fetch_general_stats()
+        stats = await result_cache.get_or_compute(
+            ("generalstats", *(d.date() for d in dates)),
+            lambda: _fetch_general_stats(dates),
+        )
         embed = _build_general_stats_embed(stats)
         await ctx.followup.send(embed=embed, ephemeral=eph)
 
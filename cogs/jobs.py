@@ -0,0 +1,191 @@
+# cogs/jobs.py
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Annotated
+
+import discord
+from discord.ext import commands, tasks
+from discord.commands import slash_command, Option
+from pymongo import ReturnDocument
+
+from config import GUILD_ID, IS_DEV
+from db import decks, matches, individual_results, jobs
+from utils.deck_index import deck_index
+from utils.deck_jobs import (
+    ACTIVE, BATCH_SIZE, STEPS, ir_filter, job_progress, job_title, match_filter,
+)
+from utils.ephemeral import should_be_ephemeral
+from utils.match_writes import move_deck_batch, recompute_deck_players, write_lock
+from utils.perms import is_mod
+from utils.rollups import rebuild_deck_rollups, rebuild_ratings
+
+log = logging.getLogger("ca_match_logger")
+
+PROGRESS_EVERY = 3.0  # seconds between progress message edits
+
+
+class Jobs(commands.Cog):
+    """Runs queued deck maintenance jobs one at a time, checkpointing after every batch."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._last_edit = 0.0
+        self.worker.start()
+
+    def cog_unload(self):
+        self.worker.cancel()
+
+    # ---------- worker ----------
+
+    @tasks.loop(seconds=10)
+    async def worker(self):
+        try:
+            while True:
+                # "running" too: a job interrupted by a restart is picked up where it stopped
+                job = await jobs.find_one_and_update(
+                    {"status": {"$in": list(ACTIVE)}},
+                    {"$set": {"status": "running", "updated_at": datetime.now(timezone.utc)}},
+                    sort=[("created_at", 1)],
+                    return_document=ReturnDocument.AFTER,
+                )
+                if not job:
+                    return
+                await self._run(job)
+        except Exception as e:
+            log.warning("Job worker tick failed: %s", e)
+
+    @worker.before_loop
+    async def _before_worker(self):
+        await self.bot.wait_until_ready()
+
+    async def _checkpoint(self, job: dict, **fields):
+        fields["updated_at"] = datetime.now(timezone.utc)
+        job.update(fields)
+        await jobs.update_one({"_id": job["_id"]}, {"$set": fields})
+
+    async def _run(self, job: dict):
+        try:
+            if not job.get("totals"):
+                await self._checkpoint(job, totals={
+                    "individual_results": await individual_results.count_documents(ir_filter(job)),
+                    "matches": await matches.count_documents(match_filter(job)),
+                })
+            await self._report(job, force=True)
+            while job["step"] < len(STEPS):
+                await getattr(self, f"_step_{STEPS[job['step']]}")(job)
+                await self._checkpoint(job, step=job["step"] + 1)
+                await self._report(job)
+            await self._checkpoint(job, status="done")
+            log.info("Job #%s done: %s", job["_id"], job_title(job))
+        except Exception as e:
+            log.exception("Job #%s failed at step %s", job["_id"], job.get("step"))
+            await self._checkpoint(job, status="failed", error=str(e)[:300])
+        await self._report(job, force=True)
+
+    async def _step_deck_doc(self, job: dict):
+        if job["kind"] == "rename":
+            await decks.update_one({"deck_key": job["old_key"]},
+                                   {"$set": {"name": job["new_name"], "deck_key": job["new_key"]}})
+            deck_index.rename(job["old_name"], job["new_name"])
+        elif job["drop_old"]:
+            await decks.delete_one({"deck_key": job["old_key"]})
+            deck_index.discard(job["old_name"])
+
+    async def _step_matches(self, job: dict):
+        while True:
+            moved, rows = await move_deck_batch(job)
+            if not moved:
+                return
+            await self._advance(job, matches=moved, individual_results=rows)
+
+    async def _step_individual_results(self, job: dict):
+        # rows whose match went with no batch (orphans); the derived recount picks them up
+        new = {"deck_name": job["new_name"], "deck_key": job["new_key"]}
+        while True:
+            ids = [d["_id"] async for d in individual_results.find(ir_filter(job), {"_id": 1}).limit(BATCH_SIZE)]
+            if not ids:
+                return
+            res = await individual_results.update_many({"_id": {"$in": ids}}, {"$set": new})
+            await self._advance(job, individual_results=res.modified_count)
+
+    async def _step_derived(self, job: dict):
+        # the batches kept the derived stores moving; recount both keys as a check, with
+        # match writes held off so a /track landing mid-recount is not overwritten
+        async with write_lock:
+            if job["kind"] == "merge":
+                await recompute_deck_players([job["new_key"]])
+            await rebuild_deck_rollups([job["old_key"], job["new_key"]])
+        await rebuild_ratings()  # a merge changes every opponent's history too
+
+    async def _advance(self, job: dict, **done: int):
+        for step, n in done.items():
+            job["done"][step] += n
+        await jobs.update_one({"_id": job["_id"]},
+                              {"$inc": {f"done.{step}": n for step, n in done.items()},
+                               "$set": {"updated_at": datetime.now(timezone.utc)}})
+        await self._report(job)
+
+    # ---------- progress message ----------
+
+    async def _report(self, job: dict, *, force: bool = False):
+        """Edit the job's progress message (throttled), posting it first if needed. Never raises."""
+        if not job.get("channel_id") or (not force and time.monotonic() - self._last_edit < PROGRESS_EVERY):
+            return
+        self._last_edit = time.monotonic()
+        color = 0xFF0000 if job["status"] == "failed" or IS_DEV else 0x00FF00
+        embed = discord.Embed(title=job_title(job), description=job_progress(job), color=color)
+        try:
+            channel = self.bot.get_channel(job["channel_id"]) or await self.bot.fetch_channel(job["channel_id"])
+            if job.get("message_id"):
+                msg = channel.get_partial_message(job["message_id"])
+                await msg.edit(embed=embed)
+            else:
+                msg = await channel.send(embed=embed)
+                await self._checkpoint(job, message_id=msg.id)
+        except Exception as e:
+            log.warning("Job #%s: progress update failed: %s", job["_id"], e)
+
+    # ---------- commands ----------
+
+    @slash_command(
+        guild_ids=[GUILD_ID],
+        name="jobs",
+        description="Show recent deck maintenance jobs, or retry a failed one. (Mods only)",
+    )
+    async def jobs_cmd(
+        self,
+        ctx: discord.ApplicationContext,
+        retry: Annotated[int | None, Option(int, "Failed job id to queue again", required=False)] = None,
+    ):
+        eph = should_be_ephemeral(ctx)
+        if not is_mod(ctx.author):
+            await ctx.respond(embed=discord.Embed(
+                title="Permission Denied",
+                description="You do not have permission to use this command.",
+                color=0xFF0000), ephemeral=True)
+            return
+
+        await ctx.defer(ephemeral=eph)
+
+        if retry is not None:
+            res = await jobs.update_one({"_id": retry, "status": "failed"},
+                                        {"$set": {"status": "queued", "error": None,
+                                                  "updated_at": datetime.now(timezone.utc)}})
+            await ctx.followup.send(embed=discord.Embed(
+                title="Job Requeued" if res.modified_count else "Nothing To Retry",
+                description=(f"Job #{retry} will resume from its last checkpoint." if res.modified_count
+                             else f"Job #{retry} does not exist or has not failed."),
+                color=0xFF0000 if IS_DEV or not res.modified_count else 0x00FF00), ephemeral=eph)
+            return
+
+        recent = await jobs.find({}).sort("_id", -1).limit(10).to_list(length=10)
+        lines = [f"**#{j['_id']}** {job_title(j).split(': ', 1)[1]} — {j['status']}" for j in recent]
+        await ctx.followup.send(embed=discord.Embed(
+            title="Recent Jobs",
+            description="\n".join(lines) or "_No jobs yet._",
+            color=0xFF0000 if IS_DEV else 0x00FF00), ephemeral=eph)
+
+
+def setup(bot):
+    bot.add_cog(Jobs(bot))
@@ -4,16 +4,56 @@ import discord
 from discord.ext import commands
 from discord.commands import slash_command, Option
 
-from config import GUILD_ID, IS_DEV
-from db import individual_results
+from config import GUILD_ID, IS_DEV, ANALYTICS_BACKEND
+from db import daily_rollups, individual_results, ratings
+from utils.leaderboard import leaderboard_pipeline, join_windows, render_leaderboard, MIN_GAMES
+from utils.ratings import render_ratings, MIN_GAMES as RATING_MIN_GAMES
 from utils.time_ranges import get_period_start, previous_month_window, format_period
 from utils.ephemeral import should_be_ephemeral
+from utils.result_cache import result_cache, period_key
+from utils.members import member_resolver
+from utils.analytics import ensure_loaded
+from utils.rollups import archive_rows
+
+
+async def _fetch_rows(kind: str, period: str, postban: bool) -> list:
+    """Ranked rows for the window, joined with the previous month's for 1m; one aggregation."""
+    start = get_period_start(period, postban)
+    prev_start, prev_end = previous_month_window(period)
+    previous = (prev_start, prev_end) if prev_start and prev_end else None
+    limit = 40 if period != "1m" else None
+    if ANALYTICS_BACKEND == "numpy":
+        facet = (await ensure_loaded(individual_results)).leaderboard(kind, start, previous, limit=limit)
+    elif period == "all":
+        # whole history: frozen monthly summaries + the raw rows around them
+        rows = await archive_rows({}, start, "player_id" if kind == "player" else "deck_key",
+                                  pct_field="normal_win_percentage", min_games=MIN_GAMES, limit=limit)
+        facet = {"current": [{**r, "name": r.get("deck_name")} for r in rows]}
+    else:
+        pipeline = leaderboard_pipeline(kind, start, previous, limit=limit)
+        facet = (await daily_rollups.aggregate(pipeline).to_list(length=1))[0]
+    return join_windows(facet["current"], facet.get("previous"))
+
+
+async def _fetch_ratings(kind: str, min_games: int) -> list:
+    """Top precomputed ratings; an index walk on rating_kind_rating, no aggregation."""
+    cursor = ratings.find({"kind": kind, "games": {"$gte": min_games}}, {"_id": 0}).sort("rating", -1).limit(40)
+    return [r async for r in cursor]
 
 
 class Leaderboard(commands.Cog):
-    def __init__(self, bot): 
+    def __init__(self, bot):
         self.bot = bot
 
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        member_resolver.forget(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.nick != after.nick or before.display_name != after.display_name:
+            member_resolver.forget(after.guild.id, after.id)
+
     @slash_command(guild_ids=[GUILD_ID], name="leaderboard", description="Top players or decks")
     async def leaderboard(
         self,
@@ -24,183 +64,58 @@ class Leaderboard(commands.Cog):
     ):
         await (self.show_players(ctx, period, postban) if type == "players" else self.show_decks(ctx, period, postban))
 
+    async def _rows(self, kind: str, period: str, postban: bool) -> list:
+        return await result_cache.get_or_compute(
+            ("leaderboard", kind, *period_key(period, postban)),
+            lambda: _fetch_rows(kind, period, postban),
+        )
+
     async def show_players(self, ctx, period, postban):
-        start = get_period_start(period, postban)
-        readable = format_period(period)
-        title_suffix = " (POST-BAN)" if postban else ""
-        result_limit = 40 if period != "1m" else None
-        prev_start, prev_end = previous_month_window(period)
         await ctx.defer(ephemeral=should_be_ephemeral(ctx))
-
-        pipeline = [
-            {"$match": {"date": {"$gte": start}}},
-            {"$group": {"_id": "$player_id",
-                        "games_played": {"$sum": 1},
-                        "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                        "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                        "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}}}},
-            {"$addFields": {
-                "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                "normal_win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
-                "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
-            }},
-            {"$match": {"games_played": {"$gte": 15}}},
-            {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
-        ]
-        if result_limit:
-            pipeline.append({"$limit": result_limit})
-
-        guild = ctx.guild
-        embeds, embed, pos, fields = [], discord.Embed(title=f"Player Leaderboard - {readable}{title_suffix}", color=0xFF0000 if IS_DEV else 0x00FF00), 1, 0
-        current = {}
-        async for d in individual_results.aggregate(pipeline):
-            try:
-                m = guild.get_member(d['_id'])
-                if not m:
-                    try:
-                        m = await guild.fetch_member(d['_id'])
-                    except discord.NotFound:
-                        continue
-            except discord.NotFound:
-                continue
-            medal = "🥇" if pos == 1 else "🥈" if pos == 2 else "🥉" if pos == 3 else f"{pos}."
-            embed.add_field(
-                name=f"{medal} **{(m.nick or m.display_name)}**: {d['wins']}W | {d['losses']}L | {d['draws']}D",
-                value=f"• Win: **{int(d['normal_win_percentage'])}**% | *🏋Win%: **{int(d['weighted_win_percentage'])}**%* | (Games: {d['games_played']}) | ID: {d['_id']}",
-                inline=False
-            )
-            current[d['_id']] = d['weighted_win_percentage']
-            pos += 1; fields += 1
-            if fields >= 25:
-                embeds.append(embed)
-                embed = discord.Embed(title=f"Player Leaderboard - {readable}{title_suffix}", color=0xFF0000 if IS_DEV else 0x00FF00)
-                fields = 0
-        if fields:
-            embeds.append(embed)
-
-        if period == "1m" and prev_start and prev_end:
-            prev_pipe = [
-                {"$match": {"date": {"$gte": prev_start, "$lt": prev_end}}},
-                {"$group": {"_id": "$player_id",
-                            "games_played": {"$sum": 1},
-                            "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                            "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                            "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}}}},
-                {"$addFields": {
-                    "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                    "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
-                }},
-            ]
-            async for d in individual_results.aggregate(prev_pipe):
-                cur = current.get(d['_id'])
-                if cur is None:
-                    continue
-                prev = d['weighted_win_percentage']; delta = cur - prev
-                mark = '🔄 0%' if -1 < delta < 1 else (f"{'⬆️' if delta>0 else '🔻'} {abs(int(delta))}%")
-                for em in embeds:
-                    for i, field in enumerate(em.fields):
-                        if f"ID: {d['_id']}" in field.value:
-                            em.set_field_at(
-                                i,
-                                name=field.name,
-                                value=field.value.replace(f"**{int(cur)}**%*", f"**{int(cur)}**%* ({mark})"),
-                                inline=field.inline,
-                            )
-
-        # strip IDs
-        for em in embeds:
-            for i, field in enumerate(em.fields):
-                em.set_field_at(i, name=field.name, value=field.value.split(" | ID:")[0], inline=field.inline)
-        if not embeds:
-            embeds = [discord.Embed(title=f"Player Leaderboard - {readable}{title_suffix}", description="No results found.", color=0xFF0000 if IS_DEV else 0x00FF00)]
-        for i, e in enumerate(embeds):
-            if i:
-                e.title = None
+        rows = await self._rows("player", period, postban)
+        names = await member_resolver.resolve(ctx.guild, [d["_id"] for d in rows])
+        embeds = render_leaderboard(
+            f"Player Leaderboard - {format_period(period)}{' (POST-BAN)' if postban else ''}",
+            rows,
+            lambda d: names.get(d["_id"]),  # departed members drop out
+            kind="player",
+            color=0xFF0000 if IS_DEV else 0x00FF00,
+        )
         await ctx.respond(embeds=embeds, ephemeral=should_be_ephemeral(ctx))
 
     async def show_decks(self, ctx, period, postban):
-        start = get_period_start(period, postban)
-        readable = format_period(period)
-        title_suffix = " (POST-BAN)" if postban else ""
-        result_limit = 40 if period != "1m" else None
-        prev_start, prev_end = previous_month_window(period)
         await ctx.defer(ephemeral=should_be_ephemeral(ctx))
+        rows = await self._rows("deck", period, postban)
+        embeds = render_leaderboard(
+            f"Decks Leaderboard - {format_period(period)}{' (POST-BAN)' if postban else ''}",
+            rows,
+            lambda d: d.get("name") or d["_id"],
+            kind="deck",
+            color=0xFF0000 if IS_DEV else 0x00FF00,
+        )
+        await ctx.respond(embeds=embeds, ephemeral=should_be_ephemeral(ctx))
 
-        pipeline = [
-            {"$match": {"date": {"$gte": start}}},
-            {"$group": {"_id": "$deck_name",
-                        "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                        "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                        "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                        "games_played": {"$sum": 1}}},
-            {"$addFields": {
-                "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                "normal_win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
-                "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
-            }},
-            {"$match": {"games_played": {"$gte": 15}}},
-            {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
-        ]
-        if result_limit:
-            pipeline.append({"$limit": result_limit})
-
-        embeds, embed, pos, fields = [], discord.Embed(title=f"Decks Leaderboard - {readable}{title_suffix}", color=0xFF0000 if IS_DEV else 0x00FF00), 1, 0
-        current = {}
-        async for d in individual_results.aggregate(pipeline):
-            name = d['_id']
-            medal = "🥇" if pos == 1 else "🥈" if pos == 2 else "🥉" if pos == 3 else f"{pos}."
-            embed.add_field(
-                name=f"{medal} {name}: {d['wins']}W | {d['losses']}L | {d['draws']}D",
-                value=f"• W: **{int(d['normal_win_percentage'])}**% | *🏋W: **{int(d['weighted_win_percentage'])}**%* | (Games: {d['games_played']}) | ID: {name}",
-                inline=False
-            )
-            current[name] = d['weighted_win_percentage']
-            pos += 1; fields += 1
-            if fields >= 25:
-                embeds.append(embed)
-                embed = discord.Embed(title=f"Decks Leaderboard - {readable}{title_suffix}", color=0xFF0000 if IS_DEV else 0x00FF00)
-                fields = 0
-        if fields:
-            embeds.append(embed)
-
-        if period == "1m" and prev_start and prev_end:
-            prev_pipe = [
-                {"$match": {"date": {"$gte": prev_start, "$lt": prev_end}}},
-                {"$group": {"_id": "$deck_name",
-                            "games_played": {"$sum": 1},
-                            "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                            "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                            "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}}}},
-                {"$addFields": {
-                    "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                    "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
-                }},
-            ]
-            async for d in individual_results.aggregate(prev_pipe):
-                cur = current.get(d['_id'])
-                if cur is None:
-                    continue
-                prev = d['weighted_win_percentage']; delta = cur - prev
-                mark = '🔄 0%' if -1 < delta < 1 else (f"{'⬆️' if delta>0 else '🔻'} {abs(int(delta))}%")
-                for em in embeds:
-                    for i, field in enumerate(em.fields):
-                        if f"ID: {d['_id']}" in field.value:
-                            em.set_field_at(
-                                i,
-                                name=field.name,
-                                value=field.value.replace(f"**{int(cur)}**%*", f"**{int(cur)}**%* ({mark})"),
-                                inline=field.inline,
-                            )
-
-        # strip IDs
-        for em in embeds:
-            for i, field in enumerate(em.fields):
-                em.set_field_at(i, name=field.name, value=field.value.split(" | ID:")[0], inline=field.inline)
-        if not embeds:
-            embeds = [discord.Embed(title=f"Decks Leaderboard - {readable}{title_suffix}", description="No results found.", color=0xFF0000 if IS_DEV else 0x00FF00)]
-        for i, e in enumerate(embeds):
-            if i:
-                e.title = None
+    @slash_command(guild_ids=[GUILD_ID], name="ratings", description="Elo ratings for players or decks")
+    async def ratings(
+        self,
+        ctx: discord.ApplicationContext,
+        type: Annotated[str, Option(str, "Type", choices=["players", "decks"])],
+        min_games: Annotated[int, Option(int, "Minimum games", default=RATING_MIN_GAMES, min_value=1)],
+    ):
+        await ctx.defer(ephemeral=should_be_ephemeral(ctx))
+        kind = "player" if type == "players" else "deck"
+        rows = await result_cache.get_or_compute(("ratings", kind, min_games), lambda: _fetch_ratings(kind, min_games))
+        if kind == "player":
+            names = await member_resolver.resolve(ctx.guild, [d["key"] for d in rows])
+            name_of = lambda d: names.get(d["key"])  # departed members drop out
+        else:
+            name_of = lambda d: d.get("name") or d["key"]
+        embeds = render_ratings(
+            f"{'Player' if kind == 'player' else 'Deck'} Ratings (min. {min_games} games)",
+            rows,
+            name_of,
+            color=0xFF0000 if IS_DEV else 0x00FF00,
+        )
         await ctx.respond(embeds=embeds, ephemeral=should_be_ephemeral(ctx))
 
 
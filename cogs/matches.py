@@ -6,19 +6,17 @@ from discord.ext import commands
 from discord.commands import slash_command, Option
 
 from config import GUILD_ID, IS_DEV
-from db import matches, individual_results, decks as decks_col, counters as counters_col
+from db import decks as decks_col, counters as counters_col, reserve_match_ids
 from utils.text import capitalize_words
+from utils.deck_index import deck_autocomplete, deck_index, load_deck_index
+from utils.match_docs import build_match_doc
+from utils.match_writes import insert_match, insert_matches
+from utils.batch_import import parse_pods, resolve_decks
+from utils.ephemeral import should_be_ephemeral
+from utils.perms import is_mod
 from pymongo import ReturnDocument
 
 
-# Top-level autocomplete to be used inside annotations
-async def deck_autocomplete(ctx: discord.AutocompleteContext):
-    cursor = decks_col.find({}, {"name": 1, "_id": 0})
-    names = [d["name"] async for d in cursor]
-    needle = (ctx.value or "").lower()
-    return [n for n in names if needle in n.lower()][:25]
-
-
 class Matches(commands.Cog):
     def __init__(self, bot): 
         self.bot = bot
@@ -40,32 +38,6 @@ class Matches(commands.Cog):
     async def deck_exists(self, name: str) -> bool:
         return await decks_col.find_one({"name": name}) is not None
 
-    async def insert_match_result(self, match_details: dict):
-        await matches.insert_one(match_details)
-        # denormalized individual results
-        for p in match_details["players"]:
-            await individual_results.insert_one(
-                {
-                    "player_id": p["player_id"],
-                    "deck_name": p["deck_name"],
-                    "seat": p["position"],
-                    "result": p["result"],
-                    "match_id": match_details["match_id"],
-                    "date": match_details["date"],
-                }
-            )
-        # ensure players exist in deck doc and update W/L/D
-        for p in match_details["players"]:
-            exists = await decks_col.find_one({"name": p["deck_name"], "players.player_id": p["player_id"]})
-            if not exists:
-                await decks_col.update_one(
-                    {"name": p["deck_name"]},
-                    {"$addToSet": {"players": {"player_id": p["player_id"], "wins": 0, "losses": 0, "draws": 0}}},
-                )
-            field = {"win": "players.$.wins", "loss": "players.$.losses", "draw": "players.$.draws"}.get(p["result"])
-            if field:
-                await decks_col.update_one({"name": p["deck_name"], "players.player_id": p["player_id"]}, {"$inc": {field: 1}})
-
     @slash_command(guild_ids=[GUILD_ID], name="track", description="Track a 4-player match.")
     async def track(
         self,
@@ -92,24 +64,10 @@ class Matches(commands.Cog):
 
         match_id = await self.get_next_match_id()
 
-        def res(i: int) -> str:
-            if winner == f"Player {i}":
-                return "win"
-            if winner == "Draw":
-                return "draw"
-            return "loss"
-
-        md = {
-            "match_id": match_id,
-            "players": [
-                {"player_id": player1.id, "deck_name": deck1, "position": 1, "result": res(1)},
-                {"player_id": player2.id, "deck_name": deck2, "position": 2, "result": res(2)},
-                {"player_id": player3.id, "deck_name": deck3, "position": 3, "result": res(3)},
-                {"player_id": player4.id, "deck_name": deck4, "position": 4, "result": res(4)},
-            ],
-            "date": datetime.now(timezone.utc),
-        }
-        await self.insert_match_result(md)
+        seats = [(player1.id, deck1), (player2.id, deck2), (player3.id, deck3), (player4.id, deck4)]
+        winner_idx = None if winner == "Draw" else int(winner.split()[-1]) - 1
+        md = build_match_doc(match_id, seats, winner_idx, datetime.now(timezone.utc))
+        await insert_match(md)
 
         d1, d2, d3, d4 = map(capitalize_words, [deck1, deck2, deck3, deck4])
         mapping = {"Player 1": player1, "Player 2": player2, "Player 3": player3, "Player 4": player4}
@@ -133,6 +91,74 @@ class Matches(commands.Cog):
                 if timer_cog.is_user_in_timer(str(ctx.author.id), timer_id):
                     await timer_cog.set_timer_stopped(timer_id)
 
+    @slash_command(guild_ids=[GUILD_ID], name="trackbatch", description="Log many pods from a CSV/JSON file. (Mods only)")
+    async def trackbatch(
+        self,
+        ctx: discord.ApplicationContext,
+        file: Annotated[discord.Attachment, Option(discord.Attachment, "CSV/JSON: player1-4, deck1-4, winner (1-4 or draw), optional date")],
+    ):
+        if not is_mod(ctx.author):
+            await ctx.respond(embed=discord.Embed(
+                title="Permission Denied",
+                description="You do not have permission to use this command.",
+                color=0xFF0000), ephemeral=True)
+            return
+
+        eph = should_be_ephemeral(ctx)
+        await ctx.defer(ephemeral=eph)
+
+        if not file.filename.lower().endswith((".csv", ".json")):
+            await ctx.followup.send("Please attach a `.csv` or `.json` file.", ephemeral=True)
+            return
+
+        pods, errors = parse_pods(file.filename, await file.read())
+        if not errors:
+            # one read of the deck names for the whole batch, then in-memory lookups
+            await load_deck_index(decks_col, force=True)
+            unknown = resolve_decks(pods, deck_index.resolve)
+            if unknown:
+                errors.append("Unknown decks: " + ", ".join(f"`{d}`" for d in unknown))
+
+        if errors:
+            shown = errors[:15]
+            if len(errors) > len(shown):
+                shown.append(f"…and {len(errors) - len(shown)} more.")
+            await ctx.followup.send(embed=discord.Embed(
+                title="Batch Not Imported",
+                description="Nothing was written. Fix these and upload again:\n" + "\n".join(shown),
+                color=0xFF0000), ephemeral=eph)
+            return
+
+        first_id = await reserve_match_ids(len(pods))
+        now = datetime.now(timezone.utc)
+        mds = [
+            build_match_doc(first_id + i, pod["seats"], pod["winner"], pod["date"] or now)
+            for i, pod in enumerate(pods)
+        ]
+        await insert_matches(mds)
+
+        draws = sum(1 for pod in pods if pod["winner"] is None)
+        deck_counts: dict[str, int] = {}
+        for pod in pods:
+            for _, deck in pod["seats"]:
+                deck_counts[deck] = deck_counts.get(deck, 0) + 1
+        top = sorted(deck_counts.items(), key=lambda kv: (-kv[1], kv[0].lower()))[:5]
+
+        embed = discord.Embed(
+            title="Batch Logged",
+            description=(f"**{len(mds)}** games logged.\n"
+                         f"Game IDs: **{first_id}** – **{first_id + len(mds) - 1}**\n"
+                         f"Decisive: **{len(mds) - draws}** | Draws: **{draws}**"),
+            color=0xFF0000 if IS_DEV else 0x00FF00,
+        )
+        embed.add_field(
+            name="Most played decks",
+            value="\n".join(f"• {capitalize_words(d)} ({n})" for d, n in top),
+            inline=False,
+        )
+        await ctx.followup.send(embed=embed, ephemeral=eph)
+
+
 
 def setup(bot):
     bot.add_cog(Matches(bot))
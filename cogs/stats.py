@@ -1,254 +1,90 @@
-from typing import Annotated
+import logging
+from typing import Annotated, Any, Dict, List
 
 import discord
 from discord.ext import commands
 from discord.commands import slash_command, Option
 
-from config import GUILD_ID, IS_DEV
-from db import individual_results, decks
+from config import GUILD_ID, IS_DEV, ANALYTICS_BACKEND
+from db import individual_results, matches
 from utils.time_ranges import get_period_start, format_period
-from utils.text import capitalize_words, paginate_text
-from utils.views import PaginatorView
+from utils.text import capitalize_words, deck_key
+from utils.views import LazyPaginatorView
 from utils.ephemeral import should_be_ephemeral
-from typing import Annotated, List, Dict, Any
-
+from utils.deck_index import deck_autocomplete
+from utils.result_cache import result_cache, period_key
+from utils.members import member_resolver
+from utils.match_docs import seat_summary
+from utils.rollups import seat_split, eras_for, archive_rows
+from utils.analytics import ensure_loaded
+from utils.headtohead import ensure_loaded as load_headtohead
+from utils.player_stats import (
+    GAMES_PER_PAGE,
+    player_stats_pipeline,
+    shape_player_stats,
+    games_page_pipeline,
+    shape_games,
+    next_cursor,
+    render_games_page,
+    deck_seats_pipeline,
+    deck_top_players_pipeline,
+)
+
+log = logging.getLogger("ca_match_logger")
 
 
 class Stats(commands.Cog):
     def __init__(self, bot): 
         self.bot = bot
-        
-    async def deck_autocomplete(ctx: discord.AutocompleteContext):
-        cursor = decks.find({}, {"name": 1, "_id": 0})
-        all_decks = [doc["name"] async for doc in cursor]
-        q = (ctx.value or "").lower()
-        return [d for d in all_decks if q in d.lower()]
-
 
-    async def top_10_decks_for_player_using_pipeline(
-        self,
-        player_id: int | str,
-        *,
-        period: str,
-        postban: bool,
-        min_games: int = 0,  # set >0 if you want to ignore tiny samples
-    ) -> List[Dict[str, Any]]:
-        pid_str = str(player_id)
-        pid_vals: List[Any] = [pid_str]
-        try:
-            pid_vals.append(int(pid_str))
-        except Exception:
-            pass
-
-        start = get_period_start(period, postban)
-        match_stage: Dict[str, Any] = {"player_id": {"$in": pid_vals}}
-        if start:
-            match_stage["date"] = {"$gte": start}
-
-        pipeline: List[Dict[str, Any]] = [
-            {"$match": match_stage},
-            {"$group": {
-                "_id": "$deck_name",
-                "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                "games_played": {"$sum": 1},
-            }},
-            {"$addFields": {
-                "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                "normal_win_percentage": {
-                    "$cond": [
-                        {"$gt": ["$games_played", 0]},
-                        {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
-                        0,
-                    ]
-                },
-                "weighted_win_percentage": {
-                    "$cond": [
-                        {"$gt": ["$games_played", 0]},
-                        {"$multiply": [
-                            {"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]},
-                            100,
-                        ]},
-                        0,
-                    ]
-                },
-            }},
-        ]
-
-        # Optional: filter by minimum games
-        if min_games > 0:
-            pipeline.append({"$match": {"games_played": {"$gte": min_games}}})
-
-        # Tie-breaks: weighted desc, then games desc, then name asc
-        pipeline.extend([
-            {"$sort": {"weighted_win_percentage": -1, "games_played": -1, "_id": 1}},
-            {"$limit": 10},
-        ])
-
-        out: List[Dict[str, Any]] = []
-        async for doc in individual_results.aggregate(pipeline):
-            out.append({
-                "deck_name": capitalize_words(doc["_id"] or "Unknown"),
-                "wins": int(doc["wins"]),
-                "losses": int(doc["losses"]),
-                "draws": int(doc["draws"]),
-                "games_played": int(doc["games_played"]),
-                "win_percentage": float(doc["normal_win_percentage"]),
-                "weighted_win_percentage": float(doc["weighted_win_percentage"]),
-            })
-        return out
-
-
-
-    
     async def fetch_deck_stats(self, deck_name: str, period: str, postban: bool):
         start = get_period_start(period, postban)
-
-        totals_pipe = [
-            {
-                "$match": {
-                    "deck_name": {"$regex": f"^{deck_name}$", "$options": "i"},
-                    "date": {"$gte": start},
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "wins":     {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                    "losses":   {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                    "draws":    {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                    "seat1":    {"$sum": {"$cond": [{"$eq": ["$seat", 1]}, 1, 0]}},
-                    "seat2":    {"$sum": {"$cond": [{"$eq": ["$seat", 2]}, 1, 0]}},
-                    "seat3":    {"$sum": {"$cond": [{"$eq": ["$seat", 3]}, 1, 0]}},
-                    "seat4":    {"$sum": {"$cond": [{"$eq": ["$seat", 4]}, 1, 0]}},
-                    "winseat1": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 1]}, {"$eq": ["$result", "win"]}]} , 1, 0]}},
-                    "winseat2": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 2]}, {"$eq": ["$result", "win"]}]} , 1, 0]}},
-                    "winseat3": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 3]}, {"$eq": ["$result", "win"]}]} , 1, 0]}},
-                    "winseat4": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 4]}, {"$eq": ["$result", "win"]}]} , 1, 0]}},
-                }
-            },
-        ]
-        total_doc = await individual_results.aggregate(totals_pipe).to_list(length=1)
-        if not total_doc:
+        if ANALYTICS_BACKEND == "numpy":
+            seats, top_players = (await ensure_loaded(individual_results)).deck_stats(deck_name, start)
+            totals = seat_summary(seats)
+            if not totals or not (totals["wins"] + totals["losses"] + totals["draws"]):
+                return None
+            return {"totals": totals, "top_players": top_players}
+        if period == "all":
+            # whole eras: seat split is a point lookup on seat_stats
+            seats = await seat_split("deck", deck_key(deck_name), eras_for(postban))
+        else:
+            seats = await individual_results.aggregate(deck_seats_pipeline(deck_name, start)).to_list(length=None)
+        return await self._with_top_players(deck_name, start, seat_summary(seats), archived=period == "all")
+
+    async def _with_top_players(self, deck_name: str, start, totals: dict | None, archived: bool = False):
+        if not totals or not (totals["wins"] + totals["losses"] + totals["draws"]):
             return None
-        totals = total_doc[0]
-
-        top_pipe = [
-            {
-                "$match": {
-                    "deck_name": {"$regex": f"^{deck_name}$", "$options": "i"},
-                    "date": {"$gte": start},
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$player_id",
-                    "games_played": {"$sum": 1},
-                    "wins":   {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                    "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                    "draws":  {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                }
-            },
-            {
-                "$addFields": {
-                    "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                    "win_percentage": {
-                        "$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]
-                    },
-                    "weighted_win_percentage": {
-                        "$multiply": [
-                            {
-                                "$divide": [
-                                    {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                                    "$games_played",
-                                ]
-                            },
-                            100,
-                        ]
-                    },
-                }
-            },
-            {"$match": {"games_played": {"$gte": 5}}},
-            {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
-            {"$limit": 10},
-        ]
+
+        if archived:
+            top_players = await archive_rows({"deck_key": deck_key(deck_name)}, start, "player_id", min_games=5, limit=10)
+            return {"totals": totals, "top_players": top_players}
+
+        top_pipe = deck_top_players_pipeline(deck_name, start)
         top_players = [d async for d in individual_results.aggregate(top_pipe)]
 
         return {"totals": totals, "top_players": top_players}
 
-    
 
     async def fetch_player_stats(self, player_id: int, period: str, postban: bool, deck_filter: str | None):
-        start_date = get_period_start(period, postban)
-        match_stage = {"player_id": player_id, "date": {"$gte": start_date}}
-        if deck_filter:
-            match_stage["deck_name"] = {"$regex": f"^{deck_filter}$", "$options": "i"}
-
-        top_decks = []
-        if not deck_filter:
-            pipeline = [
-                {"$match": match_stage},
-                {"$group": {"_id": "$deck_name",
-                            "wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                            "losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                            "draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                            "games_played": {"$sum": 1}}},
-                {"$addFields": {
-                    "weighted_wins": {"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]},
-                    "normal_win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
-                    "weighted_win_percentage": {"$multiply": [{"$divide": [{"$add": ["$wins", {"$multiply": ["$draws", 0.143]}]}, "$games_played"]}, 100]}
-                }},
-                {"$sort": {"weighted_win_percentage": -1}},
-                {"$limit": 10},
-            ]
-            async for d in individual_results.aggregate(pipeline):
-                top_decks.append({
-                    "deck_name": capitalize_words(d['_id']),
-                    "wins": d['wins'],
-                    "losses": d['losses'],
-                    "draws": d['draws'],
-                    "games_played": d['games_played'],
-                    "win_percentage": d['normal_win_percentage'],
-                    "weighted_win_percentage": d['weighted_win_percentage'],
-                })
-
-        seat_pipeline = [
-            {"$match": match_stage},
-            {"$group": {"_id": None,
-                        "total_wins": {"$sum": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]}},
-                        "total_losses": {"$sum": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]}},
-                        "total_draws": {"$sum": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}},
-                        "seat1": {"$sum": {"$cond": [{"$eq": ["$seat", 1]}, 1, 0]}},
-                        "seat2": {"$sum": {"$cond": [{"$eq": ["$seat", 2]}, 1, 0]}},
-                        "seat3": {"$sum": {"$cond": [{"$eq": ["$seat", 3]}, 1, 0]}},
-                        "seat4": {"$sum": {"$cond": [{"$eq": ["$seat", 4]}, 1, 0]}},
-                        "winseat1": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 1]}, {"$eq": ["$result", "win"]}]}, 1, 0]}},
-                        "winseat2": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 2]}, {"$eq": ["$result", "win"]}]}, 1, 0]}},
-                        "winseat3": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 3]}, {"$eq": ["$result", "win"]}]}, 1, 0]}},
-                        "winseat4": {"$sum": {"$cond": [{"$and": [{"$eq": ["$seat", 4]}, {"$eq": ["$result", "win"]}]}, 1, 0]}}}}]
-        agg = await individual_results.aggregate(seat_pipeline).to_list(length=1)
-        if not agg:
-            return None
-
-        out = {**agg[0],
-               "wins": agg[0]['total_wins'], "losses": agg[0]['total_losses'], "draws": agg[0]['total_draws'],
-               "top_10_decks": top_decks}
-
-        if deck_filter:
-            games = await individual_results.aggregate([
-                {"$match": {**match_stage, "match_id": {"$ne": None}}},
-                {"$lookup": {"from": "matches", "localField": "match_id", "foreignField": "match_id", "as": "game_data"}},
-                {"$unwind": "$game_data"},
-                {"$project": {"match_id": 1, "players": "$game_data.players", "date": "$game_data.date"}},
-            ]).to_list(None)
-            out["games"] = [{
-                "id": g['match_id'],
-                "date": g['date'],
-                "players": [{"deck_name": capitalize_words(p.get("deck_name", "Unknown")),
-                             "winner": p.get("result") == "win"} for p in g['players']]
-            } for g in games]
-        return out
+        if ANALYTICS_BACKEND == "numpy":
+            start = get_period_start(period, postban)
+            doc = (await ensure_loaded(individual_results)).player_stats(player_id, start, deck_filter)
+            if deck_filter:
+                # the engine holds no match rosters; the first dump page still comes from Mongo
+                doc["games"] = await individual_results.aggregate(
+                    games_page_pipeline(player_id, start, deck_filter)).to_list(length=None)
+            return shape_player_stats(doc)
+        start = get_period_start(period, postban)
+        if period == "all" and not deck_filter:
+            # whole eras: seats from seat_stats, top decks from the monthly archive + live tail
+            return shape_player_stats({
+                "seats": await seat_split("player", player_id, eras_for(postban)),
+                "top_decks": await archive_rows({"player_id": player_id}, start, "deck_key", limit=10),
+            })
+        pipeline = player_stats_pipeline(player_id, start, deck_filter)
+        doc = (await individual_results.aggregate(pipeline).to_list(length=1))[0]
+        return shape_player_stats(doc)
 
 
     @slash_command(guild_ids=[GUILD_ID], name="playerstats", description="Get stats for a player")
@@ -296,9 +132,7 @@ class Stats(commands.Cog):
 
         # When not filtering to one deck: append Top 10
         if not individual_deck:
-            top = await self.top_10_decks_for_player_using_pipeline(
-                player.id, period=period, postban=postban, min_games=0  # bump to e.g. 5 if you want
-            )
+            top = stats["top_10_decks"]
             if top:
                 section = ["\n**Top 10 Decks:**"]
                 for d in top:
@@ -311,7 +145,7 @@ class Stats(commands.Cog):
                 embed.description += "\n" + "\n".join(section)
 
 
-        # If filtering to one deck: keep your existing dump behavior
+        # If filtering to one deck: first dump page came with the stats, the rest load on demand
         if individual_deck:
             games = stats.get("games", [])
             if not games:
@@ -321,46 +155,38 @@ class Stats(commands.Cog):
 
             # add a hint + button
             embed.description += (
-                f"\n\n🗃 **{len(games)} games** found with **{fmt_name}**.\n"
+                f"\n\n🗃 **{stats['games_total']} games** found with **{fmt_name}**.\n"
                 f"Press **See full dump** to view details."
             )
 
+            start = get_period_start(period, postban)
+            target_id = player.id
+
+            async def fetch_page(cursor):
+                docs = await individual_results.aggregate(
+                    games_page_pipeline(target_id, start, individual_deck, after=cursor)
+                ).to_list(length=GAMES_PER_PAGE)
+                return render_games_page(shape_games(docs), individual_deck), next_cursor(docs)
+
             class SeeDumpView(discord.ui.View):
-                def __init__(self, author: discord.Member, games_list: list[dict], target_deck: str):
+                def __init__(self, author: discord.Member):
                     super().__init__(timeout=60)
                     self.author = author
-                    self.games = games_list
-                    self.target = (target_deck or "").lower()
-
-                def _entries(self) -> list[str]:
-                    out: list[str] = []
-                    for g in self.games:
-                        d = g["date"]
-                        ds = f"{d.strftime('%b')} {d.day}, {d.year}"
-                        txt = f"**Game ID**: `{g['id']}` - `{ds}`\n"
-                        for i, p in enumerate(g["players"], start=1):
-                            name = p.get("deck_name", "Unknown")
-                            bold = f"**{name}**" if name.lower() == self.target else name
-                            star = "🏆" if p.get("winner") else ""
-                            txt += f"Seat {i}: {bold} {star}\n"
-                        out.append(txt.strip())
-                    return out
 
                 @discord.ui.button(label="📜 See full dump", style=discord.ButtonStyle.primary)
                 async def see_dump(self, _btn: discord.ui.Button, interaction: discord.Interaction):
                     if interaction.user.id != self.author.id:
                         await interaction.response.send_message("This button isn’t for you 👀", ephemeral=True)
                         return
-                    pages = paginate_text(self._entries())
-                    first = discord.Embed(
-                        title=f"📜 Game Dump (Page 1/{len(pages)})",
-                        description=pages[0],
-                        color=0x00FFCC,
+                    view = LazyPaginatorView(
+                        author=self.author,
+                        fetch_page=fetch_page,
+                        total_pages=-(-stats["games_total"] // GAMES_PER_PAGE),
                     )
-                    view = PaginatorView(author=self.author, pages=pages)
-                    await interaction.response.send_message(embed=first, view=view, ephemeral=True)
+                    view.seed(render_games_page(games, individual_deck), stats["games_cursor"])
+                    await interaction.response.send_message(embed=view.embed(), view=view, ephemeral=True)
 
-            view = SeeDumpView(author=ctx.author, games_list=games, target_deck=individual_deck)
+            view = SeeDumpView(author=ctx.author)
             await ctx.respond(embed=embed, view=view, ephemeral=eph)
             return
 
@@ -377,7 +203,10 @@ class Stats(commands.Cog):
     ):
         await ctx.defer(ephemeral=should_be_ephemeral(ctx))
 
-        stats = await self.fetch_deck_stats(deck, period, postban)
+        stats = await result_cache.get_or_compute(
+            ("deckstats", deck_key(deck), *period_key(period, postban)),
+            lambda: self.fetch_deck_stats(deck, period, postban),
+        )
         readable = format_period(period)
         title_suffix = " (POST-BAN)" if postban else ""
 
@@ -410,18 +239,13 @@ class Stats(commands.Cog):
             "**Top 10 Players:**\n"
         )
 
-        # Resolve member names efficiently
-        guild = ctx.guild
+        # Resolve member names in one batch; departed players are skipped
+        names = await member_resolver.resolve(ctx.guild, [d["_id"] for d in stats["top_players"]])
         lines = []
         for d in stats["top_players"]:
-            pid = d["_id"]
-            m = guild.get_member(pid)
-            if not m:
-                try:
-                    m = await guild.fetch_member(pid)
-                except discord.NotFound:
-                    continue
-            display = (m.nick or m.display_name)
+            display = names.get(d["_id"])
+            if display is None:
+                continue
             lines.append(
                 f"- **{display}** - {d['wins']} W | {d['losses']} L | {d['draws']} D - "
                 f"Games Played: {d['games_played']}, Win%: {int(d['win_percentage'])}%, 🏋Win%: {int(d['weighted_win_percentage'])}%"
@@ -479,6 +303,92 @@ class Stats(commands.Cog):
 
         await ctx.respond(embed=embed, ephemeral=should_be_ephemeral(ctx))
 
+    @slash_command(guild_ids=[GUILD_ID], name="headtohead", description="How two players fare when they share a pod")
+    async def headtohead(
+        self,
+        ctx: discord.ApplicationContext,
+        player: discord.Member,
+        opponent: Annotated[discord.Member | None, Option(discord.Member, "Defaults to you", required=False)] = None,
+    ):
+        opponent = opponent or ctx.author
+        if opponent.id == player.id:
+            await ctx.respond("Pick two different players.", ephemeral=True)
+            return
+        eph = should_be_ephemeral(ctx)
+        await ctx.defer(ephemeral=eph)  # the first call after a rebuild reloads the matrices from matches
+        p = (await load_headtohead(matches)).pair("player", player.id, opponent.id)
+        if not p["games"]:
+            await ctx.followup.send(f"{player.display_name} and {opponent.display_name} haven't shared a pod yet.",
+                                    ephemeral=eph)
+            return
+
+        def pct(n):
+            return n / p["games"] * 100
+
+        embed = discord.Embed(
+            title=f"{player.display_name} vs {opponent.display_name}",
+            description=(
+                f"**Pods together:** {p['games']}\n\n"
+                f"**{player.display_name}** won **{p['a_wins']}** ({pct(p['a_wins']):.0f}%)\n"
+                f"**{opponent.display_name}** won **{p['b_wins']}** ({pct(p['b_wins']):.0f}%)\n"
+                f"Someone else won **{p['other_wins']}** | Draws **{p['draws']}**"
+            ),
+            color=0xFF0000 if IS_DEV else 0x00FF00,
+        )
+        await ctx.followup.send(embed=embed, ephemeral=eph)
+
+    @slash_command(guild_ids=[GUILD_ID], name="matchup", description="How a deck does when another deck is in the pod")
+    async def matchup(
+        self,
+        ctx: discord.ApplicationContext,
+        deck: Annotated[str, Option(str, "Deck", autocomplete=deck_autocomplete)],
+        against: Annotated[str | None, Option(str, "Opposing deck (omit for best/worst pods)",
+                                              autocomplete=deck_autocomplete, required=False)] = None,
+        min_games: Annotated[int, Option(int, "Minimum pods together (list mode)", default=5, min_value=1)] = 5,
+    ):
+        eph = should_be_ephemeral(ctx)
+        await ctx.defer(ephemeral=eph)
+        hh = await load_headtohead(matches)
+        color = 0xFF0000 if IS_DEV else 0x00FF00
+        name = capitalize_words(deck)
+
+        if against:
+            p = hh.pair("deck", deck, against)
+            if not p["games"]:
+                await ctx.followup.send(f"{name} and {capitalize_words(against)} haven't shared a pod yet.",
+                                        ephemeral=eph)
+                return
+            other = capitalize_words(against)
+            embed = discord.Embed(
+                title=f"{name} with {other} in the pod",
+                description=(
+                    f"**Pods together:** {p['games']}\n\n"
+                    f"**{name}** won **{p['a_wins']}** ({p['a_wins'] / p['games'] * 100:.0f}%)\n"
+                    f"**{other}** won **{p['b_wins']}** ({p['b_wins'] / p['games'] * 100:.0f}%)\n"
+                    f"Other decks won **{p['other_wins']}** | Draws **{p['draws']}**"
+                ),
+                color=color,
+            )
+            await ctx.followup.send(embed=embed, ephemeral=eph)
+            return
+
+        rows = hh.opponents("deck", deck, min_games=min_games)
+        if not rows:
+            await ctx.followup.send(f"No pods with at least {min_games} games for {name}.", ephemeral=eph)
+            return
+
+        def fmt(rs):
+            return "\n".join(
+                f"{capitalize_words(r['name'] or r['key'])}: **{r['win_percentage']:.0f}%** "
+                f"({r['wins']}W in {r['games']})" for r in rs
+            ) or "_none_"
+
+        embed = discord.Embed(title=f"{name} — win % by deck in the pod (min. {min_games})", color=color)
+        worst = min(10, len(rows) // 2)
+        embed.add_field(name="Best pods", value=fmt(rows[:min(10, len(rows) - worst)]), inline=False)
+        embed.add_field(name="Worst pods", value=fmt(rows[len(rows) - worst:][::-1]), inline=False)
+        await ctx.followup.send(embed=embed, ephemeral=eph)
+
 
 def setup(bot):
     bot.add_cog(Stats(bot))
@@ -19,4 +19,13 @@ GUILD_ID = int(_req("GUILD_ID"))
 PRIVATE_CHANNEL_ID = int(os.getenv("PRIVATE_CHANNEL_ID")) if os.getenv("PRIVATE_CHANNEL_ID") else None
 ENV = os.getenv("ENV", "production").lower()
 IS_DEV = ENV == "development"
-MOXFIELD_USER_AGENT = os.getenv("MOXFIELD_USER_AGENT")
\ No newline at end of file
+MOXFIELD_USER_AGENT = os.getenv("MOXFIELD_USER_AGENT")
+
+# "mongo" (aggregations/derived stores) or "numpy" (utils.analytics in-memory engine)
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "mongo").lower()
+
+# /generalstats era cut-overs (comma-separated YYYY-MM-DD); the default is the 2024-09-24 ban
+ERA_CUTOFFS = os.getenv("ERA_CUTOFFS", "2024-09-24")
+
+# nightly /verifydata run: "report" (report only), "repair" (fix and report) or "off"
+VERIFY_NIGHTLY = os.getenv("VERIFY_NIGHTLY", "report").lower()
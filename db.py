@@ -2,8 +2,8 @@
 import os
 import motor.motor_asyncio
 from config import MONGO_URI, IS_DEV
-from pymongo import IndexModel, ASCENDING, DESCENDING
-from pymongo.errors import DuplicateKeyError
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 _client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
 
@@ -21,6 +21,15 @@ matches = db.matches
 counters = db.counters
 individual_results = db.individual_results
 event_registrations = db.event_registrations
+migrations = db.migrations
+daily_rollups = db.daily_rollups
+seat_stats = db.seat_stats
+ratings = db.ratings
+rating_checkpoints = db.rating_checkpoints
+monthly_summaries = db.monthly_summaries
+archive_months = db.archive_months
+deck_names = db.deck_names
+jobs = db.jobs
 
 # Funding collections
 funding_months = db.funding_months
@@ -38,6 +47,8 @@ async def ensure_indexes():
     # matches
     await matches.create_indexes([
         IndexModel([("match_id", ASCENDING)], unique=True, name="uniq_match_id"),
+        IndexModel([("players.deck_key", ASCENDING)], name="m_players_deck_key"),
+        IndexModel([("date", ASCENDING), ("match_id", ASCENDING)], name="m_date_match_id"),
     ])
 
     # individual_results
@@ -45,11 +56,50 @@ async def ensure_indexes():
         IndexModel([("match_id", ASCENDING), ("player_id", ASCENDING)], name="ir_match_player"),
         IndexModel([("player_id", ASCENDING), ("date", DESCENDING)], name="ir_player_date_desc"),
         IndexModel([("deck_name", ASCENDING), ("date", DESCENDING)], name="ir_deck_date_desc"),
+        IndexModel([("deck_key", ASCENDING), ("date", DESCENDING)], name="ir_deckkey_date_desc"),
+        IndexModel([("player_id", ASCENDING), ("deck_key", ASCENDING), ("date", DESCENDING)], name="ir_player_deckkey_date_desc"),
+        # date alone: /leaderboard all's raw head/tail around the archive, freezing a month
+        IndexModel([("date", ASCENDING)], name="ir_date"),
+    ])
+
+    # daily_rollups: one row per (kind, key, day); leaderboards range over day
+    await daily_rollups.create_indexes([
+        IndexModel([("kind", ASCENDING), ("key", ASCENDING), ("day", ASCENDING)], unique=True, name="uniq_rollup"),
+        IndexModel([("kind", ASCENDING), ("day", ASCENDING)], name="rollup_kind_day"),
+    ])
+
+    # seat_stats: one row per (kind, key, era, seat); reads are point lookups on kind+key
+    await seat_stats.create_indexes([
+        IndexModel([("kind", ASCENDING), ("key", ASCENDING), ("era", ASCENDING), ("seat", ASCENDING)], unique=True, name="uniq_seat_stat"),
+    ])
+
+    # ratings: one row per (kind, key); /ratings reads the top of rating_kind_rating
+    await ratings.create_indexes([
+        IndexModel([("kind", ASCENDING), ("key", ASCENDING)], unique=True, name="uniq_rating"),
+        IndexModel([("kind", ASCENDING), ("rating", DESCENDING)], name="rating_kind_rating"),
+    ])
+
+    # monthly_summaries: one row per (month, player, deck) for closed months; archive_months marks them
+    await monthly_summaries.create_indexes([
+        IndexModel([("month", ASCENDING), ("player_id", ASCENDING), ("deck_key", ASCENDING)], unique=True, name="uniq_month_player_deck"),
+        IndexModel([("player_id", ASCENDING), ("month", ASCENDING)], name="ms_player_month"),
+        IndexModel([("deck_key", ASCENDING), ("month", ASCENDING)], name="ms_deckkey_month"),
+    ])
+
+    # deck_names: logged spellings per deck_key with their row counts (orphan registry)
+    await deck_names.create_indexes([
+        IndexModel([("deck_key", ASCENDING), ("name", ASCENDING)], unique=True, name="uniq_deckkey_name"),
+    ])
+
+    # jobs: the worker claims the oldest active job
+    await jobs.create_indexes([
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="job_status_created"),
     ])
 
     # decks (ensure no dupes first if you make it unique)
     await decks.create_indexes([
         IndexModel([("name", ASCENDING)], unique=True, name="uniq_deck_name"),
+        IndexModel([("deck_key", ASCENDING)], name="deck_key"),
     ])
 
     # event_registrations
@@ -80,6 +130,64 @@ async def ensure_indexes():
     ])
 
 
+# ---------- validators ----------
+
+_PLAYER_ID = {"bsonType": ["int", "long"]}
+
+VALIDATORS = {
+    "individual_results": {"$jsonSchema": {
+        "bsonType": "object",
+        "required": ["player_id"],
+        "properties": {"player_id": _PLAYER_ID},
+    }},
+    "matches": {"$jsonSchema": {
+        "bsonType": "object",
+        "properties": {"players": {
+            "bsonType": "array",
+            "items": {"bsonType": "object", "required": ["player_id"], "properties": {"player_id": _PLAYER_ID}},
+        }},
+    }},
+}
+
+
+async def ensure_validators():
+    """
+    Reject writes whose player_id isn't an integer. "moderate" leaves any legacy
+    documents that were already invalid alone; the player_ids migration fixes those.
+    """
+    existing = set(await db.list_collection_names())
+    for name, validator in VALIDATORS.items():
+        if name in existing:
+            await db.command("collMod", name, validator=validator,
+                             validationLevel="moderate", validationAction="error")
+        else:
+            await db.create_collection(name, validator=validator,
+                                       validationLevel="moderate", validationAction="error")
+
+
+# ---------- transactions ----------
+
+_txn_supported = True
+
+
+async def run_in_transaction(fn):
+    """
+    Await `fn(session)` inside one multi-document transaction and return its result.
+    Standalone servers (local dev) can't run transactions: there we call `fn(None)`
+    instead and remember that, so callers never branch on the deployment topology.
+    """
+    global _txn_supported
+    if _txn_supported:
+        async with await _client.start_session() as session:
+            try:
+                return await session.with_transaction(fn)
+            except OperationFailure as e:
+                if e.code != 20:  # IllegalOperation: not a replica set / mongos
+                    raise
+                _txn_supported = False
+    return await fn(None)
+
+
 # ---------- counters helpers (safe + conflict-free) ----------
 
 async def get_max_match_id() -> int:
@@ -118,6 +226,31 @@ async def set_counter_to_max_match_id():
     )
 
 
+async def reserve_match_ids(count: int) -> int:
+    """
+    Reserve `count` consecutive match_ids with a single counter update.
+    Returns the first reserved id; the block is [first, first + count).
+    """
+    doc = await counters.find_one_and_update(
+        {"_id": "match_id"},
+        {"$inc": {"sequence_value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc["sequence_value"]) - count + 1
+
+
+async def next_job_id() -> int:
+    """Next id for the jobs collection (short, so mods can type it)."""
+    doc = await counters.find_one_and_update(
+        {"_id": "job_id"},
+        {"$inc": {"sequence_value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc["sequence_value"])
+
+
 # ---------- deletion helper ----------
 
 async def delete_match_cascade(match_id: int) -> int:
@@ -44,8 +44,13 @@ def load_opus() -> bool:
 
 load_opus()
 
-from config import DISCORD_BOT_TOKEN, LOG_LEVEL, GUILD_ID, IS_DEV
-from db import ping, ensure_indexes
+from config import DISCORD_BOT_TOKEN, LOG_LEVEL, GUILD_ID, IS_DEV, ANALYTICS_BACKEND
+from db import ping, ensure_indexes, decks, individual_results, matches, deck_names
+from utils.deck_index import load_deck_index
+from utils.analytics import ensure_loaded as load_analytics
+from utils.headtohead import ensure_loaded as load_headtohead
+from utils.deck_names import ensure_loaded as load_orphan_decks
+from migrations import run_pending as run_pending_migrations
 
 
 # --- Load Opus defensively (voice) ---
@@ -80,6 +85,7 @@ bot.load_extension("cogs.stats")
 bot.load_extension("cogs.leaderboard")
 bot.load_extension("cogs.funstuff")
 bot.load_extension("cogs.admin")
+bot.load_extension("cogs.jobs")
 bot.load_extension("cogs.general")
 bot.load_extension("cogs.events")
 bot.load_extension("cogs.funding_kofi")
@@ -105,6 +111,34 @@ async def on_ready():
         except Exception as e:
             log.exception("ensure_indexes() failed: %s", e)
 
+    try:
+        done = await run_pending_migrations()
+        if done:
+            log.info("Migrations applied: %s", done)
+    except Exception as e:
+        log.exception("Pending migrations failed: %s", e)
+
+    try:
+        idx = await load_deck_index(decks, force=True)
+        log.info("Deck index loaded (%d names)", len(idx))
+        orphans = await load_orphan_decks(deck_names, force=True)
+        log.info("Orphan deck registry loaded (%d orphans)", len(orphans.orphans()))
+    except Exception as e:
+        log.warning("Deck index warm-up failed (will load lazily): %s", e)
+
+    if ANALYTICS_BACKEND == "numpy":
+        try:
+            eng = await load_analytics(individual_results, force=True)
+            log.info("Analytics engine loaded (%d results)", len(eng))
+        except Exception as e:
+            log.warning("Analytics warm-up failed (will load lazily): %s", e)
+
+    try:
+        await load_headtohead(matches, force=True)
+        log.info("Head-to-head matrices loaded")
+    except Exception as e:
+        log.warning("Head-to-head warm-up failed (will load lazily): %s", e)
+
     await bot.change_presence(activity=discord.Game("(DEV) CA Match Logger" if IS_DEV else "CA Match Logger"))
     log.info("Logged in as %s (%s)", bot.user, bot.user.id)
 
@@ -0,0 +1,205 @@
+# migrations.py
+"""
+One-shot data migrations.
+
+Each migration streams only the documents that still need it and writes in
+unordered bulk batches, so it is safe to re-run. Completed migrations are
+recorded in the `migrations` collection and skipped afterwards; main.py runs
+whatever is pending on startup.
+
+    python migrations.py               # run everything pending
+    python migrations.py deck_keys     # (re-)run one migration
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict
+
+from pymongo import UpdateOne
+
+from db import decks, matches, individual_results, migrations as migrations_col, ensure_validators
+from utils.text import deck_key
+from utils.rollups import (
+    rebuild_daily_rollups, rebuild_seat_stats, rebuild_ratings, rebuild_deck_names, freeze_closed_months,
+)
+
+log = logging.getLogger("ca_match_logger")
+
+BATCH_SIZE = 500
+
+
+async def _stream_updates(coll, query: dict, projection: dict, make_update: Callable[[dict], dict | None]) -> int:
+    """Apply make_update(doc) to every matching doc in batched bulk writes; returns modified count."""
+    ops, modified = [], 0
+    async for doc in coll.find(query, projection):
+        upd = make_update(doc)
+        if upd:
+            ops.append(UpdateOne({"_id": doc["_id"]}, upd))
+        if len(ops) >= BATCH_SIZE:
+            modified += (await coll.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        modified += (await coll.bulk_write(ops, ordered=False)).modified_count
+    return modified
+
+
+# ---------- deck_keys ----------
+
+def _players_deck_keys(doc: dict) -> dict | None:
+    sets = {
+        f"players.{i}.deck_key": deck_key(p.get("deck_name"))
+        for i, p in enumerate(doc.get("players") or [])
+        if isinstance(p.get("deck_name"), str) and p.get("deck_key") != deck_key(p["deck_name"])
+    }
+    return {"$set": sets} if sets else None
+
+
+async def migrate_deck_keys() -> Dict[str, int]:
+    """Store the canonical deck_key next to every deck name."""
+    missing = {"deck_key": {"$exists": False}}
+    return {
+        "decks": await _stream_updates(
+            decks, missing, {"name": 1},
+            lambda d: {"$set": {"deck_key": deck_key(d.get("name"))}} if isinstance(d.get("name"), str) else None,
+        ),
+        "individual_results": await _stream_updates(
+            individual_results, missing, {"deck_name": 1},
+            lambda d: {"$set": {"deck_key": deck_key(d.get("deck_name"))}} if isinstance(d.get("deck_name"), str) else None,
+        ),
+        "matches": await _stream_updates(
+            matches, {"players": {"$elemMatch": missing}}, {"players": 1}, _players_deck_keys,
+        ),
+    }
+
+
+# ---------- player_ids ----------
+
+def _as_int(v) -> int | None:
+    if isinstance(v, int):
+        return v
+    try:
+        return int(str(v).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _ir_player_id(doc: dict) -> dict | None:
+    pid = _as_int(doc.get("player_id"))
+    if pid is None:
+        log.warning("player_ids: unparseable player_id %r in individual_results %s", doc.get("player_id"), doc["_id"])
+        return None
+    return {"$set": {"player_id": pid}}
+
+
+def _match_player_ids(doc: dict) -> dict | None:
+    sets = {}
+    for i, p in enumerate(doc.get("players") or []):
+        pid = _as_int(p.get("player_id"))
+        if isinstance(p.get("player_id"), str) and pid is not None:
+            sets[f"players.{i}.player_id"] = pid
+    return {"$set": sets} if sets else None
+
+
+def _deck_players(doc: dict) -> dict | None:
+    # str and int entries for the same person collapse into one after the cast
+    merged: Dict[int, Dict[str, int]] = {}
+    for p in doc.get("players") or []:
+        pid = _as_int(p.get("player_id"))
+        if pid is None:
+            continue
+        s = merged.setdefault(pid, {"wins": 0, "losses": 0, "draws": 0})
+        for k in s:
+            s[k] += int(p.get(k) or 0)
+    return {"$set": {"players": [{"player_id": pid, **vals} for pid, vals in merged.items()]}}
+
+
+async def migrate_player_ids() -> Dict[str, int]:
+    """Cast every stored player_id to int, then install validators so strings can't come back."""
+    is_str = {"$type": "string"}
+    counts = {
+        "individual_results": await _stream_updates(
+            individual_results, {"player_id": is_str}, {"player_id": 1}, _ir_player_id),
+        "matches": await _stream_updates(
+            matches, {"players.player_id": is_str}, {"players": 1}, _match_player_ids),
+        "decks": await _stream_updates(
+            decks, {"players.player_id": is_str}, {"players": 1}, _deck_players),
+    }
+    await ensure_validators()
+    return counts
+
+
+# ---------- derived stores ----------
+
+async def migrate_daily_rollups() -> Dict[str, int]:
+    """Backfill daily_rollups from matches; /track and the edit commands keep it current after."""
+    return {"daily_rollups": await rebuild_daily_rollups()}
+
+
+async def migrate_seat_stats() -> Dict[str, int]:
+    """Backfill seat_stats from matches; match writes keep it current after."""
+    return {"seat_stats": await rebuild_seat_stats()}
+
+
+async def migrate_ratings() -> Dict[str, int]:
+    """Replay every match into the ratings collection; /track keeps it current after."""
+    return {"ratings": await rebuild_ratings()}
+
+
+async def migrate_monthly_archive() -> Dict[str, int]:
+    """Compact every closed month into monthly_summaries; the Admin cog freezes new ones as they close."""
+    return {"months": await freeze_closed_months()}
+
+
+async def migrate_deck_names() -> Dict[str, int]:
+    """Count logged deck spellings into deck_names; match writes and deck edits keep it current after."""
+    return {"deck_names": await rebuild_deck_names()}
+
+
+# ---------- runner ----------
+
+MIGRATIONS: Dict[str, Callable[[], Awaitable[Dict[str, int]]]] = {
+    "deck_keys": migrate_deck_keys,
+    "player_ids": migrate_player_ids,
+    "daily_rollups": migrate_daily_rollups,
+    "seat_stats": migrate_seat_stats,
+    "ratings": migrate_ratings,
+    "monthly_archive": migrate_monthly_archive,
+    "deck_names": migrate_deck_names,
+}
+
+
+async def run_migration(name: str) -> Dict[str, int]:
+    counts = await MIGRATIONS[name]()
+    await migrations_col.update_one(
+        {"_id": name},
+        {"$set": {"done_at": datetime.now(timezone.utc), "modified": counts}},
+        upsert=True,
+    )
+    log.info("migration %s done: %s", name, counts)
+    return counts
+
+
+async def run_pending() -> Dict[str, Dict[str, int]]:
+    """Run every migration not yet recorded as done, in definition order."""
+    done = set(await migrations_col.distinct("_id"))
+    return {name: await run_migration(name) for name in MIGRATIONS if name not in done}
+
+
+async def _main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    unknown = [n for n in argv if n not in MIGRATIONS]
+    if unknown:
+        print(f"Unknown migration(s): {', '.join(unknown)}. Available: {', '.join(MIGRATIONS)}")
+        return 2
+    results = {n: await run_migration(n) for n in argv} if argv else await run_pending()
+    for name, counts in results.items():
+        print(f"{name}: {counts}")
+    if not results:
+        print("Nothing pending.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
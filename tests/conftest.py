@@ -0,0 +1,30 @@
+import os
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="session")
+def mongo_uri():
+    """URI of the local mongod the regression tests run against; skips them when there is none."""
+    try:
+        MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=300).admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no MongoDB server at {TEST_MONGO_URI}")
+    return TEST_MONGO_URI
+
+
+@pytest.fixture(scope="module")
+def scratch_db(mongo_uri, request):
+    """A throwaway database per test module, camatchlogger_test_<module>, dropped before and after."""
+    name = "camatchlogger_test_" + request.module.__name__.rsplit(".", 1)[-1].removeprefix("test_")
+    client = MongoClient(mongo_uri)
+    db = client[name]
+    assert db.name == name
+    client.drop_database(name)
+    yield db
+    client.drop_database(name)
+    client.close()
@@ -0,0 +1,234 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.analytics import AnalyticsEngine
+from utils.eras import era_seat_pipeline, era_seat_rows
+from utils.leaderboard import leaderboard_pipeline
+from utils.match_docs import (
+    build_match_doc, individual_result_docs, rollup_deltas, rollup_ops, seat_deltas, merge_deltas, day_bucket,
+    deck_display_names,
+)
+from utils.player_stats import deck_seats_pipeline, deck_top_players_pipeline, player_stats_pipeline
+from utils.text import deck_key
+
+DECKS = ["Kraum/Tymna", "Najeela", "Kinnan", "Rog/Si", "Tivit", "Blue Farm"]
+T0 = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def _matches(n=400, seed=7):
+    rnd = random.Random(seed)
+    out = []
+    for mid in range(1, n + 1):
+        pids = rnd.sample(range(100, 130), 4)
+        winner = rnd.choice([0, 1, 2, 3, None])
+        date = T0 + timedelta(hours=rnd.randrange(0, 24 * 365))
+        out.append(build_match_doc(mid, [(pid, rnd.choice(DECKS)) for pid in pids], winner, date))
+    return out
+
+
+def _engine(mds):
+    eng = AnalyticsEngine()
+    eng.load([d for md in mds for d in individual_result_docs(md)])
+    return eng
+
+
+def _ranked(acc, min_games=0, limit=None, pct="normal_win_percentage"):
+    rows = []
+    for key, c in acc.items():
+        g = c["games"]
+        if g < max(min_games, 1):
+            continue
+        rows.append({"_id": key, "games_played": g, "wins": c["wins"], "losses": c["losses"], "draws": c["draws"],
+                     pct: c["wins"] / g * 100, "weighted_win_percentage": (c["wins"] + c["draws"] * 0.143) / g * 100})
+    rows.sort(key=lambda r: (-r["weighted_win_percentage"], -r["games_played"], r["_id"]))
+    return rows[:limit] if limit else rows
+
+
+def _ref_leaderboard(mds, kind, lo, hi=None, **kw):
+    """What leaderboard_pipeline's window stages compute over daily_rollups."""
+    acc = {}
+    for (k, key, day), c in rollup_deltas(mds).items():
+        if k == kind and day >= day_bucket(lo) and (hi is None or day < day_bucket(hi)):
+            merge_deltas(acc, {key: c})
+    return _ranked(acc, **kw)
+
+
+def _strip(rows, *fields):
+    return [{k: v for k, v in r.items() if k not in fields} for r in rows]
+
+
+def _ir(mds, **eq):
+    return [d for md in mds for d in individual_result_docs(md) if all(d[k] == v for k, v in eq.items())]
+
+
+def _tally(docs, by):
+    acc = {}
+    for d in docs:
+        c = acc.setdefault(by(d), {"wins": 0, "losses": 0, "draws": 0, "games": 0})
+        c["games"] += 1
+        c[{"win": "wins", "loss": "losses", "draw": "draws"}[d["result"]]] += 1
+    return acc
+
+
+def _seat_rows(acc):
+    return sorted(({"_id": s, **c} for s, c in acc.items()), key=lambda r: r["_id"])
+
+
+@pytest.mark.parametrize("kind", ["player", "deck"])
+def test_leaderboard_matches_rollup_reference(kind):
+    mds = _matches()
+    eng = _engine(mds)
+    start = T0 + timedelta(days=200, hours=13)
+    prev = (T0 + timedelta(days=170, hours=13), start)
+
+    got = eng.leaderboard(kind, start, prev, min_games=15, limit=40)
+    assert _strip(got["current"], "name", "deck_name") == _ref_leaderboard(mds, kind, start, min_games=15, limit=40)
+    assert sorted(_strip(got["previous"], "name", "deck_name"), key=lambda r: r["_id"]) == \
+        sorted(_ref_leaderboard(mds, kind, *prev), key=lambda r: r["_id"])
+    if kind == "deck":
+        assert {r["_id"] for r in got["current"]} <= {deck_key(d) for d in DECKS}
+        assert all(r["name"] in DECKS for r in got["current"])
+
+
+def test_deck_stats_matches_reference():
+    mds = _matches()
+    eng = _engine(mds)
+    start = T0 + timedelta(days=90)
+    seats, players = eng.deck_stats("najeela", start)
+
+    docs = [d for d in _ir(mds, deck_key="najeela") if d["date"] >= start]
+    assert seats == _seat_rows(_tally(docs, lambda d: d["seat"]))
+    assert _strip(players) == _ranked(_tally(docs, lambda d: d["player_id"]), min_games=5, limit=10,
+                                      pct="win_percentage")
+    assert eng.deck_stats("No Such Deck", start) == ([], [])
+
+
+def test_player_stats_matches_reference():
+    mds = _matches()
+    eng = _engine(mds)
+    start = T0 + timedelta(days=30)
+    docs = [d for d in _ir(mds, player_id=105) if d["date"] >= start]
+
+    doc = eng.player_stats(105, start)
+    assert doc["seats"] == _seat_rows(_tally(docs, lambda d: d["seat"]))
+    assert _strip(doc["top_decks"], "name", "deck_name") == _ranked(_tally(docs, lambda d: d["deck_key"]),
+                                                                    limit=10, pct="win_percentage")
+
+    filtered = eng.player_stats(105, start, "KINNAN")
+    assert filtered == {"seats": _seat_rows(_tally([d for d in docs if d["deck_key"] == "kinnan"],
+                                                    lambda d: d["seat"]))}
+
+
+def test_global_seat_split_matches_seat_stats():
+    mds = _matches()
+    split = _engine(mds).global_seat_split()
+    for era in ("preban", "postban"):
+        ref = [{"_id": seat, **c} for (kind, _, e, seat), c in sorted(seat_deltas(mds).items(), key=lambda kv: kv[0][3])
+               if kind == "all" and e == era]
+        assert split[era] == ref
+
+
+def test_era_seat_split_matches_reference():
+    mds = _matches()
+    cutoffs = [T0 + timedelta(days=100), T0 + timedelta(days=250)]
+    docs = {}
+    for d in _ir(mds):
+        era = sum(d["date"] >= c for c in cutoffs)
+        k = (era, d["seat"], d["result"])
+        docs[k] = docs.get(k, 0) + 1
+    ref = era_seat_rows([{"_id": {"era": e, "seat": s, "result": r}, "n": n} for (e, s, r), n in docs.items()], 3)
+    assert _engine(mds).era_seat_split(cutoffs) == ref
+
+
+def test_writes_keep_columns_current():
+    mds = _matches(60)
+    eng = _engine(mds[:40])
+    eng.on_insert(mds[40:])
+    assert len(eng) == len(_engine(mds))
+
+    edited = dict(mds[0], players=[dict(p, deck_name="Tivit") for p in mds[0]["players"]])
+    eng.on_edit(mds[0], edited)
+    eng.on_delete(mds[1:3])
+    ref = _engine([edited] + mds[3:])
+    start = T0 - timedelta(days=1)
+    assert eng.leaderboard("deck", start, min_games=0) == ref.leaderboard("deck", start, min_games=0)
+    assert eng.global_seat_split() == ref.global_seat_split()
+
+
+def test_unloaded_engine_ignores_writes_and_invalidate_forces_reload():
+    eng = AnalyticsEngine()
+    eng.on_insert(_matches(3))
+    assert len(eng) == 0 and not eng.loaded
+    eng.load([])
+    eng.invalidate()
+    assert not eng.loaded
+
+
+# ---------- parity with the Mongo pipelines, against a local mongod ----------
+
+@pytest.fixture(scope="module")
+def pipelines(scratch_db):
+    """scratch_db seeded like the write path leaves it (individual_results, daily_rollups), and the engine."""
+    mds = _matches()
+    scratch_db.individual_results.insert_many(_ir(mds))
+    scratch_db.daily_rollups.bulk_write(rollup_ops(rollup_deltas(mds), deck_display_names(mds)))
+    return scratch_db, _engine(mds)
+
+
+def _norm(rows, *drop):
+    """Rows minus `drop`, percentages rounded, in a tie-proof order ($sort leaves ties unordered)."""
+    out = [{k: round(v, 9) if isinstance(v, float) else v for k, v in r.items() if k not in drop} for r in rows]
+    return sorted(out, key=lambda r: str(r["_id"]))
+
+
+def _rank(rows):
+    return [(round(r["weighted_win_percentage"], 9), r["games_played"]) for r in rows]
+
+
+@pytest.mark.parametrize("kind", ["player", "deck"])
+def test_leaderboard_parity_with_rollup_pipeline(pipelines, kind):
+    db, eng = pipelines
+    start = T0 + timedelta(days=200, hours=13)
+    prev = (T0 + timedelta(days=170, hours=13), start)
+    names = ("deck_name",) if kind == "deck" else ("name",)
+    for limit in (None, 40):
+        [ref] = db.daily_rollups.aggregate(leaderboard_pipeline(kind, start, prev, limit=limit))
+        got = eng.leaderboard(kind, start, prev, limit=limit)
+        assert _rank(got["current"]) == _rank(ref["current"])
+        if limit is None:
+            assert _norm(got["current"], *names) == _norm(ref["current"], *names)
+        assert _norm(got["previous"], *names) == _norm(ref["previous"], *names)
+
+
+def test_deck_stats_parity_with_pipelines(pipelines):
+    db, eng = pipelines
+    start = T0 + timedelta(days=90)
+    seats, players = eng.deck_stats("Najeela", start)
+    assert seats == _norm(db.individual_results.aggregate(deck_seats_pipeline("Najeela", start)))
+    assert _rank(players) == _rank(db.individual_results.aggregate(deck_top_players_pipeline("Najeela", start)))
+
+    _, everyone = eng.deck_stats("Najeela", start, top=1000)
+    ref = db.individual_results.aggregate(deck_top_players_pipeline("Najeela", start, limit=1000))
+    assert _norm(everyone) == _norm(ref, "weighted_wins")
+
+
+def test_player_stats_parity_with_pipeline(pipelines):
+    db, eng = pipelines
+    start = T0 + timedelta(days=30)
+    [ref] = db.individual_results.aggregate(player_stats_pipeline(105, start))
+    got = eng.player_stats(105, start)
+    assert got["seats"] == _norm(ref["seats"])
+    assert _rank(got["top_decks"]) == _rank(ref["top_decks"])
+    assert _norm(got["top_decks"], "name") == _norm(ref["top_decks"])
+
+    [ref] = db.individual_results.aggregate(player_stats_pipeline(105, start, "KINNAN"))
+    assert eng.player_stats(105, start, "KINNAN")["seats"] == _norm(ref["seats"])
+
+
+def test_era_seat_split_parity_with_pipeline(pipelines):
+    db, eng = pipelines
+    cutoffs = [T0 + timedelta(days=100), T0 + timedelta(days=250)]
+    docs = list(db.individual_results.aggregate(era_seat_pipeline(cutoffs)))
+    assert eng.era_seat_split(cutoffs) == era_seat_rows(docs, 3)
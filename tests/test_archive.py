@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from utils.archive import archive_pipeline, freeze_pipeline, month_ceil, month_floor, months_between, next_month
+
+
+def _d(*a):
+    return datetime(*a, tzinfo=timezone.utc)
+
+
+def test_month_helpers():
+    assert month_floor(datetime(2024, 9, 24, 15)) == _d(2024, 9, 1)  # naive taken as UTC
+    assert next_month(_d(2024, 12, 5)) == _d(2025, 1, 1)
+    assert month_ceil(_d(2024, 9, 24)) == _d(2024, 10, 1)
+    assert month_ceil(_d(2024, 10, 1)) == _d(2024, 10, 1)
+    assert months_between(datetime(2024, 11, 3), _d(2025, 2, 14)) == [_d(2024, 11, 1), _d(2024, 12, 1), _d(2025, 1, 1)]
+    assert months_between(_d(2025, 2, 1), _d(2025, 2, 28)) == []
+
+
+def test_freeze_pipeline_covers_one_month():
+    match, group, project = freeze_pipeline(_d(2024, 12, 17))
+    assert match == {"$match": {"date": {"$gte": _d(2024, 12, 1), "$lt": _d(2025, 1, 1)}}}
+    assert group["$group"]["_id"] == {"player_id": "$player_id", "deck_key": "$deck_key"}
+    assert project["$project"]["month"] == {"$literal": _d(2024, 12, 1)}
+
+
+def test_archive_pipeline_splits_head_summaries_and_tail():
+    start, boundary = _d(2024, 9, 24), _d(2025, 6, 1)
+    stages = archive_pipeline({"deck_key": "najeela"}, start, boundary, "player_id", min_games=5, limit=10)
+    assert stages[0] == {"$match": {"deck_key": "najeela", "$or": [
+        {"date": {"$gte": start, "$lt": _d(2024, 10, 1)}},
+        {"date": {"$gte": boundary}},
+    ]}}
+    union = stages[2]["$unionWith"]
+    assert union["coll"] == "monthly_summaries"
+    assert union["pipeline"] == [{"$match": {"deck_key": "najeela", "month": {"$gte": _d(2024, 10, 1), "$lt": boundary}}}]
+    assert stages[3]["$group"]["_id"] == "$player_id"
+    assert {"$match": {"games_played": {"$gte": 5}}} in stages
+    assert stages[-1] == {"$limit": 10}
+
+
+def test_archive_pipeline_is_all_raw_without_frozen_months():
+    start = _d(2025, 5, 10)
+    for boundary in (None, _d(2025, 6, 1)):
+        stages = archive_pipeline({}, start, boundary, "deck_key", pct_field="normal_win_percentage")
+        assert stages[0] == {"$match": {"date": {"$gte": start}}}
+        assert not any("$unionWith" in s for s in stages)
+        assert "normal_win_percentage" in stages[-2]["$addFields"]
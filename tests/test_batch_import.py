@@ -0,0 +1,60 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.batch_import import parse_match_ids, parse_pods, resolve_decks
+
+CSV = (
+    "player1,deck1,player2,deck2,player3,deck3,player4,deck4,winner,date\n"
+    "111111,najeela,<@222222>,Kinnan,333333,Kraum/Tymna,444444,Rograkh/Silas,2,2025-03-01T20:00:00Z\n"
+    "111111,Najeela,222222,Kinnan,333333,Kraum/Tymna,444444,Rograkh/Silas,draw,\n"
+)
+
+
+def test_csv_rows_parse():
+    pods, errors = parse_pods("event.csv", CSV.encode())
+    assert errors == []
+    assert len(pods) == 2
+    assert pods[0]["seats"][1] == (222222, "Kinnan")
+    assert pods[0]["winner"] == 1
+    assert pods[0]["date"] == datetime(2025, 3, 1, 20, tzinfo=timezone.utc)
+    assert pods[1]["winner"] is None and pods[1]["date"] is None
+
+
+def test_json_accepts_list_or_pods_key():
+    row = {"player1": "111111", "deck1": "A", "player2": "222222", "deck2": "B",
+           "player3": "333333", "deck3": "C", "player4": "444444", "deck4": "D", "winner": "Player 4"}
+    for payload in ([row], {"pods": [row]}):
+        pods, errors = parse_pods("pods.json", json.dumps(payload).encode())
+        assert errors == [] and pods[0]["winner"] == 3
+
+
+def test_row_errors_are_collected():
+    bad = CSV.splitlines()[0] + "\n" + "111111,A,111111,B,nope,C,444444,,5,yesterday\n"
+    pods, errors = parse_pods("event.csv", bad.encode())
+    assert pods == []
+    assert len(errors) == 1
+    msg = errors[0]
+    for part in ("player3", "deck4 is empty", "same player", "winner", "date"):
+        assert part in msg
+
+
+def test_resolve_decks_canonicalises_and_reports_unknown():
+    pods, _ = parse_pods("event.csv", CSV.encode())
+    known = {"najeela": "Najeela", "kinnan": "Kinnan", "kraum/tymna": "Kraum/Tymna"}
+    unknown = resolve_decks(pods, lambda n: known.get(n.lower()))
+    assert unknown == ["Rograkh/Silas"]
+    assert pods[0]["seats"][0] == (111111, "Najeela")
+
+
+def test_parse_match_ids_ranges_and_lists():
+    assert parse_match_ids("120-123, 140 142,120") == [120, 121, 122, 123, 140, 142]
+    assert parse_match_ids(" 7 ") == [7]
+    assert len(parse_match_ids("1-200")) == 200
+
+
+@pytest.mark.parametrize("text", ["", "12a", "130-120", "1-201", "1-150, 300-399", "1-999999999"])
+def test_parse_match_ids_rejects(text):
+    with pytest.raises(ValueError):
+        parse_match_ids(text)
@@ -0,0 +1,52 @@
+from utils.deck_index import DeckIndex
+
+
+def _idx(*names):
+    idx = DeckIndex()
+    idx.load(names)
+    return idx
+
+
+def test_empty_query_lists_alphabetically():
+    idx = _idx("Zur", "Atraxa", "Kinnan")
+    assert idx.search("") == ["Atraxa", "Kinnan", "Zur"]
+
+
+def test_ranking_exact_prefix_word_substring():
+    idx = _idx("Tymna/Kraum", "Kraum/Tymna", "Kraum", "Rograkh/Silas", "Blue Kraum Pile")
+    # exact, then prefix (shorter first), then word-prefix, then plain substring
+    assert idx.search("kraum") == ["Kraum", "Kraum/Tymna", "Tymna/Kraum", "Blue Kraum Pile"]
+    assert idx.search("raum") == ["Kraum", "Kraum/Tymna", "Tymna/Kraum", "Blue Kraum Pile"]
+
+
+def test_limit_is_respected():
+    idx = _idx(*[f"Deck {i:02d}" for i in range(40)])
+    assert len(idx.search("deck")) == 25
+    assert len(idx.search("deck", limit=5)) == 5
+
+
+def test_write_through_updates():
+    idx = _idx("Atraxa")
+    v = idx.version
+    idx.add("Kinnan")
+    idx.rename("Atraxa", "Atraxa Grand Unifier")
+    assert idx.version > v
+    assert "Atraxa" not in idx
+    assert idx.search("atr") == ["Atraxa Grand Unifier"]
+    idx.discard("Kinnan")
+    assert idx.names() == ["Atraxa Grand Unifier"]
+
+
+def test_add_is_idempotent_and_discard_missing_is_noop():
+    idx = _idx("Najeela")
+    idx.add("Najeela")
+    idx.discard("Missing")
+    assert idx.names() == ["Najeela"]
+    assert len(idx) == 1
+
+
+def test_resolve_exact_then_case_insensitive():
+    idx = _idx("Kraum/Tymna", "Najeela")
+    assert idx.resolve("Najeela") == "Najeela"
+    assert idx.resolve("  kraum/tymna ") == "Kraum/Tymna"
+    assert idx.resolve("Kraum") is None
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.deck_jobs import (
+    conflict_filter,
+    deck_job,
+    ir_filter,
+    job_progress,
+    match_filter,
+    match_update,
+    moved_match,
+    progress_bar,
+)
+from utils.match_docs import build_match_doc
+
+NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def _job(kind="merge", old="Tivitt", new="Tivit", **kw):
+    return deck_job(7, kind, old, new, drop_old=False, channel_id=1, requested_by=2, now=NOW, **kw)
+
+
+def test_deck_job_document():
+    job = _job()
+    assert (job["_id"], job["status"], job["step"]) == (7, "queued", 0)
+    assert (job["old_key"], job["new_key"]) == ("tivitt", "tivit")
+    assert job["done"] == {"individual_results": 0, "matches": 0}
+    with pytest.raises(ValueError):
+        _job(kind="delete")
+
+
+def test_filters_only_select_rows_still_to_move():
+    job = _job(old="najeela", new="Najeela")  # case-only fix keeps the key
+    assert ir_filter(job) == {"deck_key": "najeela", "deck_name": {"$ne": "Najeela"}}
+    assert match_filter(job) == {"players": {"$elemMatch": {"deck_key": "najeela", "deck_name": {"$ne": "Najeela"}}}}
+    update, array_filters = match_update(job)
+    assert update["$set"]["players.$[elem].deck_key"] == "najeela"
+    assert array_filters == [{"elem.deck_key": "najeela"}]
+    md = build_match_doc(3, [(1, "Tivitt"), (2, "Najeela"), (3, "tivitt"), (4, "Kinnan")], 0, NOW)
+    moved = moved_match(_job(), md)
+    assert [(p["deck_name"], p["deck_key"]) for p in moved["players"]] == [
+        ("Tivit", "tivit"), ("Najeela", "najeela"), ("Tivit", "tivit"), ("Kinnan", "kinnan")]
+    assert md["players"][0]["deck_name"] == "Tivitt"
+    assert conflict_filter(["tivitt", ""])["$or"] == [{"old_key": {"$in": ["tivitt"]}}, {"new_key": {"$in": ["tivitt"]}}]
+
+
+def test_progress_rendering():
+    assert progress_bar(0, 10, 4) == "░░░░"
+    assert progress_bar(5, 10, 4) == "▓▓░░"
+    assert progress_bar(0, 0, 4) == "▓▓▓▓"
+    job = {**_job(), "status": "running", "step": 1,
+           "totals": {"individual_results": 40, "matches": 10}, "done": {"individual_results": 20, "matches": 5}}
+    lines = job_progress(job).splitlines()
+    assert lines[0] == "✅ deck doc"
+    assert lines[1].startswith("⏳ matches") and lines[1].endswith("5/10")
+    assert lines[2].startswith("▫️ individual results") and lines[2].endswith("20/40")
+    assert lines[-1] == "Status: **running**"
+    failed = job_progress({**job, "status": "failed", "error": "boom"})
+    assert failed.endswith("Error: `boom`")
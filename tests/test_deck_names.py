@@ -0,0 +1,50 @@
+from pymongo import UpdateOne
+
+from utils.deck_index import DeckIndex
+from utils.deck_names import OrphanDecks, edit_name_deltas, name_deltas, name_ops, names_pipeline
+
+
+def _match(*decks):
+    return {"players": [{"player_id": i, "deck_name": d} for i, d in enumerate(decks, 1)]}
+
+
+def _registry(known, rows):
+    index = DeckIndex()
+    index.load(known)
+    reg = OrphanDecks(index)
+    reg.load([{"name": n, "rows": r} for n, r in rows.items()])
+    return index, reg
+
+
+def test_name_deltas_count_spellings_per_key():
+    mds = [_match("Najeela", "najeela", "Tivit", " "), _match("Najeela")]
+    assert name_deltas(mds) == {("najeela", "Najeela"): 2, ("najeela", "najeela"): 1, ("tivit", "Tivit"): 1}
+    assert edit_name_deltas([_match("Najeela", "Tivit")], [_match("Najeela", "Tivitt")]) == {
+        ("tivit", "Tivit"): -1, ("tivitt", "Tivitt"): 1}
+
+
+def test_name_ops_and_pipeline_shape():
+    ops = name_ops({("tivit", "Tivit"): -1, ("kinnan", "Kinnan"): 0})
+    assert ops == [UpdateOne({"deck_key": "tivit", "name": "Tivit"}, {"$inc": {"rows": -1}}, upsert=True)]
+    assert names_pipeline(["tivit"])[0] == {"$match": {"deck_name": {"$type": "string"}, "deck_key": {"$in": ["tivit"]}}}
+    assert "deck_key" not in names_pipeline()[0]["$match"]
+
+
+def test_orphans_follow_both_the_logs_and_the_deck_list():
+    index, reg = _registry(["Najeela", "Tivit"], {"Najeela": 5, "najeela": 1, "Tivitt": 2, "Old Deck": 3})
+    assert reg.orphans() == ["Old Deck", "Tivitt"]  # case-only spellings resolve
+
+    reg.apply({("tivitt", "Tivitt"): -2, ("kinnan", "Kinan"): 1})
+    assert reg.orphans() == ["Kinan", "Old Deck"]
+
+    index.add("Old Deck")
+    index.discard("Tivit")
+    reg.apply({("tivit", "Tivit"): 4})
+    assert reg.orphans() == ["Kinan", "Tivit"]
+    assert reg.search("TIV") == ["Tivit"] and reg.search("") == ["Kinan", "Tivit"]
+
+
+def test_unloaded_registry_ignores_writes():
+    reg = OrphanDecks(DeckIndex())
+    reg.apply({("tivit", "Tivit"): 1})
+    assert not reg.loaded and reg.orphans() == []
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.eras import (
+    DEFAULT_CUTOFFS,
+    era_labels,
+    era_seat_pipeline,
+    era_seat_rows,
+    is_default,
+    parse_cutoffs,
+)
+
+
+def _d(*ymd):
+    return datetime(*ymd, tzinfo=timezone.utc)
+
+
+def test_parse_cutoffs_sorts_and_dedupes():
+    assert parse_cutoffs("2025-04-01, 2024-09-24;2025-04-01") == [_d(2024, 9, 24), _d(2025, 4, 1)]
+    assert is_default(parse_cutoffs("2024-09-24"))
+
+
+@pytest.mark.parametrize("text", ["", "24/09/2024", "2024-01-01,2024-02-01,2024-03-01,2024-04-01,2024-05-01,2024-06-01"])
+def test_parse_cutoffs_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_cutoffs(text)
+
+
+def test_labels():
+    assert era_labels(DEFAULT_CUTOFFS) == ["PRE-BAN", "POST-BAN"]
+    assert era_labels([_d(2024, 9, 24), _d(2025, 4, 1)]) == [
+        "before 2024-09-24", "2024-09-24 → 2025-04-01", "since 2025-04-01"]
+
+
+def test_pipeline_is_one_group_with_a_switch_per_cutoff():
+    cut = [_d(2024, 9, 24), _d(2025, 4, 1)]
+    match, group = era_seat_pipeline(cut)
+    assert match == {"$match": {"seat": {"$in": [1, 2, 3, 4]}}}
+    switch = group["$group"]["_id"]["era"]["$switch"]
+    assert [b["case"] for b in switch["branches"]] == [{"$lt": ["$date", c]} for c in cut]
+    assert switch["default"] == 2
+
+
+def test_era_seat_rows_fold():
+    docs = [
+        {"_id": {"era": 0, "seat": 1, "result": "win"}, "n": 3},
+        {"_id": {"era": 0, "seat": 1, "result": "loss"}, "n": 2},
+        {"_id": {"era": 0, "seat": 3, "result": "draw"}, "n": 1},
+        {"_id": {"era": 2, "seat": 2, "result": "loss"}, "n": 4},
+    ]
+    assert era_seat_rows(docs, 3) == [
+        [{"_id": 1, "games": 5, "wins": 3, "losses": 2, "draws": 0},
+         {"_id": 3, "games": 1, "wins": 0, "losses": 0, "draws": 1}],
+        [],
+        [{"_id": 2, "games": 4, "wins": 0, "losses": 4, "draws": 0}],
+    ]
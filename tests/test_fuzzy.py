@@ -0,0 +1,36 @@
+import asyncio
+
+from utils.deck_index import DeckIndex
+from utils.fuzzy import FuzzyMatcher
+
+
+def _matcher(*names):
+    idx = DeckIndex()
+    idx.load(names)
+    return idx, FuzzyMatcher(idx)
+
+
+def test_similar_uses_ratio_or_prefix():
+    _, m = _matcher("Kraum/Tymna", "Kinnan", "Najeela", "Kraum")
+    hits = asyncio.run(m.similar("kraum/tymnaa"))
+    assert [n for n, _ in hits] == ["Kraum/Tymna", "Kraum"]  # ratio hit first, then prefix-only hit
+    assert hits[0][1] > 90
+    assert asyncio.run(m.similar("Atraxa")) == []
+
+
+def test_nearest_many_names_in_one_call():
+    _, m = _matcher("Kraum/Tymna", "Tymna/Thrasios", "Kinnan", "Najeela")
+    out = asyncio.run(m.nearest(["kinan", "tymna kraum", "zzzz"], limit=2))
+    assert out["kinan"][0][0] == "Kinnan"
+    assert out["tymna kraum"][0][0] == "Kraum/Tymna"
+    assert len(out["tymna kraum"]) <= 2
+    assert out["zzzz"] == []
+
+
+def test_corpus_follows_index_version():
+    idx, m = _matcher("Kinnan")
+    first = m.corpus()
+    assert m.corpus() is first
+    idx.add("Najeela")
+    assert m.corpus() is not first
+    assert asyncio.run(m.nearest(["najeela"]))["najeela"][0] == ("Najeela", 100.0)
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timezone
+from itertools import permutations
+
+import pytest
+
+from utils import headtohead
+from utils.headtohead import HeadToHead
+from utils.match_docs import build_match_doc
+
+DECKS = ["Kraum/Tymna", "Najeela", "Kinnan", "Rog/Si", "Tivit"]
+WHEN = datetime(2025, 4, 1, tzinfo=timezone.utc)
+
+
+def _match(mid, pids, decks, winner):
+    return build_match_doc(mid, list(zip(pids, decks)), winner, WHEN)
+
+
+def _matches(n=300, seed=3):
+    rnd = random.Random(seed)
+    return [
+        _match(mid, rnd.sample(range(1, 15), 4), [rnd.choice(DECKS) for _ in range(4)], rnd.choice([0, 1, 2, 3, None]))
+        for mid in range(1, n + 1)
+    ]
+
+
+def _ref(mds, kind, a, b):
+    """Brute force over the raw pods: each pod counts once, whatever the seats."""
+    out = {"games": 0, "a_wins": 0, "b_wins": 0, "draws": 0, "other_wins": 0}
+    key = (lambda p: p["player_id"]) if kind == "player" else (lambda p: p["deck_name"].lower())
+    for md in mds:
+        ps = md["players"]
+        ka = [p for p in ps if key(p) == a]
+        kb = [p for p in ps if key(p) == b]
+        if not ka or not kb:
+            continue
+        out["games"] += 1
+        out["draws"] += any(p["result"] == "draw" for p in ka)
+        out["a_wins"] += any(p["result"] == "win" for p in ka)
+        out["b_wins"] += any(p["result"] == "win" for p in kb)
+    out["other_wins"] = out["games"] - out["a_wins"] - out["b_wins"] - out["draws"]
+    return out
+
+
+def _built(mds):
+    hh = HeadToHead()
+    hh.load(mds)
+    return hh
+
+
+def test_player_pairs_match_brute_force():
+    mds = _matches()
+    hh = _built(mds)
+    for a, b in permutations(range(1, 15), 2):
+        assert hh.pair("player", a, b) == _ref(mds, "player", a, b)
+
+
+def test_deck_pairs_match_brute_force_and_skip_mirrors():
+    mds = _matches()
+    hh = _built(mds)
+    for a, b in permutations([d.lower() for d in DECKS], 2):
+        assert hh.pair("deck", a.upper(), b) == _ref(mds, "deck", a, b)
+    assert hh.pair("deck", "Najeela", "najeela")["games"] == 0
+
+
+def test_incremental_updates_equal_a_fresh_build(monkeypatch):
+    monkeypatch.setattr(headtohead, "COMPACT_AT", 4)  # exercise the side-table merge
+    mds = _matches(120)
+    hh = _built(mds[:60])
+    hh.on_insert(mds[60:])
+    edited = _match(5, [p["player_id"] for p in mds[4]["players"]], ["Tivit"] * 3 + ["Kinnan"], 3)
+    hh.on_edit(mds[4], edited)
+    hh.on_delete(mds[10:12])
+
+    ref = _built(mds[:4] + [edited] + mds[5:10] + mds[12:])
+    for a, b in permutations(range(1, 15), 2):
+        assert hh.pair("player", a, b) == ref.pair("player", a, b)
+    for d in DECKS:
+        assert hh.opponents("deck", d) == ref.opponents("deck", d)
+
+
+def test_opponents_row_sorted_best_first():
+    mds = [
+        _match(1, [1, 2, 3, 4], ["Najeela", "Kinnan", "Tivit", "Rog/Si"], 0),
+        _match(2, [1, 2, 3, 4], ["Najeela", "Kinnan", "Tivit", "Tivit"], 2),
+    ]
+    rows = _built(mds).opponents("deck", "najeela")
+    assert [r["key"] for r in rows] == ["rog/si", "kinnan", "tivit"]
+    assert rows[0] == {"key": "rog/si", "name": "Rog/Si", "games": 1, "wins": 1, "draws": 0,
+                       "win_percentage": pytest.approx(100.0)}
+    assert rows[1]["games"] == 2 and rows[1]["wins"] == 1
+    assert rows[2]["games"] == 2 and rows[2]["wins"] == 1  # one pod, however many Tivit seats
+    assert _built(mds).opponents("deck", "najeela", min_games=2) == rows[1:]
+    assert _built(mds).opponents("player", 99) == []
+
+
+def test_unloaded_matrices_ignore_writes():
+    hh = HeadToHead()
+    hh.on_insert(_matches(2))
+    assert not hh.loaded and hh.pair("player", 1, 2)["games"] == 0
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from utils.integrity import Checker, pair_by_match_id, render_report, unfixed
+from utils.match_docs import build_match_doc, individual_result_docs
+
+DATE = datetime(2025, 2, 3, 20)
+
+
+def _md(mid, decks=("Najeela", "Tivit", "Kinnan", "Rog/Si"), winner=0):
+    return build_match_doc(mid, list(zip((1, 2, 3, 4), decks)), winner, DATE)
+
+
+async def _aiter(items):
+    for x in items:
+        yield x
+
+
+def _pairs(mds, rows):
+    async def go():
+        return [(mid, md and md["match_id"], [r["player_id"] for r in rs])
+                async for mid, md, rs in pair_by_match_id(_aiter(mds), _aiter(rows))]
+    return asyncio.run(go())
+
+
+def _deck(name, players, _id=None):
+    return {"_id": _id or name, "name": name, "deck_key": name.lower(), "players": players}
+
+
+def test_pairing_merges_both_streams_in_match_id_order():
+    mds = [_md(1), _md(3), _md(4)]
+    rows = individual_result_docs(mds[0])[:2] + [{"match_id": 2, "player_id": 9}] + individual_result_docs(mds[2])
+    assert _pairs(mds, rows) == [(1, 1, [1, 2]), (2, None, [9]), (3, 3, []), (4, 4, [1, 2, 3, 4])]
+    assert _pairs([], [{"match_id": 5, "player_id": 1}]) == [(5, None, [1])]
+
+
+def test_clean_data_reports_nothing():
+    mds = [_md(1), _md(2, winner=None)]
+    chk = Checker(repair=True)
+    for md in mds:
+        chk.check_match(md["match_id"], md, individual_result_docs(md))
+    chk.check_deck(_deck("Najeela", [{"player_id": 1, "wins": 1, "losses": 0, "draws": 1},
+                                     {"player_id": 7, "wins": 0, "losses": 0, "draws": 0}]))
+    for pid, name in ((2, "Tivit"), (3, "Kinnan"), (4, "Rog/Si")):
+        chk.check_deck(_deck(name, [{"player_id": pid, "wins": 0, "losses": 1, "draws": 1}]))
+    chk.finish()
+    assert not any(chk.counts.values()) and chk.matches == 2
+    assert all(not ops for ops in chk.ops.values())
+    assert render_report(chk.report()) == "Checked 2 matches. No mismatches."
+
+
+def test_each_mismatch_gets_the_smallest_repair():
+    chk = Checker(repair=True)
+    md = _md(1)
+    md["players"][1]["deck_key"] = "stale"
+    assert chk.check_match(1, md, [])                                   # keys off + rows missing
+    bad = individual_result_docs(_md(2))
+    bad[0]["result"] = "loss"
+    assert chk.check_match(2, _md(2), bad)                              # a row differs
+    assert chk.check_match(3, None, [{"match_id": 3, "date": DATE}])    # rows without a match
+    assert not chk.check_match(4, _md(4), list(reversed(individual_result_docs(_md(4)))))  # order is irrelevant
+    assert not chk.check_match(5, None, [])                             # gone from both sides since the scan
+    assert chk.check_deck(_deck("Najeela", [{"player_id": 1, "wins": 1, "losses": 0, "draws": 0}]))
+    chk.finish()
+
+    assert {k: n for k, n in chk.counts.items() if n} == {
+        "match_keys": 1, "ir_missing": 1, "ir_mismatch": 1, "ir_orphan": 1, "deck_players": 1, "deck_missing": 3}
+    assert chk.ops["matches"] == [UpdateOne({"match_id": 1}, {"$set": {"players": _md(1)["players"]}})]
+    ir_ops = [type(op).__name__ for op in chk.ops["individual_results"]]
+    assert ir_ops == ["InsertOne"] * 4 + ["DeleteMany"] + ["InsertOne"] * 4 + ["DeleteMany"]
+    assert set(chk.ops) == {"matches", "individual_results"}  # decks are recounted by the caller
+    assert chk.examples["deck_missing"] == ["kinnan", "rog/si", "tivit"]
+    assert chk.months == {datetime(2025, 2, 1, tzinfo=timezone.utc)}
+
+
+def test_report_only_collects_no_ops():
+    chk = Checker()
+    chk.check_match(3, None, [{"match_id": 3}])
+    assert chk.counts["ir_orphan"] == 1 and chk.ops["individual_results"] == []
+    text = render_report(chk.report())
+    assert text.splitlines()[1] == "- ir_orphan: 1 e.g. 3"
+
+
+def test_decks_sharing_a_key_are_reported_not_compared():
+    chk = Checker(repair=True, duplicates=["najeela"])
+    chk.check_match(1, _md(1), individual_result_docs(_md(1)))
+    assert not chk.check_deck(_deck("Najeela", [], _id=1))
+    assert not chk.check_deck(_deck("najeela", [], _id=2))
+    chk.finish()
+    assert chk.counts["deck_duplicate"] == 2 and chk.counts["deck_players"] == 0
+    assert "najeela" not in chk.examples["deck_missing"]
+    assert "deck_duplicate: 2 e.g." in render_report(chk.report())
+
+
+def test_report_marks_only_what_repairs_fixed():
+    report = {"matches": 9, "counts": {"ir_missing": 3, "ir_orphan": 1, "deck_missing": 2},
+              "examples": {"ir_missing": [1, 2, 3], "ir_orphan": [7], "deck_missing": ["x", "y"]},
+              "fixed": {"ir_missing": 2, "ir_orphan": 1}}
+    assert render_report(report).splitlines()[1:] == [
+        "- ir_missing: 3 (2 fixed) e.g. 1, 2, 3", "- ir_orphan: 1 (fixed) e.g. 7", "- deck_missing: 2 e.g. x, y"]
+    assert unfixed(report) == {"ir_missing": 1, "deck_missing": 2}
+    # flagged by the scan but clean on the re-read: nothing is claimed as fixed
+    assert unfixed({**report, "fixed": {}}) == {"ir_missing": 3, "ir_orphan": 1, "deck_missing": 2}
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from utils.leaderboard import leaderboard_pipeline, join_windows, render_leaderboard, delta_mark
+
+
+def _row(key, w, l, d, name=None):
+    g = w + l + d
+    return {"_id": key, "name": name, "wins": w, "losses": l, "draws": d, "games_played": g,
+            "normal_win_percentage": w / g * 100, "weighted_win_percentage": (w + d * 0.143) / g * 100}
+
+
+def test_pipeline_is_one_facet_with_both_windows():
+    start = datetime(2025, 5, 31, 15, tzinfo=timezone.utc)
+    prev = (datetime(2025, 5, 1, 15, tzinfo=timezone.utc), start)
+    match, facet = leaderboard_pipeline("player", start, prev)
+    assert match == {"$match": {"kind": "player", "day": {"$gte": datetime(2025, 5, 1, tzinfo=timezone.utc)}}}
+    assert set(facet["$facet"]) == {"current", "previous"}
+    assert facet["$facet"]["previous"][0] == {"$match": {"day": {
+        "$gte": datetime(2025, 5, 1, tzinfo=timezone.utc), "$lt": datetime(2025, 5, 31, tzinfo=timezone.utc)}}}
+
+
+def test_pipeline_without_previous_window_has_limit():
+    (_, facet) = leaderboard_pipeline("deck", datetime(2025, 1, 1, tzinfo=timezone.utc), limit=40)
+    assert list(facet["$facet"]) == ["current"]
+    assert facet["$facet"]["current"][-1] == {"$limit": 40}
+
+
+def test_join_windows_by_key():
+    rows = join_windows([_row(1, 10, 5, 0), _row(2, 3, 12, 0)], [_row(1, 5, 10, 0)])
+    assert [r["_id"] for r in rows] == [1, 2]
+    assert round(rows[0]["delta"]) == 33
+    assert rows[1]["delta"] is None
+
+
+def test_delta_marks():
+    assert delta_mark(0.5) == "🔄 0%"
+    assert delta_mark(12.7) == "⬆️ 12%"
+    assert delta_mark(-3.2) == "🔻 3%"
+
+
+def test_render_pages_skip_unnamed_rows_and_mark_deltas():
+    rows = join_windows([_row(i, 10, 5, 1) for i in range(30)], [_row(0, 5, 10, 1)])
+    names = {i: f"P{i}" for i in range(30) if i != 3}
+    embeds = render_leaderboard("Title", rows, lambda d: names.get(d["_id"]), kind="player", color=0)
+    assert [len(e.fields) for e in embeds] == [25, 4]
+    assert embeds[0].title == "Title" and embeds[1].title is None
+    first = embeds[0].fields[0]
+    assert first.name == "🥇 **P0**: 10W | 5L | 1D"
+    assert "%* (⬆️ 31%) | (Games: 16)" in first.value
+    assert embeds[0].fields[3].name.startswith("4. **P4**")
+
+
+def test_render_empty():
+    (e,) = render_leaderboard("T", [], lambda d: "x", kind="deck", color=0)
+    assert e.description == "No results found."
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from utils.match_docs import (
+    build_match_doc,
+    individual_result_docs,
+    deck_player_tallies,
+    deck_player_ops,
+    deck_players_pipeline,
+    edited_match,
+    deck_player_edit_ops,
+    deck_players_set_ops,
+    day_bucket,
+    rollup_deltas,
+    edit_deltas,
+    deck_display_names,
+    rollup_ops,
+    era_of,
+    seat_deltas,
+    seat_ops,
+    seat_summary,
+)
+
+WHEN = datetime(2025, 1, 5, tzinfo=timezone.utc)
+
+
+def _match(mid=1, winner=0, decks=("Kraum/Tymna", "Najeela", "Kinnan", "Najeela")):
+    return build_match_doc(mid, list(enumerate(decks, 10)), winner, WHEN)
+
+
+def test_individual_result_docs_shape():
+    docs = individual_result_docs(_match())
+    assert len(docs) == 4
+    assert docs[0] == {"player_id": 10, "deck_name": "Kraum/Tymna", "deck_key": "kraum/tymna", "seat": 1,
+                       "result": "win", "match_id": 1, "date": WHEN}
+
+
+def test_tallies_accumulate_across_matches():
+    t = deck_player_tallies([_match(1, winner=1), _match(2, winner=1), _match(3, winner=None)])
+    assert t[("najeela", 11)] == {"wins": 2, "losses": 0, "draws": 1}
+    assert t[("kinnan", 12)] == {"wins": 0, "losses": 2, "draws": 1}
+
+
+def test_negative_sign_for_removals():
+    t = deck_player_tallies([_match(1, winner=0)], sign=-1)
+    assert t[("kraum/tymna", 10)] == {"wins": -1, "losses": 0, "draws": 0}
+
+
+def test_ops_push_then_inc_only_nonzero_fields():
+    ops = deck_player_ops({("najeela", 11): {"wins": 1, "losses": 0, "draws": 0}})
+    assert ops == [
+        UpdateOne({"deck_key": "najeela", "players.player_id": {"$ne": 11}},
+                  {"$push": {"players": {"player_id": 11, "wins": 0, "losses": 0, "draws": 0}}}),
+        UpdateOne({"deck_key": "najeela", "players.player_id": 11}, {"$inc": {"players.$.wins": 1}}),
+    ]
+
+
+def test_edited_match_applies_seat_edits_without_touching_the_original():
+    md = _match()
+    after = edited_match(md, {1: {"deck_name": "Tivit", "result": "win"}, 0: {"result": "loss", "position": "3"}})
+    assert after["players"][1]["deck_name"] == "Tivit" and after["players"][1]["deck_key"] == "tivit"
+    assert after["players"][0]["position"] == 3 and after["players"][0]["result"] == "loss"
+    assert md["players"][0]["result"] == "win" and md["players"][1]["deck_key"] == "najeela"
+
+
+def test_edit_ops_only_move_changed_tallies():
+    md = _match()
+    assert deck_player_edit_ops(md, edited_match(md, {2: {"position": 1}})) == []  # seat-only edit
+
+    ops = deck_player_edit_ops(md, edited_match(md, {0: {"result": "loss"}, 1: {"result": "win"}}))
+    assert ops == deck_player_ops({
+        ("kraum/tymna", 10): {"wins": -1, "losses": 1, "draws": 0},
+        ("najeela", 11): {"wins": 1, "losses": -1, "draws": 0},
+    })
+
+    swapped = deck_player_edit_ops(md, edited_match(md, {2: {"player_id": 99}}))
+    assert swapped == deck_player_ops({
+        ("kinnan", 12): {"wins": 0, "losses": -1, "draws": 0},
+        ("kinnan", 99): {"wins": 0, "losses": 1, "draws": 0},
+    })
+    # the deck that lost a game sheds entries left at 0/0/0, after every $inc
+    assert swapped[-1] == UpdateOne({"deck_key": "kinnan"},
+                                    {"$pull": {"players": {"wins": 0, "losses": 0, "draws": 0}}})
+
+
+def test_deck_player_ops_on_mongod(scratch_db):
+    md = _match()
+    after = edited_match(md, {1: {"deck_name": "Tivit"}, 2: {"player_id": 99}, 3: {"result": "win"}})
+    keys = ("kraum/tymna", "najeela", "kinnan", "tivit")
+    scratch_db.decks.insert_many([{"deck_key": k, "players": []} for k in keys])
+    scratch_db.decks.bulk_write(deck_player_ops(deck_player_tallies([md])))
+    scratch_db.decks.bulk_write(deck_player_edit_ops(md, after))
+
+    stored = {(d["deck_key"], p["player_id"]): {k: p[k] for k in ("wins", "losses", "draws")}
+              for d in scratch_db.decks.find() for p in d["players"]}
+    assert stored == deck_player_tallies([after])  # the edited-away seats were pulled, not left at 0/0/0
+
+
+def test_deck_players_recompute_is_one_group_and_one_set_per_deck():
+    match, group, _ = deck_players_pipeline(["najeela", "kinnan"])
+    assert match == {"$match": {"deck_key": {"$in": ["najeela", "kinnan"]}}}
+    assert group["$group"]["_id"] == {"deck_key": "$deck_key", "player_id": "$player_id"}
+
+    rows = [{"_id": {"deck_key": "najeela", "player_id": 7}, "wins": 2, "losses": 1, "draws": 0, "games": 3}]
+    ops = deck_players_set_ops(["najeela", "kinnan"], rows)
+    assert ops == [
+        UpdateOne({"deck_key": "najeela"},
+                  {"$set": {"players": [{"player_id": 7, "wins": 2, "losses": 1, "draws": 0}]}}),
+        UpdateOne({"deck_key": "kinnan"}, {"$set": {"players": []}}),  # nothing left on it
+    ]
+
+
+def test_day_bucket_floors_to_utc_midnight():
+    assert day_bucket(datetime(2025, 1, 5, 23, 59)) == datetime(2025, 1, 5, tzinfo=timezone.utc)
+    assert day_bucket(datetime(2025, 1, 5, 23, 30, tzinfo=timezone(timedelta(hours=-2)))) == \
+        datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+
+def test_rollup_deltas_per_player_and_deck():
+    d = rollup_deltas([_match(1, winner=1), _match(2, winner=None)])
+    assert d[("player", 11, WHEN)] == {"wins": 1, "losses": 0, "draws": 1, "games": 2}
+    # two Najeela seats per match
+    assert d[("deck", "najeela", WHEN)] == {"wins": 1, "losses": 1, "draws": 2, "games": 4}
+
+
+def test_edit_deltas_only_touch_changed_rows():
+    before = _match(1, winner=0)
+    after = _match(1, winner=2)
+    d = edit_deltas([before], [after])
+    assert d[("player", 10, WHEN)] == {"wins": -1, "losses": 1, "draws": 0, "games": 0}
+    assert d[("deck", "kinnan", WHEN)] == {"wins": 1, "losses": -1, "draws": 0, "games": 0}
+    assert ("player", 11, WHEN) not in d
+
+
+def test_rollup_ops_upsert_with_deck_name():
+    ops = rollup_ops({("deck", "najeela", WHEN): {"wins": 1, "losses": 0, "draws": 0, "games": 1}},
+                     deck_display_names([_match()]))
+    assert ops == [UpdateOne({"kind": "deck", "key": "najeela", "day": WHEN},
+                             {"$inc": {"wins": 1, "games": 1}, "$set": {"name": "Najeela"}}, upsert=True)]
+
+
+def test_era_boundary():
+    assert era_of(datetime(2024, 9, 23, 23, 59)) == "preban"
+    assert era_of(datetime(2024, 9, 24, tzinfo=timezone.utc)) == "postban"
+
+
+def test_seat_deltas_cover_all_player_and_deck():
+    d = seat_deltas([_match(1, winner=1), _match(2, winner=None)])
+    assert d[("all", None, "postban", 2)] == {"wins": 1, "losses": 0, "draws": 1, "games": 2}
+    assert d[("player", 12, "postban", 3)] == {"wins": 0, "losses": 1, "draws": 1, "games": 2}
+    assert d[("deck", "najeela", "postban", 4)] == {"wins": 0, "losses": 1, "draws": 1, "games": 2}
+
+
+def test_seat_ops_and_summary():
+    ops = seat_ops({("deck", "kinnan", "preban", 3): {"wins": 0, "losses": -1, "draws": 0, "games": -1}})
+    assert ops == [UpdateOne({"kind": "deck", "key": "kinnan", "era": "preban", "seat": 3},
+                             {"$inc": {"losses": -1, "games": -1}}, upsert=True)]
+    s = seat_summary([{"_id": 1, "games": 3, "wins": 2, "losses": 1, "draws": 0},
+                      {"_id": 3, "games": 1, "wins": 0, "losses": 0, "draws": 1}])
+    assert (s["wins"], s["losses"], s["draws"]) == (2, 1, 1)
+    assert (s["seat1"], s["winseat1"], s["seat2"], s["seat3"]) == (3, 2, 0, 1)
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils.members import MemberResolver, QUERY_CHUNK
+
+
+def _member(uid, nick=None):
+    return SimpleNamespace(id=uid, nick=nick, display_name=f"user{uid}")
+
+
+class _Guild:
+    """Just the three calls MemberResolver makes."""
+
+    def __init__(self, cached=(), remote=()):
+        self.id = 1
+        self._cached = {m.id: m for m in cached}
+        self._remote = {m.id: m for m in remote}
+        self.queries = []
+
+    def get_member(self, uid):
+        return self._cached.get(uid)
+
+    async def query_members(self, *, user_ids, limit, cache):
+        self.queries.append(list(user_ids))
+        return [self._remote[u] for u in user_ids if u in self._remote]
+
+    async def fetch_member(self, uid):  # pragma: no cover - must not be used
+        raise AssertionError("fetch_member should not be called")
+
+
+def test_cache_misses_resolved_in_chunks_and_departed_remembered():
+    remote = [_member(u) for u in range(1000, 1000 + QUERY_CHUNK + 20) if u % 7]
+    guild = _Guild(cached=[_member(5, nick="Nick")], remote=remote)
+    resolver = MemberResolver()
+    ids = [5] + list(range(1000, 1000 + QUERY_CHUNK + 20))
+
+    names = asyncio.run(resolver.resolve(guild, ids))
+    assert names[5] == "Nick"
+    assert names[1000] == "user1000"
+    assert 1001 not in names  # 1001 % 7 == 0: not in the guild any more
+    assert [len(q) for q in guild.queries] == [QUERY_CHUNK, 20]
+
+    # second render: names come from the LRU, departed ids are skipped without a query
+    guild.queries.clear()
+    again = asyncio.run(resolver.resolve(guild, ids))
+    assert again == names
+    assert guild.queries == []
+    assert 1001 in resolver.departed(guild.id)
+
+
+def test_ttl_expiry_requeries():
+    now = [0.0]
+    guild = _Guild(remote=[_member(7)])
+    resolver = MemberResolver(ttl=10, departed_ttl=10, clock=lambda: now[0])
+    asyncio.run(resolver.resolve(guild, [7, 8]))
+    now[0] = 11
+    asyncio.run(resolver.resolve(guild, [7, 8]))
+    assert guild.queries == [[7, 8], [7, 8]]
+
+
+class _RestGuild(_Guild):
+    """No gateway chunking: every miss goes through fetch_member, which can fail in several ways."""
+
+    async def query_members(self, *, user_ids, limit, cache):
+        raise discord.ClientException("intents")
+
+    async def fetch_member(self, uid):
+        status = {2: 404, 3: 403, 4: 500}.get(uid)
+        if status:
+            cls = {404: discord.NotFound, 403: discord.Forbidden}.get(status, discord.HTTPException)
+            raise cls(SimpleNamespace(status=status, reason="x"), "nope")
+        return self._remote[uid]
+
+
+def test_rest_fallback_errors_render_as_departed_and_departed_is_capped():
+    guild = _RestGuild(remote=[_member(1)])
+    resolver = MemberResolver(maxsize=2)
+    assert asyncio.run(resolver.resolve(guild, [1, 2, 3, 4])) == {1: "user1"}
+    assert resolver.departed(guild.id) == [3, 4]  # oldest (2) evicted past maxsize
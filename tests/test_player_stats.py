@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timezone
+
+from utils.player_stats import (
+    player_stats_pipeline,
+    shape_player_stats,
+    games_page_pipeline,
+    deck_seats_pipeline,
+    deck_top_players_pipeline,
+    next_cursor,
+    shape_games,
+    render_games_page,
+)
+from utils.views import LazyPaginatorView
+
+START = datetime(2024, 9, 24, tzinfo=timezone.utc)
+
+
+def test_unfiltered_pipeline_is_one_match_and_one_facet():
+    match, facet = player_stats_pipeline(42, START)
+    assert match == {"$match": {"player_id": 42, "date": {"$gte": START}}}
+    assert set(facet["$facet"]) == {"seats", "top_decks"}
+    assert facet["$facet"]["top_decks"][-1] == {"$limit": 10}
+
+
+def test_deck_pipelines_match_on_deck_key_and_window():
+    match = {"$match": {"deck_key": "kraum/tymna", "date": {"$gte": START}}}
+    seats = deck_seats_pipeline(" Kraum/Tymna ", START)
+    assert seats[0] == match and seats[1]["$group"]["_id"] == "$seat"
+    top = deck_top_players_pipeline("Kraum/Tymna", START)
+    assert top[0] == match and top[1]["$group"]["_id"] == "$player_id"
+    assert {"$match": {"games_played": {"$gte": 5}}} in top and top[-1] == {"$limit": 10}
+
+
+def test_deck_filter_uses_deck_key_and_adds_games_page():
+    match, facet = player_stats_pipeline(42, START, " Kraum/Tymna ", games_limit=25)
+    assert match["$match"]["deck_key"] == "kraum/tymna"
+    assert set(facet["$facet"]) == {"seats", "games"}
+    assert {"$limit": 25} in facet["$facet"]["games"]
+
+
+def test_shape_sums_seats():
+    doc = {
+        "seats": [
+            {"_id": 1, "games": 3, "wins": 2, "losses": 1, "draws": 0},
+            {"_id": 4, "games": 2, "wins": 0, "losses": 1, "draws": 1},
+        ],
+        "top_decks": [{"_id": "najeela", "deck_name": "najeela", "wins": 2, "losses": 2, "draws": 1,
+                       "games_played": 5, "win_percentage": 40, "weighted_win_percentage": 42.86}],
+    }
+    out = shape_player_stats(doc)
+    assert (out["wins"], out["losses"], out["draws"]) == (2, 2, 1)
+    assert (out["seat1"], out["winseat1"], out["seat2"], out["seat4"]) == (3, 2, 0, 2)
+    assert out["top_10_decks"][0]["deck_name"] == "Najeela"
+    assert "games" not in out
+
+
+def test_shape_no_games():
+    assert shape_player_stats({"seats": [], "top_decks": []}) is None
+
+
+def test_games_page_keyset_after_cursor():
+    when = datetime(2025, 2, 1, tzinfo=timezone.utc)
+    (match, sort, limit, *_rest) = games_page_pipeline(42, START, "Najeela", after=(when, 17), limit=8)
+    assert match["$match"]["$or"] == [{"date": {"$gt": when}}, {"date": when, "match_id": {"$gt": 17}}]
+    assert sort == {"$sort": {"date": 1, "match_id": 1}}
+    assert limit == {"$limit": 8}
+
+
+def test_next_cursor_only_on_full_pages():
+    when = datetime(2025, 2, 1, tzinfo=timezone.utc)
+    docs = [{"date": when, "match_id": i, "players": []} for i in range(3)]
+    assert next_cursor(docs, limit=3) == (when, 2)
+    assert next_cursor(docs, limit=4) is None
+
+
+def test_render_games_page_bolds_target_and_stars_winner():
+    games = shape_games([{
+        "match_id": 5, "date": datetime(2025, 2, 1),
+        "players": [{"deck_name": "najeela", "result": "win"}, {"deck_name": "kinnan", "result": "loss"}],
+    }])
+    text = render_games_page(games, "Najeela")
+    assert "**Game ID**: `5` - `Feb 1, 2025`" in text
+    assert "Seat 1: **Najeela** 🏆" in text
+    assert "Seat 2: Kinnan" in text
+
+
+def test_lazy_paginator_fetches_forward_once_per_page():
+    calls = []
+
+    async def fetch(cursor):
+        calls.append(cursor)
+        return (f"page after {cursor}", cursor + 1 if cursor < 1 else None)
+
+    async def run():
+        view = LazyPaginatorView(author=None, fetch_page=fetch, total_pages=3)
+        view.seed("first", 0)
+        assert await view._load(2)
+        assert not await view._load(3)
+        assert await view._load(1)  # cached
+        return view.pages
+
+    assert asyncio.run(run()) == ["first", "page after 0", "page after 1"]
+    assert calls == [0, 1]
@@ -0,0 +1,145 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from utils.match_docs import build_match_doc, individual_result_docs
+from utils.query_plans import analyze, explain_command, query_catalog, query_shape, render_advice, suggest_index
+
+NOW = datetime(2025, 6, 15, tzinfo=timezone.utc)
+SAMPLE = {"player_id": 7, "deck": "Najeela", "match_id": 40, "boundary": None, "now": NOW}
+TEST_DB_NAME = "camatchlogger_test_plans"
+
+
+def _find_explain(plan, docs, keys, returned):
+    return {"queryPlanner": {"winningPlan": plan},
+            "executionStats": {"totalDocsExamined": docs, "totalKeysExamined": keys,
+                               "nReturned": returned, "executionTimeMillis": 3}}
+
+
+def _entry(name="q", **kw):
+    return {"name": name, "coll": "individual_results", **kw}
+
+
+def test_catalog_entries_are_explainable():
+    catalog = query_catalog(SAMPLE)
+    assert len({e["name"] for e in catalog}) == len(catalog)
+    for e in catalog:
+        cmd = explain_command(e)
+        assert cmd["verbosity"] == "executionStats"
+        assert ("aggregate" in cmd["explain"]) == ("pipeline" in e)
+    find = explain_command(_entry(filter={"player_id": 7}, sort=[("date", -1)], limit=10))
+    assert find["explain"] == {"find": "individual_results", "filter": {"player_id": 7}, "sort": {"date": -1}, "limit": 10}
+
+
+def test_index_scan_within_ratio_is_clean():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+        "stage": "IXSCAN", "indexName": "ir_player_date_desc"}}}
+    row = analyze(_entry(filter={"player_id": 7}, sort=[("date", -1)]), _find_explain(plan, 10, 10, 10))
+    assert row["flags"] == [] and row["suggest"] is None
+    assert row["indexes"] == ["ir_player_date_desc"] and row["stages"] == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+def test_aggregation_collscan_gets_an_esr_index():
+    # classic engine: the query layer sits in the first stage's $cursor
+    explain = {"stages": [
+        {"$cursor": _find_explain({"stage": "PROJECTION_SIMPLE", "inputStage": {"stage": "COLLSCAN"}}, 8000, 0, 300)},
+        {"$group": {}},
+    ]}
+    entry = _entry(pipeline=[{"$match": {"date": {"$gte": NOW}}}, {"$group": {"_id": "$player_id"}}])
+    row = analyze(entry, explain, {"individual_results": [[("player_id", 1), ("date", -1)]]})
+    assert row["flags"] == ["COLLSCAN", "RATIO"]
+    assert row["suggest"] == [("date", 1)]
+    assert (row["docs_examined"], row["returned"]) == (8000, 300)
+
+    # intended full scans are not COLLSCAN findings, and an existing index silences the proposal
+    row = analyze({**entry, "full": True}, explain, {"individual_results": [[("date", 1)]]})
+    assert row["flags"] == ["RATIO"] and row["suggest"] is None
+
+
+def test_sbe_in_memory_sort_is_flagged_above_the_floor():
+    plan = {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "FETCH", "inputStage": {
+        "stage": "IXSCAN", "indexName": "rating_kind"}}}, "slotBasedPlan": {}}
+    entry = {"name": "/ratings", "coll": "ratings", "filter": {"kind": "player", "games": {"$gte": 10}},
+             "sort": [("rating", -1)], "limit": 40}
+    row = analyze(entry, _find_explain(plan, 500, 500, 40), {"ratings": [[("kind", 1)]]})
+    assert row["flags"] == ["SORT", "RATIO"]
+    assert row["suggest"] == [("kind", 1), ("rating", -1), ("games", 1)]
+    assert analyze(entry, _find_explain(plan, 8, 8, 8))["flags"] == []
+
+
+def test_lookup_collection_scans_count():
+    explain = {"stages": [
+        {"$cursor": _find_explain({"stage": "IXSCAN", "indexName": "ir_player_date_desc"}, 4, 4, 4)},
+        {"$lookup": {}, "totalDocsExamined": 40, "totalKeysExamined": 0, "collectionScans": 4},
+    ]}
+    row = analyze(_entry(pipeline=[{"$match": {"player_id": 7}}]), explain)
+    assert row["flags"] == ["COLLSCAN"] and row["docs_examined"] == 44
+
+
+def test_suggest_index_orders_equality_sort_range():
+    flt = {"player_id": 7, "deck_key": "najeela", "date": {"$gte": NOW}, "match_id": {"$ne": None},
+           "$or": [{"date": {"$gt": NOW}}, {"date": NOW, "match_id": {"$gt": 3}}]}
+    assert suggest_index(flt, [("date", 1), ("match_id", 1)]) == [
+        ("player_id", 1), ("deck_key", 1), ("date", 1), ("match_id", 1)]
+    assert suggest_index({"status": {"$in": ["queued"]}}, [("created_at", 1)]) == [("status", 1), ("created_at", 1)]
+    assert suggest_index({"players": {"$elemMatch": {"deck_key": "x", "deck_name": {"$ne": "y"}}}}, []) == [
+        ("players.deck_key", 1), ("players.deck_name", 1)]
+    assert suggest_index({}, []) is None
+    # an existing index that starts with the same fields already serves it
+    assert suggest_index({"kind": "deck", "day": {"$gte": NOW}}, [], [[("kind", 1), ("day", 1), ("x", 1)]]) is None
+
+
+def test_query_shape_reads_the_leading_match_and_sort():
+    entry = _entry(pipeline=[{"$match": {"player_id": 7}}, {"$sort": {"date": 1, "match_id": 1}}, {"$limit": 5}])
+    assert query_shape(entry) == ({"player_id": 7}, [("date", 1), ("match_id", 1)])
+    assert query_shape(_entry(pipeline=[{"$group": {"_id": 1}}])) == ({}, [])
+
+
+def test_render_lists_flagged_queries_first():
+    clean = {"name": "a", "coll": "c", "stages": ["IXSCAN"], "indexes": ["ix"], "keys_examined": 1,
+             "docs_examined": 1, "returned": 1, "ms": 0, "flags": [], "suggest": None}
+    bad = {**clean, "name": "b", "stages": ["COLLSCAN"], "indexes": [], "flags": ["COLLSCAN"], "suggest": [("date", 1)]}
+    lines = render_advice([clean, bad]).splitlines()
+    assert lines[0] == "Explained 2 queries; 1 flagged."
+    assert lines[1].startswith("- !! COLLSCAN b [c] via COLLSCAN")
+    assert lines[2].strip() == "↳ suggest c.createIndex({date: 1})"
+    assert lines[3].startswith("- a [c] via ix")
+
+
+# ---------- regression test against a local mongod ----------
+
+def test_bot_queries_use_indexes_on_local_mongod(monkeypatch, mongo_uri):
+    """Seed a throwaway database, ensure the indexes, and explain the whole catalog: nothing may scan or sort in memory."""
+    monkeypatch.setenv("MONGO_URI_MATCH_LOGGER", mongo_uri)
+    monkeypatch.setenv("MONGO_DB_NAME", TEST_DB_NAME)
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test")
+    monkeypatch.setenv("GUILD_ID", "0")
+    import db
+    from utils.query_advisor import explain_queries
+    from utils.rollups import freeze_closed_months, rebuild_rollups
+
+    # db may already be imported with another name; never drop anything but the throwaway database
+    assert db.db.name == TEST_DB_NAME
+
+    async def run():
+        await db._client.drop_database(TEST_DB_NAME)
+        try:
+            await db.ensure_indexes()
+            rng = random.Random(3)
+            decks = [f"Deck {i}" for i in range(30)]
+            mds = [build_match_doc(mid, [(pid, rng.choice(decks)) for pid in rng.sample(range(1, 41), 4)],
+                                   rng.randint(0, 3), NOW - timedelta(hours=6 * mid))
+                   for mid in range(1, 1201)]
+            await db.matches.insert_many([dict(md) for md in mds])
+            await db.individual_results.insert_many([r for md in mds for r in individual_result_docs(md)])
+            await db.decks.insert_many([{"name": d, "deck_key": d.lower(), "players": []} for d in decks])
+            await rebuild_rollups()
+            await freeze_closed_months(NOW - timedelta(days=60))
+            return await explain_queries(include_full=True)
+        finally:
+            await db._client.drop_database(TEST_DB_NAME)
+
+    rows = asyncio.run(run())
+    assert len(rows) == len(query_catalog(SAMPLE))
+    flagged = {r["name"]: r["flags"] for r in rows if {"COLLSCAN", "SORT"} & set(r["flags"])}
+    assert flagged == {}, render_advice(rows)
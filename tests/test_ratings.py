@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import UpdateOne
+
+from utils.match_docs import build_match_doc
+from utils.ratings import (
+    BASE_RATING,
+    apply_match,
+    checkpoint_doc,
+    checkpoint_table,
+    expected,
+    pod_deltas,
+    rating_ops,
+    rating_rows,
+    ratings_filter,
+    render_ratings,
+    replay,
+)
+
+WHEN = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def _match(mid=1, winner=0, pids=(10, 11, 12, 13), decks=("Kraum/Tymna", "Najeela", "Kinnan", "Najeela")):
+    return build_match_doc(mid, list(zip(pids, decks)), winner, WHEN)
+
+
+def test_pod_deltas_are_zero_sum_and_favour_the_winner():
+    d = pod_deltas([BASE_RATING] * 4, [1, 0, 0, 0])
+    assert sum(d) == pytest.approx(0)
+    assert d[0] == pytest.approx(16)  # K spread over three opponents, each worth 0.5 surprise
+    assert d[1] == d[2] == d[3] == pytest.approx(-16 / 3)
+
+
+def test_draw_between_equals_changes_nothing():
+    assert pod_deltas([BASE_RATING] * 4, [0.5] * 4) == [0.0] * 4
+
+
+def test_upset_is_worth_more():
+    favourite_wins = pod_deltas([1700, 1500], [1, 0])[0]
+    underdog_wins = pod_deltas([1500, 1700], [1, 0])[0]
+    assert underdog_wins > favourite_wins > 0
+    assert expected(1700, 1500) + expected(1500, 1700) == pytest.approx(1)
+
+
+def test_apply_match_updates_players_and_decks():
+    table = {}
+    touched = apply_match(table, _match())
+    assert ("player", 10) in touched and ("deck", "najeela") in touched
+    assert len(touched) == len(set(touched)) == 7  # four players, three distinct decks
+    assert table[("player", 10)]["games"] == 1
+    assert table[("deck", "najeela")]["games"] == 2
+    assert table[("deck", "najeela")]["name"] == "Najeela"
+    assert sum(r["rating"] - BASE_RATING for (k, _), r in table.items() if k == "player") == pytest.approx(0)
+
+
+def test_unrecorded_results_are_skipped():
+    md = _match()
+    md["players"][2]["result"] = None
+    table = {}
+    assert apply_match(table, md) == [] and table == {}
+
+
+def test_incremental_equals_replay():
+    mds = [_match(i, winner=i % 4 if i % 5 else None) for i in range(1, 30)]
+    table = {}
+    for md in mds:
+        apply_match(table, md)
+    assert table == replay(mds)
+
+
+def test_replay_resumes_from_a_checkpoint():
+    mds = [_match(i, winner=i % 4) for i in range(1, 20)]
+    doc = checkpoint_doc(WHEN, replay(mds[:12]))
+    assert doc["_id"] == WHEN and len(doc["rows"]) == 7
+    table = checkpoint_table(doc)
+    for md in mds[12:]:
+        apply_match(table, md)
+    assert table == replay(mds)
+
+
+def test_ops_rows_and_filter():
+    table = replay([_match()])
+    ops = rating_ops(table, [("player", 10)])
+    rating = table[("player", 10)]["rating"]
+    assert ops == [UpdateOne({"kind": "player", "key": 10}, {"$set": {"rating": rating, "games": 1}}, upsert=True)]
+    assert {"kind": "deck", "key": "kinnan", "rating": table[("deck", "kinnan")]["rating"],
+            "games": 1, "name": "Kinnan"} in rating_rows(table)
+    q = ratings_filter([("player", 11), ("player", 10), ("deck", "kinnan")])
+    assert q == {"$or": [{"kind": "player", "key": {"$in": [10, 11]}}, {"kind": "deck", "key": {"$in": ["kinnan"]}}]}
+
+
+def test_render_ratings_skips_unknown_names():
+    rows = [{"key": 1, "rating": 1612.4, "games": 20}, {"key": 2, "rating": 1580.0, "games": 12}]
+    [embed] = render_ratings("Player Ratings", rows, lambda d: "Ana" if d["key"] == 2 else None, color=0)
+    assert [f.name for f in embed.fields] == ["🥇 Ana"]
+    assert embed.fields[0].value == "**1580** (Games: 12)"
+    assert render_ratings("Empty", [], lambda d: "x", color=0)[0].description == "No results found."
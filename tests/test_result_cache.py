@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+
+from utils.result_cache import ResultCache, day_key, period_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    return calls, compute
+
+
+def test_hit_until_ttl_expires():
+    clock = _Clock()
+    cache = ResultCache(ttl=10, clock=clock)
+    calls, compute = _counter()
+
+    async def run():
+        assert await cache.get_or_compute("k", compute) == 1
+        clock.now = 9
+        assert await cache.get_or_compute("k", compute) == 1
+        clock.now = 10
+        assert await cache.get_or_compute("k", compute) == 2
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_invalidate_drops_results_computed_before_a_write():
+    cache = ResultCache()
+    calls, compute = _counter()
+
+    async def slow_compute():
+        cache.invalidate()  # a /track lands while the query is running
+        return "stale"
+
+    async def run():
+        await cache.get_or_compute("k", slow_compute)
+        assert "k" not in cache._entries
+        assert await cache.get_or_compute("k", compute) == 1
+
+    asyncio.run(run())
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache()
+    calls, compute = _counter()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert len(calls) == 1
+
+
+def test_period_keys_bucket_by_utc_day():
+    morning = datetime(2025, 3, 1, 0, 5, tzinfo=timezone.utc)
+    night = datetime(2025, 3, 1, 23, 55)
+    assert period_key("3m", True, morning) == period_key("3m", 1, night) == ("3m", True, "2025-03-01")
+    assert day_key(datetime(2025, 3, 2, tzinfo=timezone.utc)) != day_key(morning)
@@ -0,0 +1,289 @@
+# utils/analytics.py
+"""
+In-memory columnar copy of individual_results for the stats commands.
+
+Rows live in NumPy columns (player int64, deck category code, seat, result enum,
+datetime64 date, match_id); windows are boolean masks and grouping is
+`np.unique` + `np.bincount`. The write path (utils.match_writes) feeds inserts,
+deletes and edits in so the columns stay current; deck renames/merges just mark
+the engine stale and it reloads on the next query.
+
+Used instead of the Mongo aggregations when ANALYTICS_BACKEND=numpy. The result
+shapes match what the pipelines return so the cogs render either one unchanged.
+Pure — no config/db imports.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.match_docs import individual_result_docs, day_bucket, SEATS
+from utils.text import deck_key
+from utils.time_ranges import POSTBAN_START
+
+DRAW_WEIGHT = 0.143
+WIN, LOSS, DRAW, OTHER = 0, 1, 2, 3
+RESULT_CODES = {"win": WIN, "loss": LOSS, "draw": DRAW}
+
+_COLUMNS = {
+    "player": np.int64,
+    "deck": np.int32,
+    "seat": np.int8,
+    "result": np.int8,
+    "date": "datetime64[ms]",
+    "match_id": np.int64,
+}
+
+
+def to_dt64(dt: datetime) -> np.datetime64:
+    """UTC datetime64[ms]; naive datetimes (as Motor returns them) are taken as UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dt, "ms")
+
+
+class AnalyticsEngine:
+    """Columnar individual_results with vectorized leaderboard/deck/player/seat queries."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._loading = False
+        self._dirty = False
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self._n = 0
+        self._cols: Dict[str, np.ndarray] = {k: np.empty(0, dtype=t) for k, t in _COLUMNS.items()}
+        self._deck_codes: Dict[str, int] = {}   # deck_key -> code
+        self._deck_names: List[str] = []         # code -> display name (latest seen)
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ----- columns -----
+
+    def col(self, name: str) -> np.ndarray:
+        return self._cols[name][: self._n]
+
+    def _deck_code(self, name: str) -> int:
+        key = deck_key(name)
+        code = self._deck_codes.get(key)
+        if code is None:
+            code = self._deck_codes[key] = len(self._deck_names)
+            self._deck_names.append(name)
+        else:
+            self._deck_names[code] = name
+        return code
+
+    def _reserve(self, extra: int):
+        need = self._n + extra
+        cap = len(self._cols["player"])
+        if need <= cap:
+            return
+        cap = max(need, cap * 2, 1024)
+        for k, arr in self._cols.items():
+            grown = np.empty(cap, dtype=arr.dtype)
+            grown[: self._n] = arr[: self._n]
+            self._cols[k] = grown
+
+    def _append_rows(self, rows: Iterable[dict]):
+        rows = [r for r in rows if r.get("date") is not None]
+        if not rows:
+            return
+        self._reserve(len(rows))
+        sl = slice(self._n, self._n + len(rows))
+        self._cols["player"][sl] = [int(r["player_id"]) for r in rows]
+        self._cols["deck"][sl] = [self._deck_code(r.get("deck_name") or "") for r in rows]
+        self._cols["seat"][sl] = [r.get("seat") if r.get("seat") in SEATS else 0 for r in rows]
+        self._cols["result"][sl] = [RESULT_CODES.get(r.get("result"), OTHER) for r in rows]
+        self._cols["date"][sl] = [to_dt64(r["date"]) for r in rows]
+        self._cols["match_id"][sl] = [int(r["match_id"]) if r.get("match_id") is not None else -1 for r in rows]
+        self._n += len(rows)
+
+    def _drop(self, keep: np.ndarray):
+        kept = int(keep.sum())
+        for k in self._cols:
+            self._cols[k][:kept] = self._cols[k][: self._n][keep]
+        self._n = kept
+
+    # ----- maintenance -----
+
+    def load(self, rows: Iterable[dict]):
+        self._reset()
+        self._append_rows(rows)
+        self.loaded = True
+
+    def invalidate(self):
+        """Force a reload on next use (deck renames/merges, bulk repairs)."""
+        self.loaded = False
+        if self._loading:
+            self._dirty = True
+
+    def _track(self) -> bool:
+        if self._loading:
+            self._dirty = True  # the in-flight load may or may not have seen this write
+        return self.loaded
+
+    def on_insert(self, mds: List[dict]):
+        if self._track():
+            self._append_rows([d for md in mds for d in individual_result_docs(md)])
+
+    def on_delete(self, mds: List[dict]):
+        if self._track():
+            ids = np.array([md["match_id"] for md in mds], dtype=np.int64)
+            self._drop(~np.isin(self.col("match_id"), ids))
+
+    def on_edit(self, before: dict, after: Optional[dict]):
+        if self._track():
+            self.on_delete([before])
+            if after:
+                self.on_insert([after])
+
+    # ----- grouping helpers -----
+
+    def _mask(self, start: Optional[datetime] = None, end: Optional[datetime] = None, **eq) -> np.ndarray:
+        m = np.ones(self._n, dtype=bool)
+        if start is not None:
+            m &= self.col("date") >= to_dt64(start)
+        if end is not None:
+            m &= self.col("date") < to_dt64(end)
+        for name, value in eq.items():
+            m &= self.col(name) == value
+        return m
+
+    def _group(self, by: str, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        keys, inv = np.unique(self.col(by)[mask], return_inverse=True)
+        res = self.col("result")[mask]
+        n = len(keys)
+        games = np.bincount(inv, minlength=n)
+        wins = np.bincount(inv, weights=res == WIN, minlength=n).astype(np.int64)
+        losses = np.bincount(inv, weights=res == LOSS, minlength=n).astype(np.int64)
+        draws = np.bincount(inv, weights=res == DRAW, minlength=n).astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normal = np.where(games > 0, wins / games * 100, 0.0)
+            weighted = np.where(games > 0, (wins + draws * DRAW_WEIGHT) / games * 100, 0.0)
+        return {"key": keys, "games": games, "wins": wins, "losses": losses, "draws": draws,
+                "normal": normal, "weighted": weighted}
+
+    @staticmethod
+    def _ranked(g: Dict[str, np.ndarray], min_games: int = 0, limit: Optional[int] = None) -> np.ndarray:
+        """Row indices: weighted win% desc, games desc, key asc."""
+        idx = np.flatnonzero(g["games"] >= max(min_games, 1))
+        order = np.lexsort((g["key"][idx], -g["games"][idx], -g["weighted"][idx]))
+        idx = idx[order]
+        return idx[:limit] if limit else idx
+
+    def _rows(self, g, idx, *, deck_ids: bool, pct_field: str) -> List[dict]:
+        keys = self._deck_keys() if deck_ids else None
+        out = []
+        for i in idx:
+            key = int(g["key"][i])
+            row = {
+                "_id": keys[key] if deck_ids else key,
+                "games_played": int(g["games"][i]),
+                "wins": int(g["wins"][i]),
+                "losses": int(g["losses"][i]),
+                "draws": int(g["draws"][i]),
+                pct_field: float(g["normal"][i]),
+                "weighted_win_percentage": float(g["weighted"][i]),
+            }
+            if deck_ids:
+                row["name"] = row["deck_name"] = self._deck_names[key]
+            out.append(row)
+        return out
+
+    def _deck_keys(self) -> List[str]:
+        keys = [""] * len(self._deck_names)
+        for k, code in self._deck_codes.items():
+            keys[code] = k
+        return keys
+
+    def _seat_rows(self, mask: np.ndarray, *, seated_only: bool = False) -> List[dict]:
+        """Rows shaped like a `$group` by seat; rows without a seat 1-4 come back under `_id` None."""
+        g = self._group("seat", mask)
+        out = []
+        for i in range(len(g["key"])):
+            seat = int(g["key"][i])
+            if seat not in SEATS and seated_only:
+                continue
+            out.append({"_id": seat if seat in SEATS else None, "games": int(g["games"][i]),
+                        "wins": int(g["wins"][i]), "losses": int(g["losses"][i]), "draws": int(g["draws"][i])})
+        return out
+
+    # ----- queries -----
+
+    def leaderboard(
+        self,
+        kind: str,
+        start: datetime,
+        previous: Optional[Tuple[datetime, datetime]] = None,
+        *,
+        min_games: int = 15,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[dict]]:
+        """Same shape as utils.leaderboard's $facet: {"current": [...], "previous": [...]}; whole UTC days."""
+        by = "player" if kind == "player" else "deck"
+        g = self._group(by, self._mask(day_bucket(start)))
+        out = {"current": self._rows(g, self._ranked(g, min_games, limit), deck_ids=by == "deck",
+                                     pct_field="normal_win_percentage")}
+        if previous:
+            pg = self._group(by, self._mask(day_bucket(previous[0]), day_bucket(previous[1])))
+            out["previous"] = self._rows(pg, np.flatnonzero(pg["games"] > 0), deck_ids=by == "deck",
+                                         pct_field="normal_win_percentage")
+        return out
+
+    def deck_stats(self, deck: str, start: datetime, *, min_games: int = 5, top: int = 10) -> Tuple[List[dict], List[dict]]:
+        """(seat rows, top players) for /deckstats."""
+        code = self._deck_codes.get(deck_key(deck))
+        if code is None:
+            return [], []
+        mask = self._mask(start, deck=code)
+        g = self._group("player", mask)
+        players = self._rows(g, self._ranked(g, min_games, top), deck_ids=False, pct_field="win_percentage")
+        return self._seat_rows(mask), players
+
+    def player_stats(self, player_id: int, start: datetime, deck: Optional[str] = None, *, top: int = 10) -> Dict[str, Any]:
+        """{"seats": [...], "top_decks": [...]} like utils.player_stats' facet (games are not held here)."""
+        mask = self._mask(start, player=int(player_id))
+        if deck:
+            code = self._deck_codes.get(deck_key(deck))
+            if code is None:
+                return {"seats": []}
+            return {"seats": self._seat_rows(mask & (self.col("deck") == code))}
+        g = self._group("deck", mask)
+        return {"seats": self._seat_rows(mask),
+                "top_decks": self._rows(g, self._ranked(g, 0, top), deck_ids=True, pct_field="win_percentage")}
+
+    def era_seat_split(self, cutoffs: List[datetime]) -> List[List[dict]]:
+        """Seat rows per era between sorted `cutoffs` (len(cutoffs) + 1 eras), like utils.eras' pipeline."""
+        era = np.searchsorted(np.array([to_dt64(c) for c in cutoffs], dtype="datetime64[ms]"),
+                              self.col("date"), side="right")
+        return [self._seat_rows(era == i, seated_only=True) for i in range(len(cutoffs) + 1)]
+
+    def global_seat_split(self) -> Dict[str, List[dict]]:
+        """{era: seat rows} like utils.rollups.global_seat_split."""
+        pre, post = self.era_seat_split([POSTBAN_START])
+        return {"preban": pre, "postban": post}
+
+
+engine = AnalyticsEngine()
+
+
+async def ensure_loaded(ir_coll, *, force: bool = False) -> AnalyticsEngine:
+    """Load the shared engine from individual_results (once, or again after invalidate())."""
+    async with engine._lock:
+        if engine.loaded and not force:
+            return engine
+        engine._loading, engine._dirty = True, False
+        try:
+            rows = [r async for r in ir_coll.find(
+                {}, {"_id": 0, "player_id": 1, "deck_name": 1, "seat": 1, "result": 1, "date": 1, "match_id": 1})]
+            engine.load(rows)
+        finally:
+            engine._loading = False
+        if engine._dirty:
+            engine.loaded = False  # a write raced the load; rebuild on next use
+    return engine
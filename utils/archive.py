@@ -0,0 +1,124 @@
+# utils/archive.py
+"""
+Monthly archive of individual_results: once a month is closed it is compacted
+into one row per (month, player, deck) in monthly_summaries. Long-range reads
+combine the frozen months with the raw rows around them: the head before the
+first whole month and the tail since the archive boundary. Their cost then
+grows with months, not with games.
+
+    raw head [start, first whole month) + summaries [.., boundary) + raw tail [boundary, ..)
+
+Pure — no config/db imports; utils.rollups does the freezing.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+DRAW_WEIGHT = 0.143
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def month_floor(dt: datetime) -> datetime:
+    """UTC midnight on the 1st of `dt`'s month. Naive datetimes are taken as UTC."""
+    dt = _utc(dt)
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month: datetime) -> datetime:
+    month = month_floor(month)
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def month_ceil(dt: datetime) -> datetime:
+    """The first month start at or after `dt`."""
+    m = month_floor(dt)
+    return m if m == _utc(dt) else next_month(m)
+
+
+def _count(result: str) -> dict:
+    return {"$sum": {"$cond": [{"$eq": ["$result", result]}, 1, 0]}}
+
+
+def freeze_pipeline(month: datetime) -> List[Dict[str, Any]]:
+    """individual_results for one month -> monthly_summaries rows (one per player and deck)."""
+    return [
+        {"$match": {"date": {"$gte": month_floor(month), "$lt": next_month(month)}}},
+        {"$group": {
+            "_id": {"player_id": "$player_id", "deck_key": "$deck_key"},
+            "deck_name": {"$last": "$deck_name"},
+            "games": {"$sum": 1},
+            "wins": _count("win"), "losses": _count("loss"), "draws": _count("draw"),
+        }},
+        {"$project": {
+            "_id": 0, "month": {"$literal": month_floor(month)},
+            "player_id": "$_id.player_id", "deck_key": "$_id.deck_key", "deck_name": 1,
+            "games": 1, "wins": 1, "losses": 1, "draws": 1,
+        }},
+    ]
+
+
+def archive_pipeline(
+    match: Dict[str, Any],
+    start: datetime,
+    boundary: Optional[datetime],
+    group_by: str,
+    *,
+    pct_field: str = "win_percentage",
+    min_games: int = 0,
+    limit: Optional[int] = None,
+    summaries: str = "monthly_summaries",
+) -> List[Dict[str, Any]]:
+    """
+    W/L/D per `group_by` ("player_id" or "deck_key") for rows matching `match`
+    since `start`. The pipeline runs on individual_results and pulls frozen
+    months from `summaries` with $unionWith. Rows come back ranked like the
+    leaderboards: {_id, deck_name, games_played, wins, losses, draws,
+    <pct_field>, weighted_win_percentage}.
+    With no boundary (nothing frozen yet), everything is raw.
+    """
+    lo = month_ceil(start)
+    if boundary is None or lo >= boundary:
+        raw: Dict[str, Any] = {"date": {"$gte": start}}
+        frozen = None
+    else:
+        raw = {"$or": [{"date": {"$gte": start, "$lt": lo}}, {"date": {"$gte": boundary}}]}
+        frozen = {"month": {"$gte": lo, "$lt": boundary}}
+
+    stages: List[Dict[str, Any]] = [
+        {"$match": {**match, **raw}},
+        {"$project": {"_id": 0, "player_id": 1, "deck_key": 1, "deck_name": 1, "games": {"$literal": 1},
+                      "wins": {"$cond": [{"$eq": ["$result", "win"]}, 1, 0]},
+                      "losses": {"$cond": [{"$eq": ["$result", "loss"]}, 1, 0]},
+                      "draws": {"$cond": [{"$eq": ["$result", "draw"]}, 1, 0]}}},
+    ]
+    if frozen:
+        stages.append({"$unionWith": {"coll": summaries, "pipeline": [{"$match": {**match, **frozen}}]}})
+
+    weighted = {"$add": ["$wins", {"$multiply": ["$draws", DRAW_WEIGHT]}]}
+    stages += [
+        {"$group": {"_id": f"${group_by}", "deck_name": {"$last": "$deck_name"},
+                    "games_played": {"$sum": "$games"}, "wins": {"$sum": "$wins"},
+                    "losses": {"$sum": "$losses"}, "draws": {"$sum": "$draws"}}},
+        {"$match": {"games_played": {"$gte": max(min_games, 1)}}},
+        {"$addFields": {
+            pct_field: {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+            "weighted_win_percentage": {"$multiply": [{"$divide": [weighted, "$games_played"]}, 100]},
+        }},
+        {"$sort": {"weighted_win_percentage": -1, "games_played": -1, "_id": 1}},
+    ]
+    if limit:
+        stages.append({"$limit": limit})
+    return stages
+
+
+def months_between(first: datetime, end: datetime) -> List[datetime]:
+    """Month starts from `first`'s month up to (not including) `end`'s month."""
+    out: List[datetime] = []
+    m, stop = month_floor(first), month_floor(end)
+    while m < stop:
+        out.append(m)
+        m = next_month(m)
+    return out
@@ -0,0 +1,148 @@
+# utils/batch_import.py
+"""
+Parse and validate /trackbatch uploads (CSV or JSON pods), and the match-id
+lists /deletetrack takes to roll a batch back. No config/env imports.
+"""
+
+import csv
+import io
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MAX_PODS = 200
+MAX_DELETE = MAX_PODS  # one /deletetrack call can undo one whole batch
+SEATS = (1, 2, 3, 4)
+
+_ID_RE = re.compile(r"\d{5,}")  # raw snowflake or a <@123…> mention
+
+# A parsed pod: {"line": row number (1-based), "seats": [(player_id, deck_name)] in
+# seat order, "winner": 0-based seat index or None for a draw, "date": datetime | None}
+Pod = Dict[str, Any]
+
+
+def _parse_player(raw) -> Optional[int]:
+    m = _ID_RE.search(str(raw or ""))
+    return int(m.group(0)) if m else None
+
+
+def _parse_winner(raw) -> Tuple[bool, Optional[int]]:
+    """(ok, seat index or None for draw). Accepts 1-4, 'Player 3', 'draw'."""
+    val = str(raw or "").strip().lower()
+    if val == "draw":
+        return True, None
+    m = re.fullmatch(r"(?:player\s*)?([1-4])", val)
+    if m:
+        return True, int(m.group(1)) - 1
+    return False, None
+
+
+def _parse_date(raw) -> Tuple[bool, Optional[datetime]]:
+    val = str(raw or "").strip()
+    if not val:
+        return True, None
+    try:
+        dt = datetime.fromisoformat(val.replace("Z", "+00:00"))
+    except ValueError:
+        return False, None
+    return True, dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _rows(filename: str, data: bytes) -> List[dict]:
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        payload = json.loads(text)
+        if isinstance(payload, dict):
+            payload = payload.get("pods", [])
+        if not isinstance(payload, list):
+            raise ValueError("JSON must be a list of pods (or {\"pods\": [...]}).")
+        return [r if isinstance(r, dict) else {} for r in payload]
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def parse_pods(filename: str, data: bytes) -> Tuple[List[Pod], List[str]]:
+    """
+    Rows need player1..player4 (user IDs or mentions), deck1..deck4 and winner
+    (1-4, "Player N" or "draw"); an ISO `date` column is optional.
+    Returns (pods, errors); callers should write nothing if errors is non-empty.
+    """
+    try:
+        rows = _rows(filename, data)
+    except (ValueError, UnicodeDecodeError) as e:
+        return [], [f"Could not read file: {e}"]
+
+    if not rows:
+        return [], ["No pods found in the file."]
+    if len(rows) > MAX_PODS:
+        return [], [f"Too many pods ({len(rows)}); the limit is {MAX_PODS} per upload."]
+
+    pods: List[Pod] = []
+    errors: List[str] = []
+    for line, row in enumerate(rows, start=1):
+        row = {str(k or "").strip().lower(): v for k, v in row.items()}
+        seats, problems = [], []
+        for s in SEATS:
+            pid = _parse_player(row.get(f"player{s}"))
+            deck = str(row.get(f"deck{s}") or "").strip()
+            if pid is None:
+                problems.append(f"player{s} is not a user ID")
+            if not deck:
+                problems.append(f"deck{s} is empty")
+            seats.append((pid, deck))
+        if len({pid for pid, _ in seats if pid is not None}) < sum(pid is not None for pid, _ in seats):
+            problems.append("same player in two seats")
+        ok_w, winner = _parse_winner(row.get("winner"))
+        if not ok_w:
+            problems.append(f"winner `{row.get('winner')}` must be 1-4 or draw")
+        ok_d, date = _parse_date(row.get("date"))
+        if not ok_d:
+            problems.append(f"date `{row.get('date')}` is not ISO-8601")
+
+        if problems:
+            errors.append(f"Row {line}: " + "; ".join(problems))
+        else:
+            pods.append({"line": line, "seats": seats, "winner": winner, "date": date})
+    return pods, errors
+
+
+def resolve_decks(pods: List[Pod], resolve: Callable[[str], Optional[str]]) -> List[str]:
+    """
+    Swap every deck for its stored spelling via `resolve` (one in-memory lookup each).
+    Returns the sorted list of names that don't exist; pods are updated in place.
+    """
+    unknown = set()
+    for pod in pods:
+        fixed = []
+        for pid, deck in pod["seats"]:
+            name = resolve(deck)
+            if name is None:
+                unknown.add(deck)
+            fixed.append((pid, name or deck))
+        pod["seats"] = fixed
+    return sorted(unknown, key=str.lower)
+
+
+def parse_match_ids(text: str, limit: int = MAX_DELETE) -> List[int]:
+    """
+    "120-135, 140 142" -> sorted unique match ids. Raises ValueError with a
+    user-facing message on bad tokens, reversed ranges or more than `limit` ids.
+    """
+    ids = set()
+    for tok in re.split(r"[,\s]+", (text or "").strip()):
+        if not tok:
+            continue
+        m = re.fullmatch(r"(\d+)(?:-(\d+))?", tok)
+        if not m:
+            raise ValueError(f"`{tok}` is not a match id or an id range like `120-135`.")
+        lo, hi = int(m.group(1)), int(m.group(2) or m.group(1))
+        if hi < lo:
+            raise ValueError(f"`{tok}` is backwards; write the lower id first.")
+        if hi - lo + 1 + len(ids) > limit:
+            raise ValueError(f"At most {limit} matches per delete.")
+        ids.update(range(lo, hi + 1))
+    if not ids:
+        raise ValueError("Give a match id, a range like `120-135`, or a comma-separated list.")
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} matches per delete.")
+    return sorted(ids)
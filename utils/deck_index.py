@@ -0,0 +1,124 @@
+# utils/deck_index.py
+"""Process-wide in-memory index of deck names, used by every deck autocomplete."""
+
+import asyncio
+from bisect import bisect_left, insort
+from typing import Iterable
+
+import discord
+
+from utils.text import deck_key
+
+AUTOCOMPLETE_LIMIT = 25
+_WORD_SEPARATORS = (" ", "/", "-", ",", "(")
+
+
+class DeckIndex:
+    """Sorted (deck_key, name) pairs with prefix/substring search and ranking.
+
+    Mongo stays the source of truth; the write paths (/newdeck, /removedeckfromdatabase
+    and the rename/merge jobs in cogs.jobs) call add/rename/discard so the index never goes stale.
+    """
+
+    def __init__(self):
+        self._sorted: list[tuple[str, str]] = []   # (deck_key, name), kept sorted
+        self._names: set[str] = set()
+        self.loaded = False
+        self.version = 0  # bumped on every change; lets dependants rebuild lazily
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def names(self) -> list[str]:
+        return [n for _, n in self._sorted]
+
+    def load(self, names: Iterable[str]):
+        clean = {n for n in names if isinstance(n, str) and n.strip()}
+        self._names = clean
+        self._sorted = sorted((deck_key(n), n) for n in clean)
+        self.loaded = True
+        self.version += 1
+
+    def add(self, name: str):
+        if not name or name in self._names:
+            return
+        self._names.add(name)
+        insort(self._sorted, (deck_key(name), name))
+        self.version += 1
+
+    def discard(self, name: str):
+        if name not in self._names:
+            return
+        self._names.discard(name)
+        i = bisect_left(self._sorted, (deck_key(name), name))
+        if i < len(self._sorted) and self._sorted[i][1] == name:
+            del self._sorted[i]
+        self.version += 1
+
+    def rename(self, old: str, new: str):
+        self.discard(old)
+        self.add(new)
+
+    def resolve(self, name: str) -> str | None:
+        """Stored spelling of `name` (exact first, then case-insensitive), or None."""
+        if name in self._names:
+            return name
+        low = deck_key(name)
+        i = bisect_left(self._sorted, (low, ""))
+        if i < len(self._sorted) and self._sorted[i][0] == low:
+            return self._sorted[i][1]
+        return None
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[str]:
+        """Ranked matches: exact > prefix > word-prefix > substring, then shorter, then A–Z."""
+        q = deck_key(query)
+        if not q:
+            return [n for _, n in self._sorted[:limit]]
+
+        ranked: list[tuple[int, int, str, str]] = []
+        seen: set[str] = set()
+
+        # prefix hits come straight off the sorted list
+        i = bisect_left(self._sorted, (q, ""))
+        while i < len(self._sorted) and self._sorted[i][0].startswith(q):
+            low, name = self._sorted[i]
+            ranked.append((0 if low == q else 1, len(low), low, name))
+            seen.add(name)
+            i += 1
+
+        for low, name in self._sorted:
+            if name in seen:
+                continue
+            pos = low.find(q)
+            if pos < 0:
+                continue
+            tier = 2 if low[pos - 1] in _WORD_SEPARATORS else 3
+            ranked.append((tier, len(low), low, name))
+
+        ranked.sort()
+        return [name for *_, name in ranked[:limit]]
+
+
+deck_index = DeckIndex()
+_load_lock = asyncio.Lock()
+
+
+async def load_deck_index(decks_coll, *, force: bool = False) -> DeckIndex:
+    """Fill the shared index from the decks collection (once, unless forced)."""
+    async with _load_lock:
+        if deck_index.loaded and not force:
+            return deck_index
+        names = [d["name"] async for d in decks_coll.find({}, {"name": 1, "_id": 0})]
+        deck_index.load(names)
+    return deck_index
+
+
+async def deck_autocomplete(ctx: discord.AutocompleteContext) -> list[str]:
+    """Deck names ranked against what the user typed; served from memory."""
+    if not deck_index.loaded:
+        from db import decks
+        await load_deck_index(decks)
+    return deck_index.search(ctx.value or "")
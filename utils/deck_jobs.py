@@ -0,0 +1,127 @@
+# utils/deck_jobs.py
+"""
+Deck maintenance jobs (rename, merge) as documents in the jobs collection.
+
+The admin commands validate and enqueue; the Jobs cog claims one job at a time
+and walks its steps. Matches move in batches of BATCH_SIZE, each in one
+transaction with its individual_results rows and the derived stores (see
+utils.match_writes.move_deck_batch), so readers never see the deck split
+between the two keys. Every batch re-selects rows still on the old key, so a
+job resumed after a restart just carries on. The step index and per-collection
+counts are checkpointed on the job after each batch, and the worker edits a
+progress message from them.
+
+    deck_doc -> matches -> individual_results -> derived
+
+deck_doc goes first: once the old name leaves the deck list, new logs can't
+land on the key being drained. individual_results then picks up rows with no
+match to move with, and derived recounts the two keys and replays ratings.
+Pure — no config/db imports.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.text import deck_key
+
+BATCH_SIZE = 500
+KINDS = ("rename", "merge")
+STEPS = ("deck_doc", "matches", "individual_results", "derived")
+ACTIVE = ("queued", "running")
+BAR_WIDTH = 12
+
+
+def deck_job(
+    job_id: int,
+    kind: str,
+    old_name: str,
+    new_name: str,
+    *,
+    drop_old: bool,
+    channel_id: Optional[int],
+    requested_by: Optional[int],
+    now: datetime,
+) -> Dict[str, Any]:
+    """
+    A queued job document. "rename" renames the old deck doc in place and keeps
+    its players; "merge" moves the old deck's logs onto an existing deck,
+    recounts that deck's players and, with drop_old, deletes the old deck doc.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    return {
+        "_id": job_id,
+        "kind": kind,
+        "old_name": old_name, "old_key": deck_key(old_name),
+        "new_name": new_name, "new_key": deck_key(new_name),
+        "drop_old": drop_old,
+        "status": "queued",
+        "step": 0,
+        "totals": {},
+        "done": {"individual_results": 0, "matches": 0},
+        "channel_id": channel_id,
+        "message_id": None,
+        "requested_by": requested_by,
+        "created_at": now,
+        "updated_at": now,
+        "error": None,
+    }
+
+
+def conflict_filter(keys: List[str]) -> Dict[str, Any]:
+    """Active jobs touching any of these deck keys (two jobs must not drain into each other)."""
+    keys = [k for k in keys if k]
+    return {"status": {"$in": list(ACTIVE)},
+            "$or": [{"old_key": {"$in": keys}}, {"new_key": {"$in": keys}}]}
+
+
+def ir_filter(job: dict) -> Dict[str, Any]:
+    """individual_results rows the job still has to move (the name check covers case-only fixes)."""
+    return {"deck_key": job["old_key"], "deck_name": {"$ne": job["new_name"]}}
+
+
+def match_filter(job: dict) -> Dict[str, Any]:
+    """matches with a seat the job still has to move."""
+    return {"players": {"$elemMatch": {"deck_key": job["old_key"], "deck_name": {"$ne": job["new_name"]}}}}
+
+
+def match_update(job: dict) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """($set, array_filters) moving the old seats of a match onto the new deck."""
+    return ({"$set": {"players.$[elem].deck_name": job["new_name"], "players.$[elem].deck_key": job["new_key"]}},
+            [{"elem.deck_key": job["old_key"]}])
+
+
+def moved_match(job: dict, md: dict) -> dict:
+    """Copy of `md` as match_update leaves it: every seat on the old key moved onto the new deck."""
+    new = {"deck_name": job["new_name"], "deck_key": job["new_key"]}
+    return {**md, "players": [{**p, **new} if p.get("deck_key") == job["old_key"] else dict(p)
+                              for p in md.get("players", [])]}
+
+
+def progress_bar(done: int, total: int, width: int = BAR_WIDTH) -> str:
+    if total <= 0:
+        return "▓" * width
+    filled = min(width, round(width * done / total))
+    return "▓" * filled + "░" * (width - filled)
+
+
+def job_title(job: dict) -> str:
+    verb = "Rename" if job["kind"] == "rename" else "Merge"
+    return f"Job #{job['_id']}: {verb} {job['old_name']} → {job['new_name']}"
+
+
+def job_progress(job: dict) -> str:
+    """Multi-line status for the progress message: one line per step, then the error if any."""
+    step = job.get("step", 0)
+    lines = []
+    for i, name in enumerate(STEPS):
+        mark = "✅" if i < step or job["status"] == "done" else ("⏳" if i == step else "▫️")
+        line = f"{mark} {name.replace('_', ' ')}"
+        if name in job.get("done", {}):
+            done, total = job["done"][name], job.get("totals", {}).get(name, 0)
+            line += f" `{progress_bar(done, total)}` {done}/{total}"
+        lines.append(line)
+    lines.append(f"Status: **{job['status']}**")
+    if job.get("error"):
+        lines.append(f"Error: `{job['error']}`")
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+# utils/deck_names.py
+"""
+Registry of deck spellings that appear in the logs, behind /findmisnameddecks
+and its autocomplete.
+
+The deck_names collection holds one row per (deck_key, name) with the number
+of individual_results rows using that spelling. Match writes move it with $inc
+(utils.match_writes); deck renames, merges and corrections recount the keys
+they touch (utils.rollups). Orphans — logged names the DeckIndex can't
+resolve — are derived in memory and recomputed only when either side changes,
+so neither the command nor a keystroke walks the logs.
+Pure — no config/db imports.
+"""
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from utils.deck_index import AUTOCOMPLETE_LIMIT, DeckIndex, deck_index
+from utils.text import deck_key
+
+NameKey = Tuple[str, str]  # (deck_key, logged spelling)
+
+
+def name_deltas(mds: Iterable[dict], sign: int = 1) -> Dict[NameKey, int]:
+    """Rows per (deck_key, spelling) that the given matches contribute, times `sign`."""
+    out: Dict[NameKey, int] = {}
+    for md in mds:
+        for p in md.get("players", []):
+            name = p.get("deck_name")
+            if isinstance(name, str) and name.strip():
+                k = (deck_key(name), name)
+                out[k] = out.get(k, 0) + sign
+    return out
+
+
+def edit_name_deltas(before: Iterable[dict], after: Iterable[dict]) -> Dict[NameKey, int]:
+    """Change from replacing the `before` match docs with `after`; zero entries dropped."""
+    out = name_deltas(before, -1)
+    for k, v in name_deltas(after).items():
+        out[k] = out.get(k, 0) + v
+    return {k: v for k, v in out.items() if v}
+
+
+def name_ops(deltas: Dict[NameKey, int]) -> List[UpdateOne]:
+    """Upserting $inc ops for deck_names. Rows that reach zero stay until the next recount; readers skip them."""
+    return [
+        UpdateOne({"deck_key": k, "name": name}, {"$inc": {"rows": v}}, upsert=True)
+        for (k, name), v in deltas.items() if v
+    ]
+
+
+def names_pipeline(keys: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """individual_results -> deck_names rows, for every deck or just these deck_keys."""
+    match: Dict[str, Any] = {"deck_name": {"$type": "string"}}
+    if keys is not None:
+        match["deck_key"] = {"$in": list(keys)}
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"deck_key": "$deck_key", "name": "$deck_name"}, "rows": {"$sum": 1}}},
+        {"$project": {"_id": 0, "deck_key": "$_id.deck_key", "name": "$_id.name", "rows": 1}},
+    ]
+
+
+class OrphanDecks:
+    """Logged spellings with their row counts; `orphans()` is the subset the DeckIndex can't resolve."""
+
+    def __init__(self, index: DeckIndex):
+        self.index = index
+        self._rows: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._loading = False
+        self._dirty = False
+        self.loaded = False
+        self.version = 0
+        self._cache: Tuple[Any, List[str]] = (None, [])
+
+    def load(self, rows: Iterable[dict]):
+        self._rows = {}
+        for r in rows:
+            name = r.get("name")
+            if isinstance(name, str) and name.strip() and r.get("rows", 0) > 0:
+                self._rows[name] = self._rows.get(name, 0) + r["rows"]
+        self.loaded = True
+        self.version += 1
+
+    def invalidate(self):
+        self.loaded = False
+        if self._loading:
+            self._dirty = True
+
+    def apply(self, deltas: Dict[NameKey, int]):
+        """Fold committed name deltas in (no-op until loaded)."""
+        if self._loading:
+            self._dirty = True
+        if not self.loaded or not deltas:
+            return
+        for (_, name), v in deltas.items():
+            n = self._rows.get(name, 0) + v
+            if n > 0:
+                self._rows[name] = n
+            else:
+                self._rows.pop(name, None)
+        self.version += 1
+
+    def orphans(self) -> List[str]:
+        """Logged names with no deck behind them, A–Z."""
+        stamp = (self.version, self.index.version)
+        if self._cache[0] != stamp:
+            self._cache = (stamp, sorted(n for n in self._rows if self.index.resolve(n) is None))
+        return self._cache[1]
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[str]:
+        q = deck_key(query)
+        return [n for n in self.orphans() if q in deck_key(n)][:limit]
+
+
+orphan_decks = OrphanDecks(deck_index)
+
+
+async def ensure_loaded(names_coll, *, force: bool = False) -> OrphanDecks:
+    """Fill the shared registry from deck_names (once, or again after invalidate())."""
+    async with orphan_decks._lock:
+        if orphan_decks.loaded and not force:
+            return orphan_decks
+        orphan_decks._loading, orphan_decks._dirty = True, False
+        try:
+            orphan_decks.load([r async for r in names_coll.find({"rows": {"$gt": 0}}, {"_id": 0, "name": 1, "rows": 1})])
+        finally:
+            orphan_decks._loading = False
+        if orphan_decks._dirty:
+            orphan_decks.loaded = False  # a write raced the load; reload on next use
+    return orphan_decks
@@ -0,0 +1,85 @@
+# utils/eras.py
+"""
+Era bucketing for /generalstats. Cut-over dates split history into eras; the
+default (POSTBAN_START alone) is served from seat_stats, and any other set of
+cut-overs takes one `$group` over individual_results keyed by (era, seat,
+result), however many dates are given. Pure — no config/db imports.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+from utils.match_docs import SEATS
+from utils.time_ranges import POSTBAN_START
+
+RESULT_FIELDS = {"win": "wins", "loss": "losses", "draw": "draws"}
+MAX_CUTOFFS = 5
+
+DEFAULT_CUTOFFS = [POSTBAN_START]
+
+
+def parse_cutoffs(text: str) -> List[datetime]:
+    """
+    "2024-09-24, 2025-04-01" -> sorted, de-duplicated UTC midnights.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    out = set()
+    for part in (text or "").replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            out.add(datetime.strptime(part, "%Y-%m-%d").replace(tzinfo=timezone.utc))
+        except ValueError:
+            raise ValueError(f"`{part}` is not a YYYY-MM-DD date.") from None
+    if not out:
+        raise ValueError("Give at least one YYYY-MM-DD cut-over date.")
+    if len(out) > MAX_CUTOFFS:
+        raise ValueError(f"At most {MAX_CUTOFFS} cut-over dates.")
+    return sorted(out)
+
+
+def is_default(cutoffs: Sequence[datetime]) -> bool:
+    return list(cutoffs) == DEFAULT_CUTOFFS
+
+
+def era_labels(cutoffs: Sequence[datetime]) -> List[str]:
+    """One label per era (len(cutoffs) + 1); the default split keeps its PRE-/POST-BAN names."""
+    if is_default(cutoffs):
+        return ["PRE-BAN", "POST-BAN"]
+    days = [c.strftime("%Y-%m-%d") for c in cutoffs]
+    return ([f"before {days[0]}"]
+            + [f"{a} → {b}" for a, b in zip(days, days[1:])]
+            + [f"since {days[-1]}"])
+
+
+def era_expr(cutoffs: Sequence[datetime]) -> Dict[str, Any]:
+    """Aggregation expression giving the era index (0..len(cutoffs)) of `$date`."""
+    return {"$switch": {
+        "branches": [{"case": {"$lt": ["$date", c]}, "then": i} for i, c in enumerate(cutoffs)],
+        "default": len(cutoffs),
+    }}
+
+
+def era_seat_pipeline(cutoffs: Sequence[datetime]) -> List[Dict[str, Any]]:
+    """One pass over individual_results: counts per (era, seat, result)."""
+    return [
+        {"$match": {"seat": {"$in": list(SEATS)}}},
+        {"$group": {
+            "_id": {"era": era_expr(cutoffs), "seat": "$seat", "result": "$result"},
+            "n": {"$sum": 1},
+        }},
+    ]
+
+
+def era_seat_rows(docs: List[dict], n_eras: int) -> List[List[dict]]:
+    """Fold the pipeline output into per-era seat rows ({"_id": seat, games, wins, losses, draws})."""
+    acc: List[Dict[int, dict]] = [{} for _ in range(n_eras)]
+    for d in docs:
+        era, seat = d["_id"]["era"], d["_id"]["seat"]
+        row = acc[era].setdefault(seat, {"_id": seat, "games": 0, "wins": 0, "losses": 0, "draws": 0})
+        row["games"] += d["n"]
+        field = RESULT_FIELDS.get(d["_id"].get("result"))
+        if field:
+            row[field] += d["n"]
+    return [[era[s] for s in SEATS if s in era] for era in acc]
@@ -0,0 +1,97 @@
+# utils/fuzzy.py
+"""
+Fuzzy "did you mean" lookups against the deck list.
+
+The corpus (lower-cased names as a NumPy array) is rebuilt only when the shared
+DeckIndex changes, and scoring runs as one rapidfuzz `process.cdist` matrix in a
+worker thread, so neither /newdeck nor /findmisnameddecks blocks the gateway loop.
+"""
+
+import asyncio
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from utils.deck_index import DeckIndex, deck_index
+from utils.text import deck_key
+
+Match = Tuple[str, float]  # (stored deck name, score 0-100)
+
+ROW_CHUNK = 256  # query rows scored per cdist call; bounds the matrix to ROW_CHUNK x len(corpus)
+
+
+class _Corpus:
+    __slots__ = ("version", "names", "keys", "key_array")
+
+    def __init__(self, version: int, names: List[str]):
+        self.version = version
+        self.names = names
+        self.keys = [deck_key(n) for n in names]
+        self.key_array = np.array(self.keys, dtype=str)
+
+
+def _scores(queries: List[str], corpus: _Corpus, scorer) -> np.ndarray:
+    return process.cdist(queries, corpus.keys, scorer=scorer, processor=None, workers=-1)
+
+
+def _similar(query: str, corpus: _Corpus, cutoff: float) -> List[Match]:
+    q = deck_key(query)
+    ratio = _scores([q], corpus, fuzz.ratio)[0]
+    # either name being a prefix of the other counts as similar regardless of ratio
+    prefixes = [q[:i] for i in range(1, len(q) + 1)]
+    prefixed = np.isin(corpus.key_array, prefixes) | np.char.startswith(corpus.key_array, q)
+    hits = np.flatnonzero((ratio >= cutoff) | prefixed)
+    order = hits[np.argsort(-ratio[hits], kind="stable")]
+    return [(corpus.names[i], float(ratio[i])) for i in order]
+
+
+def _nearest(names: List[str], corpus: _Corpus, limit: int, cutoff: float) -> Dict[str, List[Match]]:
+    out: Dict[str, List[Match]] = {}
+    queries = [deck_key(n) for n in names]
+    for start in range(0, len(queries), ROW_CHUNK):
+        chunk = queries[start:start + ROW_CHUNK]
+        token_set = _scores(chunk, corpus, fuzz.token_set_ratio)
+        partial = _scores(chunk, corpus, fuzz.partial_ratio)
+        top = np.argsort(-token_set, axis=1, kind="stable")[:, :limit]
+        for row, name in enumerate(names[start:start + ROW_CHUNK]):
+            out[name] = [
+                (corpus.names[i], float(token_set[row, i]))
+                for i in top[row]
+                if token_set[row, i] >= cutoff or partial[row, i] >= cutoff
+            ]
+    return out
+
+
+class FuzzyMatcher:
+    """Nearest-deck lookups over a DeckIndex, with the scoring corpus cached per index version."""
+
+    def __init__(self, index: DeckIndex):
+        self.index = index
+        self._corpus = _Corpus(-1, [])
+
+    def corpus(self) -> _Corpus:
+        if self._corpus.version != self.index.version:
+            self._corpus = _Corpus(self.index.version, self.index.names())
+        return self._corpus
+
+    async def similar(self, name: str, *, cutoff: float = 85) -> List[Match]:
+        """Existing decks close to a new name: ratio >= cutoff, or one name prefixes the other. Best first."""
+        corpus = self.corpus()
+        if not corpus.names:
+            return []
+        return await asyncio.to_thread(_similar, name, corpus, cutoff)
+
+    async def nearest(self, names: Sequence[str], *, limit: int = 5, cutoff: float = 60) -> Dict[str, List[Match]]:
+        """
+        For each name, up to `limit` best existing decks by token-set score, kept when
+        either the token-set or the partial score reaches `cutoff`. One call for any number of names.
+        """
+        corpus = self.corpus()
+        names = list(dict.fromkeys(names))
+        if not names or not corpus.names:
+            return {n: [] for n in names}
+        return await asyncio.to_thread(_nearest, names, corpus, limit, cutoff)
+
+
+deck_matcher = FuzzyMatcher(deck_index)
@@ -0,0 +1,243 @@
+# utils/headtohead.py
+"""
+In-memory head-to-head matrices: for every ordered pair of players (and of
+decks) that shared a pod, pods together, the first one's wins and the drawn
+pods. A deck in several seats of one pod counts once there, as having won if
+any of its seats won, so games - a_wins - b_wins - draws is what others won.
+Only observed pairs are stored, as sorted int64 keys `row << 32 | col` with
+parallel count columns, so a row (one entity against everyone) is a
+contiguous slice found with `searchsorted`.
+
+Built in one vectorized pass over matches.players (np.unique + np.bincount).
+Logged matches update existing cells in place; pairs seen for the first time
+go to a small side table that is folded in once it grows. utils.match_writes
+feeds inserts, deletes and edits in. Deck renames/merges mark it stale for
+a reload. Pure — no config/db imports.
+"""
+
+import asyncio
+from itertools import permutations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.text import deck_key
+
+KINDS = ("player", "deck")
+SHIFT = np.int64(32)
+COMPACT_AT = 512  # side-table size that triggers a merge into the sorted arrays
+
+Cell = Dict[str, int]  # {"games": n, "wins": n, "draws": n}
+
+
+class _Matrix:
+    """Sparse pair counts for one kind, with an entity <-> code mapping."""
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.entities: List[Any] = []
+        self.names: List[Optional[str]] = []
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty((0, 3), dtype=np.int64)  # games, wins, draws
+        self.extra: Dict[int, np.ndarray] = {}
+
+    def code(self, entity: Any, name: Optional[str] = None) -> int:
+        c = self.codes.get(entity)
+        if c is None:
+            c = self.codes[entity] = len(self.entities)
+            self.entities.append(entity)
+            self.names.append(name)
+        elif name:
+            self.names[c] = name
+        return c
+
+    def build(self, pairs: np.ndarray, counts: np.ndarray):
+        """`pairs` are int64 keys, `counts` the matching (games, wins, draws) rows; duplicates are summed."""
+        keys, inv = np.unique(pairs, return_inverse=True)
+        self.keys = keys
+        self.counts = np.stack(
+            [np.bincount(inv, weights=counts[:, f], minlength=len(keys)) for f in range(3)], axis=1
+        ).astype(np.int64)
+        self.extra = {}
+
+    def add(self, key: int, delta: np.ndarray):
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            self.counts[i] += delta
+        else:
+            cell = self.extra.setdefault(key, np.zeros(3, dtype=np.int64))
+            cell += delta
+            if len(self.extra) >= COMPACT_AT:
+                self.compact()
+
+    def compact(self):
+        if not self.extra:
+            return
+        keys = np.fromiter(self.extra, dtype=np.int64, count=len(self.extra))
+        counts = np.stack(list(self.extra.values()))
+        self.build(np.concatenate([self.keys, keys]), np.concatenate([self.counts, counts]))
+
+    def cell(self, a: int, b: int) -> Cell:
+        key = (a << 32) | b
+        out = self.extra.get(key, np.zeros(3, dtype=np.int64)).copy()
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            out += self.counts[i]
+        return {"games": int(out[0]), "wins": int(out[1]), "draws": int(out[2])}
+
+    def row(self, a: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(column codes, counts) of every pair starting at `a`."""
+        self.compact()
+        lo, hi = np.searchsorted(self.keys, [np.int64(a) << SHIFT, np.int64(a + 1) << SHIFT])
+        return (self.keys[lo:hi] & 0xFFFFFFFF), self.counts[lo:hi]
+
+
+def _seats(md: dict) -> Optional[List[dict]]:
+    players = md.get("players") or []
+    return players if len(players) >= 2 else None
+
+
+def _entities(kind: str, p: dict) -> Tuple[Any, Optional[str]]:
+    return (p["player_id"], None) if kind == "player" else (deck_key(p["deck_name"]), p["deck_name"])
+
+
+def _pod(m: _Matrix, kind: str, ps: List[dict]) -> List[Tuple[int, bool, bool]]:
+    """(code, won, drew) once per distinct entity in the pod, in first-seat order."""
+    seen: Dict[int, List[bool]] = {}
+    for p in ps:
+        flags = seen.setdefault(m.code(*_entities(kind, p)), [False, False])
+        flags[0] |= p.get("result") == "win"
+        flags[1] |= p.get("result") == "draw"
+    return [(c, w, d) for c, (w, d) in seen.items()]
+
+
+class HeadToHead:
+    """Player x player and deck x deck co-occurrence with wins, answered from memory."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._loading = False
+        self._dirty = False
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self._m = {kind: _Matrix() for kind in KINDS}
+
+    # ----- maintenance -----
+
+    def load(self, mds: Iterable[dict]):
+        """Build both matrices from match documents in one vectorized pass per kind."""
+        self._reset()
+        pods = [ps for ps in map(_seats, mds) if ps]
+        for kind in KINDS:
+            m = self._m[kind]
+            pairs: List[np.ndarray] = []
+            counts: List[np.ndarray] = []
+            by_size: Dict[int, List[List[Tuple[int, bool, bool]]]] = {}
+            for ps in pods:
+                ents = _pod(m, kind, ps)
+                if len(ents) >= 2:  # a pod of one deck has no pairs
+                    by_size.setdefault(len(ents), []).append(ents)
+            for n, group in by_size.items():
+                arr = np.array(group, dtype=np.int64)  # (pods, n, [code, won, drew])
+                codes, wins, draws = arr[:, :, 0], arr[:, :, 1], arr[:, :, 2]
+                for a, b in permutations(range(n), 2):
+                    pairs.append((codes[:, a] << SHIFT) | codes[:, b])
+                    counts.append(np.stack([np.ones(len(group), dtype=np.int64), wins[:, a], draws[:, a]], axis=1))
+            if pairs:
+                m.build(np.concatenate(pairs), np.concatenate(counts))
+        self.loaded = True
+
+    def _apply(self, md: dict, sign: int):
+        ps = _seats(md)
+        if not ps:
+            return
+        for kind in KINDS:
+            m = self._m[kind]
+            for (ca, won, drew), (cb, _, _) in permutations(_pod(m, kind, ps), 2):
+                m.add((ca << 32) | cb, sign * np.array([1, won, drew], dtype=np.int64))
+
+    def invalidate(self):
+        self.loaded = False
+        if self._loading:
+            self._dirty = True
+
+    def _track(self) -> bool:
+        if self._loading:
+            self._dirty = True
+        return self.loaded
+
+    def on_insert(self, mds: List[dict]):
+        if self._track():
+            for md in mds:
+                self._apply(md, 1)
+
+    def on_delete(self, mds: List[dict]):
+        if self._track():
+            for md in mds:
+                self._apply(md, -1)
+
+    def on_edit(self, before: dict, after: Optional[dict]):
+        if self._track():
+            self._apply(before, -1)
+            if after:
+                self._apply(after, 1)
+
+    # ----- queries -----
+
+    def pair(self, kind: str, a: Any, b: Any) -> Dict[str, int]:
+        """
+        Pods containing both `a` and `b`: games, a_wins, b_wins, draws and
+        other_wins (someone else took it). Deck entities are matched by deck_key.
+        """
+        m = self._m[kind]
+        if kind == "deck":
+            a, b = deck_key(a), deck_key(b)
+        ca, cb = m.codes.get(a), m.codes.get(b)
+        if ca is None or cb is None or ca == cb:
+            return {"games": 0, "a_wins": 0, "b_wins": 0, "draws": 0, "other_wins": 0}
+        ab, ba = m.cell(ca, cb), m.cell(cb, ca)
+        games = ab["games"]
+        return {"games": games, "a_wins": ab["wins"], "b_wins": ba["wins"], "draws": ab["draws"],
+                "other_wins": games - ab["wins"] - ba["wins"] - ab["draws"]}
+
+    def opponents(self, kind: str, a: Any, *, min_games: int = 1) -> List[dict]:
+        """
+        `a`'s row: one entry per entity it shared a pod with, with games together,
+        a's wins/draws there and a's win% — sorted best pods first.
+        """
+        m = self._m[kind]
+        if kind == "deck":
+            a = deck_key(a)
+        ca = m.codes.get(a)
+        if ca is None:
+            return []
+        cols, counts = m.row(ca)
+        keep = counts[:, 0] >= max(min_games, 1)
+        cols, counts = cols[keep], counts[keep]
+        pct = counts[:, 1] / counts[:, 0] * 100
+        order = np.lexsort((-counts[:, 0], -pct))
+        return [
+            {"key": m.entities[int(cols[i])], "name": m.names[int(cols[i])], "games": int(counts[i, 0]),
+             "wins": int(counts[i, 1]), "draws": int(counts[i, 2]), "win_percentage": float(pct[i])}
+            for i in order
+        ]
+
+
+h2h = HeadToHead()
+
+
+async def ensure_loaded(matches_coll, *, force: bool = False) -> HeadToHead:
+    """Build the shared matrices from matches (once, or again after invalidate())."""
+    async with h2h._lock:
+        if h2h.loaded and not force:
+            return h2h
+        h2h._loading, h2h._dirty = True, False
+        try:
+            h2h.load([md async for md in matches_coll.find({}, {"_id": 0, "players": 1})])
+        finally:
+            h2h._loading = False
+        if h2h._dirty:
+            h2h.loaded = False  # a write raced the load; rebuild on next use
+    return h2h
@@ -0,0 +1,185 @@
+# utils/integrity.py
+"""
+Consistency checks across the three copies of every game: matches.players,
+individual_results and the decks.players W/L/D counters. matches is the source
+of truth; the other two are compared against what it implies.
+
+utils.verification streams matches and individual_results in match_id order
+and pairs them with `pair_by_match_id`, so only one match's rows are in memory
+at a time. The Checker records each mismatch and, when repairing, the smallest
+write that fixes it:
+
+    match_keys      matches.players deck_key out of step with deck_name -> $set players
+    ir_missing      a match with no individual_results rows             -> insert them
+    ir_mismatch     rows that differ from the match                     -> replace that match's rows
+    ir_orphan       rows whose match no longer exists                   -> delete them
+    deck_players    decks.players counters off                          -> recount that deck (caller)
+    deck_duplicate  several deck docs share a deck_key                  -> reported only (/removedeckfromdatabase)
+    deck_missing    a logged deck_key with no deck doc                  -> reported only (/correctmisnameddecks)
+
+The streamed scan is not a snapshot, so repairs are not planned from it: the
+caller re-reads a flagged match and runs a fresh repair Checker over it.
+
+The deck counters are summed per (deck_key, player_id) while the matches stream
+by, so memory grows with decks x players, not with games.
+Pure — no config/db imports.
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, InsertOne, UpdateOne
+
+from utils.archive import month_floor
+from utils.match_docs import individual_result_docs
+from utils.text import deck_key
+
+ISSUES = ("match_keys", "ir_missing", "ir_mismatch", "ir_orphan", "deck_players", "deck_duplicate", "deck_missing")
+SAMPLE = 5  # example ids kept per issue for the report
+
+_SLOT = {"win": 0, "loss": 1, "draw": 2}  # index into a [wins, losses, draws] tally
+_IR_FIELDS = ("player_id", "deck_name", "deck_key", "seat", "result", "match_id", "date")
+
+
+def _ir_row(d: dict) -> tuple:
+    return tuple(d.get(f) for f in _IR_FIELDS)
+
+
+async def pair_by_match_id(
+    match_docs: AsyncIterator[dict], ir_rows: AsyncIterator[dict]
+) -> AsyncIterator[Tuple[Any, Optional[dict], List[dict]]]:
+    """
+    Merge-join two streams sorted by match_id: yields (match_id, match doc or
+    None, its individual_results rows) for every id present in either.
+    """
+    async def _next(it):
+        try:
+            return await it.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    md, row = await _next(match_docs), await _next(ir_rows)
+    while md is not None or row is not None:
+        if row is None or (md is not None and md["match_id"] <= row["match_id"]):
+            mid = md["match_id"]
+        else:
+            mid = row["match_id"]
+        rows: List[dict] = []
+        while row is not None and row["match_id"] == mid:
+            rows.append(row)
+            row = await _next(ir_rows)
+        if md is not None and md["match_id"] == mid:
+            yield mid, md, rows
+            md = await _next(match_docs)
+        else:
+            yield mid, None, rows
+
+
+class Checker:
+    """
+    Feed it every match (check_match), then every deck (check_deck), then finish().
+    Both checks return whether they flagged anything. `duplicates` are deck_keys
+    held by more than one deck doc; their counters are not compared.
+    """
+
+    def __init__(self, *, repair: bool = False, sample: int = SAMPLE, duplicates: Iterable[str] = ()):
+        self.repair = repair
+        self.sample = sample
+        self.duplicates = set(duplicates)
+        self.counts: Dict[str, int] = dict.fromkeys(ISSUES, 0)
+        self.examples: Dict[str, List[Any]] = {k: [] for k in ISSUES}
+        self.ops: Dict[str, list] = {"matches": [], "individual_results": []}
+        self.tallies: Dict[str, Dict[int, List[int]]] = {}  # deck_key -> player_id -> [wins, losses, draws]
+        self.months: set = set()  # months whose individual_results a repair touches (for re-freezing)
+        self.matches = 0
+
+    def _flag(self, issue: str, example: Any, coll: Optional[str] = None, *ops):
+        self.counts[issue] += 1
+        if len(self.examples[issue]) < self.sample:
+            self.examples[issue].append(example)
+        if self.repair and coll:
+            self.ops[coll].extend(ops)
+
+    def _flagged(self) -> int:
+        return sum(self.counts.values())
+
+    def check_match(self, match_id: Any, md: Optional[dict], rows: List[dict]) -> bool:
+        if md is None:
+            if not rows:
+                return False  # gone from both sides since the scan
+            self._flag("ir_orphan", match_id, "individual_results", DeleteMany({"match_id": match_id}))
+            self.months.update(month_floor(r["date"]) for r in rows if r.get("date"))
+            return True
+        self.matches += 1
+        flagged = self._flagged()
+
+        players = md.get("players", [])
+        if any(p.get("deck_key") != deck_key(p["deck_name"]) for p in players):
+            fixed = [{**p, "deck_key": deck_key(p["deck_name"])} for p in players]
+            self._flag("match_keys", match_id, "matches",
+                       UpdateOne({"match_id": match_id}, {"$set": {"players": fixed}}))
+
+        expected = individual_result_docs(md)
+        if not rows:
+            self._flag("ir_missing", match_id, "individual_results", *(InsertOne(d) for d in expected))
+            self.months.add(month_floor(md["date"]))
+        elif sorted(map(_ir_row, rows), key=repr) != sorted(map(_ir_row, expected), key=repr):
+            self._flag("ir_mismatch", match_id, "individual_results",
+                       DeleteMany({"match_id": match_id}), *(InsertOne(d) for d in expected))
+            self.months.update(month_floor(r["date"]) for r in rows + expected if r.get("date"))
+
+        for p in players:
+            t = self.tallies.setdefault(deck_key(p["deck_name"]), {}).setdefault(p["player_id"], [0, 0, 0])
+            slot = _SLOT.get(p.get("result"))
+            if slot is not None:
+                t[slot] += 1
+        return self._flagged() > flagged
+
+    def check_deck(self, deck: dict) -> bool:
+        key = deck.get("deck_key") or deck_key(deck.get("name", ""))
+        if key in self.duplicates:
+            # which doc should hold the counters is a mod's call; leave them all alone
+            self.tallies.pop(key, None)
+            self._flag("deck_duplicate", deck.get("name", key))
+            return False
+        want = {pid: tuple(t) for pid, t in self.tallies.pop(key, {}).items() if any(t)}
+        have = {
+            p.get("player_id"): (p.get("wins", 0), p.get("losses", 0), p.get("draws", 0))
+            for p in deck.get("players") or []
+            if p.get("wins", 0) or p.get("losses", 0) or p.get("draws", 0)
+        }
+        if want != have:
+            self._flag("deck_players", deck.get("name", key))
+            return True
+        return False
+
+    def finish(self):
+        """Whatever is left in the tallies was logged under a deck_key no deck doc has."""
+        for key in sorted(self.tallies):
+            self._flag("deck_missing", key)
+        self.tallies = {}
+
+    def report(self) -> Dict[str, Any]:
+        return {"matches": self.matches, "counts": dict(self.counts),
+                "examples": {k: v for k, v in self.examples.items() if v}}
+
+
+def unfixed(report: Dict[str, Any]) -> Dict[str, int]:
+    """Issues the scan found that no repair accounted for, {issue: n}."""
+    fixed = report.get("fixed", {})
+    left = {k: n - min(n, fixed.get(k, 0)) for k, n in report["counts"].items()}
+    return {k: n for k, n in left.items() if n}
+
+
+def render_report(report: Dict[str, Any]) -> str:
+    """Plain-text summary shared by /verifydata, the nightly run and the CLI."""
+    issues = {k: n for k, n in report["counts"].items() if n}
+    head = f"Checked {report['matches']} matches."
+    if not issues:
+        return head + " No mismatches."
+    lines = [head]
+    for k, n in issues.items():
+        done = min(n, report.get("fixed", {}).get(k, 0))
+        fixed = "" if not done else " (fixed)" if done == n else f" ({done} fixed)"
+        sample = ", ".join(map(str, report["examples"].get(k, [])))
+        lines.append(f"- {k}: {n}{fixed} e.g. {sample}")
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+# utils/leaderboard.py
+"""
+/leaderboard building blocks: one $facet over daily_rollups that returns the
+current window and (for 1m) the previous one, a join of the two by key, and the
+embed renderer. Pure — no config/db imports.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+from utils.match_docs import day_bucket
+
+DRAW_WEIGHT = 0.143
+MIN_GAMES = 15
+FIELDS_PER_EMBED = 25
+
+Window = Tuple[datetime, datetime]
+
+
+def _window_stages(day_range: Dict[str, Any]) -> List[Dict[str, Any]]:
+    weighted = {"$add": ["$wins", {"$multiply": ["$draws", DRAW_WEIGHT]}]}
+    return [
+        {"$match": {"day": day_range}},
+        {"$group": {"_id": "$key",
+                    "name": {"$last": "$name"},
+                    "games_played": {"$sum": "$games"},
+                    "wins": {"$sum": "$wins"},
+                    "losses": {"$sum": "$losses"},
+                    "draws": {"$sum": "$draws"}}},
+        {"$match": {"games_played": {"$gt": 0}}},
+        {"$addFields": {
+            "normal_win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+            "weighted_win_percentage": {"$multiply": [{"$divide": [weighted, "$games_played"]}, 100]},
+        }},
+    ]
+
+
+def leaderboard_pipeline(
+    kind: str,
+    start: datetime,
+    previous: Optional[Window] = None,
+    *,
+    min_games: int = MIN_GAMES,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One aggregation over daily_rollups producing {"current": [...], "previous": [...]}.
+    Windows snap to whole UTC days; `previous` is (start, end) with `end` exclusive.
+    """
+    lo = min(start, previous[0]) if previous else start
+    current = _window_stages({"$gte": day_bucket(start)}) + [
+        {"$match": {"games_played": {"$gte": min_games}}},
+        {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
+    ]
+    if limit:
+        current.append({"$limit": limit})
+    facet: Dict[str, Any] = {"current": current}
+    if previous:
+        facet["previous"] = _window_stages({"$gte": day_bucket(previous[0]), "$lt": day_bucket(previous[1])})
+    return [
+        {"$match": {"kind": kind, "day": {"$gte": day_bucket(lo)}}},
+        {"$facet": facet},
+    ]
+
+
+def join_windows(current: List[dict], previous: List[dict] | None) -> List[dict]:
+    """Current rows, in order, each with `delta` = weighted win% change vs. the previous window (or None)."""
+    prev = {d["_id"]: d["weighted_win_percentage"] for d in previous or []}
+    out = []
+    for d in current:
+        p = prev.get(d["_id"])
+        out.append({**d, "delta": None if p is None else d["weighted_win_percentage"] - p})
+    return out
+
+
+def delta_mark(delta: float) -> str:
+    if -1 < delta < 1:
+        return "🔄 0%"
+    return f"{'⬆️' if delta > 0 else '🔻'} {abs(int(delta))}%"
+
+
+def _medal(pos: int) -> str:
+    return "🥇" if pos == 1 else "🥈" if pos == 2 else "🥉" if pos == 3 else f"{pos}."
+
+
+def render_leaderboard(
+    title: str,
+    rows: List[dict],
+    name_of: Callable[[dict], Optional[str]],
+    *,
+    kind: str,
+    color: int,
+) -> List[discord.Embed]:
+    """
+    Embeds of up to 25 fields; only the first carries the title. Rows whose
+    `name_of` is None (e.g. departed members) are skipped without using a rank.
+    """
+    bold_name, win, weighted = ("**{}**", "Win", "Win%") if kind == "player" else ("{}", "W", "W")
+    embeds: List[discord.Embed] = []
+    embed = discord.Embed(title=title, color=color)
+    pos = 1
+    for d in rows:
+        name = name_of(d)
+        if name is None:
+            continue
+        mark = f" ({delta_mark(d['delta'])})" if d.get("delta") is not None else ""
+        embed.add_field(
+            name=f"{_medal(pos)} {bold_name.format(name)}: {d['wins']}W | {d['losses']}L | {d['draws']}D",
+            value=(f"• {win}: **{int(d['normal_win_percentage'])}**% | "
+                   f"*🏋{weighted}: **{int(d['weighted_win_percentage'])}**%*{mark} | (Games: {d['games_played']})"),
+            inline=False,
+        )
+        pos += 1
+        if len(embed.fields) >= FIELDS_PER_EMBED:
+            embeds.append(embed)
+            embed = discord.Embed(color=color)
+    if embed.fields:
+        embeds.append(embed)
+    if not embeds:
+        embeds = [discord.Embed(title=title, description="No results found.", color=color)]
+    return embeds
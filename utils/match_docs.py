@@ -0,0 +1,263 @@
+# utils/match_docs.py
+"""Pure helpers that turn match documents into the denormalized writes. No config/env imports."""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from utils.text import deck_key
+from utils.time_ranges import POSTBAN_START
+
+RESULT_FIELDS = {"win": "wins", "loss": "losses", "draw": "draws"}
+
+Tally = Dict[str, int]  # {"wins": n, "losses": n, "draws": n}
+Counts = Dict[str, int]  # Tally + {"games": n}
+RollupKey = Tuple[str, Any, datetime]  # (kind "player"|"deck", player_id | deck_key, day)
+SeatKey = Tuple[str, Any, str, int]  # (kind "all"|"player"|"deck", None | player_id | deck_key, era, seat)
+
+SEATS = (1, 2, 3, 4)
+ERAS = ("preban", "postban")
+
+
+def build_match_doc(
+    match_id: int,
+    seats: Sequence[Tuple[int, str]],
+    winner: Optional[int],
+    date: datetime,
+) -> dict:
+    """
+    The matches document /track writes. `seats` is [(player_id, deck_name)] in seat
+    order; `winner` is the 0-based seat index of the winner, or None for a draw.
+    """
+    def res(i: int) -> str:
+        if winner is None:
+            return "draw"
+        return "win" if i == winner else "loss"
+
+    return {
+        "match_id": match_id,
+        "players": [
+            {"player_id": pid, "deck_name": deck, "deck_key": deck_key(deck), "position": i + 1, "result": res(i)}
+            for i, (pid, deck) in enumerate(seats)
+        ],
+        "date": date,
+    }
+
+
+def individual_result_docs(md: dict) -> List[dict]:
+    """One individual_results row per seat, in the shape /track has always written."""
+    return [
+        {
+            "player_id": p["player_id"],
+            "deck_name": p["deck_name"],
+            "deck_key": deck_key(p["deck_name"]),
+            "seat": p["position"],
+            "result": p["result"],
+            "match_id": md["match_id"],
+            "date": md["date"],
+        }
+        for p in md["players"]
+    ]
+
+
+def deck_player_tallies(mds: Iterable[dict], sign: int = 1) -> Dict[Tuple[str, int], Tally]:
+    """W/L/D per (deck_key, player_id) across the given matches, multiplied by `sign`."""
+    out: Dict[Tuple[str, int], Tally] = {}
+    for md in mds:
+        for p in md.get("players", []):
+            field = RESULT_FIELDS.get(p.get("result"))
+            t = out.setdefault((deck_key(p["deck_name"]), p["player_id"]), {"wins": 0, "losses": 0, "draws": 0})
+            if field:
+                t[field] += sign
+    return out
+
+
+def deck_player_ops(tallies: Dict[Tuple[str, int], Tally]) -> List[UpdateOne]:
+    """
+    bulk_write ops applying tallies to decks.players: push a zeroed entry when the
+    player isn't on the deck yet, then $inc it. Decks that lost games then drop
+    entries left at 0/0/0, as recompute_deck_players would. Must be run with ordered=True.
+    """
+    ops: List[UpdateOne] = []
+    shrunk: List[str] = []
+    for (key, pid), t in tallies.items():
+        inc = {f"players.$.{k}": v for k, v in t.items() if v}
+        ops.append(UpdateOne(
+            {"deck_key": key, "players.player_id": {"$ne": pid}},
+            {"$push": {"players": {"player_id": pid, "wins": 0, "losses": 0, "draws": 0}}},
+        ))
+        if inc:
+            ops.append(UpdateOne({"deck_key": key, "players.player_id": pid}, {"$inc": inc}))
+        if any(v < 0 for v in t.values()) and key not in shrunk:
+            shrunk.append(key)
+    ops += [UpdateOne({"deck_key": key}, {"$pull": {"players": {"wins": 0, "losses": 0, "draws": 0}}})
+            for key in shrunk]
+    return ops
+
+
+def edited_match(md: dict, edits: Dict[int, dict]) -> dict:
+    """
+    Copy of `md` with per-seat edits applied: {index: {"result" | "position" |
+    "deck_name" | "player_id": value}}. deck_key follows deck_name.
+    """
+    players = [dict(p) for p in md.get("players", [])]
+    for idx, changes in edits.items():
+        p = players[idx]
+        for f in ("result", "deck_name", "player_id"):
+            if f in changes:
+                p[f] = changes[f]
+        if "position" in changes:
+            p["position"] = int(changes["position"])
+        if "deck_name" in changes:
+            p["deck_key"] = deck_key(changes["deck_name"])
+    return {**md, "players": players}
+
+
+def deck_player_edit_ops(before: dict, after: dict) -> List[UpdateOne]:
+    """decks.players $inc ops taking a match from `before` to `after`; empty when W/L/D attribution is unchanged."""
+    return deck_player_ops(combine_deltas(deck_player_tallies([before], -1), deck_player_tallies([after])))
+
+
+def deck_players_pipeline(keys: Sequence[str]) -> List[Dict[str, Any]]:
+    """One pass over individual_results: W/L/D per (deck_key, player) for every deck in `keys`."""
+    def count(result: str) -> dict:
+        return {"$sum": {"$cond": [{"$eq": ["$result", result]}, 1, 0]}}
+
+    return [
+        {"$match": {"deck_key": {"$in": list(keys)}}},
+        {"$group": {
+            "_id": {"deck_key": "$deck_key", "player_id": "$player_id"},
+            "wins": count("win"), "losses": count("loss"), "draws": count("draw"),
+            "games": {"$sum": 1},
+        }},
+        {"$sort": {"_id.deck_key": 1, "_id.player_id": 1}},
+    ]
+
+
+def deck_players_set_ops(keys: Iterable[str], rows: Iterable[dict]) -> List[UpdateOne]:
+    """
+    One $set of decks.players per deck from deck_players_pipeline rows; decks
+    with no rows left get an empty list.
+    """
+    players: Dict[str, List[dict]] = {k: [] for k in keys}
+    for r in rows:
+        players.setdefault(r["_id"]["deck_key"], []).append(
+            {"player_id": r["_id"]["player_id"], "wins": r["wins"], "losses": r["losses"], "draws": r["draws"]}
+        )
+    return [UpdateOne({"deck_key": k}, {"$set": {"players": ps}}) for k, ps in players.items()]
+
+
+# ---------- daily rollups ----------
+
+def day_bucket(dt: datetime) -> datetime:
+    """UTC midnight of `dt`. Naive datetimes (as Motor returns them) are taken as UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc)
+
+
+def rollup_deltas(mds: Iterable[dict], sign: int = 1) -> Dict[RollupKey, Counts]:
+    """W/L/D/games per (kind, key, day) that the given matches contribute, times `sign`."""
+    out: Dict[RollupKey, Counts] = {}
+    for md in mds:
+        day = day_bucket(md["date"])
+        for p in md.get("players", []):
+            field = RESULT_FIELDS.get(p.get("result"))
+            for kind, key in (("player", p["player_id"]), ("deck", deck_key(p["deck_name"]))):
+                c = out.setdefault((kind, key, day), {"wins": 0, "losses": 0, "draws": 0, "games": 0})
+                c["games"] += sign
+                if field:
+                    c[field] += sign
+    return out
+
+
+def merge_deltas(into: Dict[Any, Counts], delta: Dict[Any, Counts]) -> Dict[Any, Counts]:
+    """Add `delta` into `into` in place (for streaming rebuilds); returns `into`."""
+    for k, counts in delta.items():
+        acc = into.setdefault(k, dict.fromkeys(counts, 0))
+        for f, v in counts.items():
+            acc[f] = acc.get(f, 0) + v
+    return into
+
+
+def combine_deltas(*deltas: Dict[Any, Counts]) -> Dict[Any, Counts]:
+    """Sum several delta maps, dropping entries that cancel out to all zeros."""
+    out: Dict[Any, Counts] = {}
+    for d in deltas:
+        merge_deltas(out, d)
+    return {k: c for k, c in out.items() if any(c.values())}
+
+
+def edit_deltas(before: Iterable[dict], after: Iterable[dict]) -> Dict[RollupKey, Counts]:
+    """Rollup change from replacing the `before` match docs with `after` (edits, deletes)."""
+    return combine_deltas(rollup_deltas(before, -1), rollup_deltas(after, 1))
+
+
+def deck_display_names(mds: Iterable[dict]) -> Dict[str, str]:
+    return {deck_key(p["deck_name"]): p["deck_name"] for md in mds for p in md.get("players", [])}
+
+
+def rollup_ops(deltas: Dict[RollupKey, Counts], names: Dict[str, str] | None = None) -> List[UpdateOne]:
+    """Upserting $inc ops for daily_rollups; deck rows also carry a display `name`."""
+    names = names or {}
+    ops: List[UpdateOne] = []
+    for (kind, key, day), counts in deltas.items():
+        update: Dict[str, Any] = {"$inc": {f: v for f, v in counts.items() if v}}
+        if kind == "deck" and key in names:
+            update["$set"] = {"name": names[key]}
+        ops.append(UpdateOne({"kind": kind, "key": key, "day": day}, update, upsert=True))
+    return ops
+
+
+# ---------- seat stats ----------
+
+def era_of(dt: datetime) -> str:
+    """"preban" or "postban" relative to POSTBAN_START; naive datetimes are taken as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return "postban" if dt >= POSTBAN_START else "preban"
+
+
+def seat_deltas(mds: Iterable[dict], sign: int = 1) -> Dict[SeatKey, Counts]:
+    """W/L/D/games per (kind, key, era, seat) that the given matches contribute, times `sign`."""
+    out: Dict[SeatKey, Counts] = {}
+    for md in mds:
+        era = era_of(md["date"])
+        for p in md.get("players", []):
+            seat = p.get("position")
+            if seat not in SEATS:
+                continue
+            field = RESULT_FIELDS.get(p.get("result"))
+            for kind, key in (("all", None), ("player", p["player_id"]), ("deck", deck_key(p["deck_name"]))):
+                c = out.setdefault((kind, key, era, seat), {"wins": 0, "losses": 0, "draws": 0, "games": 0})
+                c["games"] += sign
+                if field:
+                    c[field] += sign
+    return out
+
+
+def seat_ops(deltas: Dict[SeatKey, Counts]) -> List[UpdateOne]:
+    """Upserting $inc ops for seat_stats."""
+    return [
+        UpdateOne({"kind": kind, "key": key, "era": era, "seat": seat},
+                  {"$inc": {f: v for f, v in counts.items() if v}}, upsert=True)
+        for (kind, key, era, seat), counts in deltas.items()
+    ]
+
+
+def seat_summary(rows: Iterable[dict]) -> Dict[str, int]:
+    """
+    Flatten per-seat rows ({"_id": seat, games, wins, losses, draws}) into the
+    wins/losses/draws + seatN/winseatN dict the stats embeds render.
+    """
+    out: Dict[str, int] = {"wins": 0, "losses": 0, "draws": 0}
+    for s in SEATS:
+        out[f"seat{s}"] = out[f"winseat{s}"] = 0
+    for row in rows:
+        for k in ("wins", "losses", "draws"):
+            out[k] += row.get(k, 0)
+        if row["_id"] in SEATS:
+            out[f"seat{row['_id']}"] += row.get("games", 0)
+            out[f"winseat{row['_id']}"] += row.get("wins", 0)
+    return out
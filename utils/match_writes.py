@@ -0,0 +1,247 @@
+# utils/match_writes.py
+"""
+Write path for logged matches. Every cog that records, edits or deletes games,
+and the deck jobs moving seats between decks, go through here, so the
+denormalized copies (matches, individual_results, decks.players) and the
+derived stores (daily_rollups, seat_stats, ratings, deck_names) move together,
+inside one transaction with batched round trips. New matches update ratings in
+place; edits and deletes replay them from the month they touched. Writes
+landing in an archived month re-freeze that month's summaries.
+Each function drops the shared result cache and updates whichever in-memory
+engines are loaded (analytics, head-to-head, orphan decks) once its writes
+have committed.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from db import (
+    matches, individual_results, decks, daily_rollups, seat_stats, ratings, rating_checkpoints, deck_names,
+    run_in_transaction,
+)
+from utils.match_docs import (
+    individual_result_docs,
+    deck_player_tallies,
+    deck_player_ops,
+    deck_player_edit_ops,
+    edit_deltas,
+    rollup_ops,
+    seat_deltas,
+    seat_ops,
+    combine_deltas,
+    deck_display_names,
+    deck_players_pipeline,
+    deck_players_set_ops,
+    edited_match,
+)
+from utils.deck_jobs import BATCH_SIZE as JOB_BATCH_SIZE, ir_filter, match_filter, match_update, moved_match
+from utils.ratings import apply_match, rating_ops, ratings_filter, seat_keys
+from utils.rollups import rebuild_ratings, ratings_lock, refreeze_dates
+from utils.result_cache import invalidate as invalidate_results
+from utils.analytics import engine as analytics
+from utils.headtohead import h2h
+from utils.deck_names import edit_name_deltas, name_ops, orphan_decks
+from utils.text import deck_key
+
+log = logging.getLogger("ca_match_logger")
+
+# serializes match writes with utils.verification's repairs (standalone servers have no transactions)
+write_lock = asyncio.Lock()
+
+
+def _derived_ops(before: List[dict], after: List[dict], names: dict) -> list:
+    """(collection, ops) pairs moving the derived stores from `before` to `after`."""
+    return [
+        (daily_rollups, rollup_ops(edit_deltas(before, after), deck_display_names(after))),
+        (seat_stats, seat_ops(combine_deltas(seat_deltas(before, -1), seat_deltas(after)))),
+        (deck_names, name_ops(names)),
+    ]
+
+
+async def _write_derived(derived: list, session) -> None:
+    for coll, ops in derived:
+        if ops:
+            await coll.bulk_write(ops, ordered=False, session=session)
+
+
+async def _write_ratings(mds: List[dict], session) -> None:
+    """Apply new matches (oldest first) on top of the stored ratings of their seats."""
+    keys = {(kind, k) for md in mds for kind, ks in seat_keys(md).items() for k in ks}
+    if not keys:
+        return
+    table: dict = {}
+    async for r in ratings.find(ratings_filter(keys), {"_id": 0}, session=session):
+        table[(r.pop("kind"), r.pop("key"))] = r
+    touched: list = []
+    for md in sorted(mds, key=lambda m: (m["date"], m["match_id"])):
+        touched += apply_match(table, md)
+    ops = rating_ops(table, dict.fromkeys(touched))
+    if ops:
+        await ratings.bulk_write(ops, ordered=False, session=session)
+    # a back-dated match is missing from the checkpoints after it; the next replay redoes those
+    await rating_checkpoints.delete_many({"_id": {"$gt": min(md["date"] for md in mds)}}, session=session)
+
+
+async def insert_matches(mds: List[dict]) -> None:
+    """
+    Insert finished matches (the document shape /track builds) plus their
+    individual_results rows, decks.players W/L/D and derived stats, all-or-nothing.
+    A fixed handful of writes regardless of how many matches are passed.
+    """
+    if not mds:
+        return
+    ir_docs = [doc for md in mds for doc in individual_result_docs(md)]
+    deck_ops = deck_player_ops(deck_player_tallies(mds))
+    names = edit_name_deltas([], mds)
+    derived = _derived_ops([], mds, names)
+
+    async def _write(session):
+        # insert_many stamps _id onto the dicts; copies keep a retried transaction clean
+        await matches.insert_many([dict(md) for md in mds], session=session)
+        await individual_results.insert_many([dict(d) for d in ir_docs], session=session)
+        if deck_ops:
+            await decks.bulk_write(deck_ops, ordered=True, session=session)
+        await _write_derived(derived, session)
+        await _write_ratings(mds, session)
+
+    async with write_lock, ratings_lock:
+        await run_in_transaction(_write)
+    invalidate_results()
+    analytics.on_insert(mds)
+    h2h.on_insert(mds)
+    orphan_decks.apply(names)
+    await refreeze_dates(md["date"] for md in mds)  # back-dated logs into archived months
+
+
+async def insert_match(md: dict) -> None:
+    """Single-match convenience wrapper used by /track."""
+    await insert_matches([md])
+
+
+async def delete_matches(mds: List[dict]) -> int:
+    """
+    Delete the given match documents with their individual_results and take them
+    back out of the derived stats. decks.players is left to the caller's recompute.
+    Returns the number of matches deleted.
+    """
+    if not mds:
+        return 0
+    ids = [md["match_id"] for md in mds]
+    names = edit_name_deltas(mds, [])
+    derived = _derived_ops(mds, [], names)
+
+    async def _write(session):
+        await individual_results.delete_many({"match_id": {"$in": ids}}, session=session)
+        res = await matches.delete_many({"match_id": {"$in": ids}}, session=session)
+        await _write_derived(derived, session)
+        return res.deleted_count or 0
+
+    async with write_lock:
+        deleted = await run_in_transaction(_write)
+    invalidate_results()
+    analytics.on_delete(mds)
+    h2h.on_delete(mds)
+    orphan_decks.apply(names)
+    await rebuild_ratings(since=min(md["date"] for md in mds))
+    await refreeze_dates(md["date"] for md in mds)
+    return deleted
+
+
+async def edit_match(shown: dict, edits: Dict[int, dict]) -> Optional[dict]:
+    """
+    Apply per-seat `edits` (see edited_match) to a match in one transaction: the
+    match document, its individual_results rows, $inc deltas on decks.players for
+    exactly the (deck, player) tallies that moved, and the derived stores. The
+    deltas are taken against the match as re-read inside the transaction; if its
+    seats no longer equal `shown` (what the mod was editing), nothing is written
+    and None is returned. Otherwise returns the edited match. Nothing rescans a
+    deck's history; recompute_deck_players is the repair path.
+    """
+    mid = shown["match_id"]
+
+    async def _write(session):
+        before = await matches.find_one({"match_id": mid}, {"_id": 0}, session=session)
+        if before is None or before.get("players") != shown.get("players"):
+            return None  # edited, moved by a deck job or deleted since the mod loaded it
+        after = edited_match(before, edits)
+        names = edit_name_deltas([before], [after])
+        await matches.update_one({"match_id": mid}, {"$set": {"players": after["players"]}}, session=session)
+        await individual_results.delete_many({"match_id": mid}, session=session)
+        await individual_results.insert_many([dict(d) for d in individual_result_docs(after)], session=session)
+        deck_ops = deck_player_edit_ops(before, after)
+        if deck_ops:
+            await decks.bulk_write(deck_ops, ordered=True, session=session)
+        await _write_derived(_derived_ops([before], [after], names), session)
+        return before, after, names
+
+    async with write_lock:
+        written = await run_in_transaction(_write)
+    if written is None:
+        return None
+    before, after, names = written
+    invalidate_results()
+    analytics.on_edit(before, after)
+    h2h.on_edit(before, after)
+    orphan_decks.apply(names)
+    await rebuild_ratings(since=min(before["date"], after["date"]))
+    await refreeze_dates([before["date"], after["date"]])
+    return after
+
+
+async def move_deck_batch(job: dict) -> Tuple[int, int]:
+    """
+    Move one batch of a deck job's matches (see utils.deck_jobs) onto the new deck
+    in one transaction, with their individual_results rows and the daily_rollups,
+    seat_stats and deck_names deltas. A merge also moves the decks.players tallies;
+    a rename took them along with the deck doc. Returns (matches, individual_results
+    rows) moved, (0, 0) once nothing is left on the old key.
+    """
+    update, array_filters = match_update(job)
+    new = {"deck_name": job["new_name"], "deck_key": job["new_key"]}
+
+    async def _write(session):
+        before = await matches.find(match_filter(job), {"_id": 0}, session=session).limit(
+            JOB_BATCH_SIZE).to_list(length=None)
+        if not before:
+            return None
+        ids = [md["match_id"] for md in before]
+        after = [moved_match(job, md) for md in before]
+        names = edit_name_deltas(before, after)
+        res = await matches.update_many({"match_id": {"$in": ids}}, update,
+                                        array_filters=array_filters, session=session)
+        ir = await individual_results.update_many({"match_id": {"$in": ids}, **ir_filter(job)}, {"$set": new},
+                                                  session=session)
+        if job["kind"] == "merge":
+            deck_ops = deck_player_ops(combine_deltas(deck_player_tallies(before, -1), deck_player_tallies(after)))
+            if deck_ops:
+                await decks.bulk_write(deck_ops, ordered=True, session=session)
+        await _write_derived(_derived_ops(before, after, names), session)
+        return before, after, names, res.modified_count, ir.modified_count
+
+    async with write_lock:
+        written = await run_in_transaction(_write)
+    if written is None:
+        return 0, 0
+    before, after, names, moved, rows = written
+    invalidate_results()
+    analytics.on_delete(before)
+    analytics.on_insert(after)
+    h2h.on_delete(before)
+    h2h.on_insert(after)
+    orphan_decks.apply(names)
+    await refreeze_dates(md["date"] for md in before)
+    return moved, rows
+
+
+async def recompute_deck_players(names: Iterable[str]) -> None:
+    """Rebuild decks.players for these decks from individual_results: one aggregation, one bulk_write."""
+    keys = sorted({deck_key(n) for n in names} - {""})
+    if not keys:
+        return
+    rows = await individual_results.aggregate(deck_players_pipeline(keys)).to_list(length=None)
+    for r in rows:
+        if r["games"] != r["wins"] + r["losses"] + r["draws"]:
+            log.warning("recompute: deck='%s' pid=%s has %d IR rows with an unknown result",
+                        r["_id"]["deck_key"], r["_id"]["player_id"], r["games"] - r["wins"] - r["losses"] - r["draws"])
+    await decks.bulk_write(deck_players_set_ops(keys, rows), ordered=False)
@@ -0,0 +1,144 @@
+# utils/members.py
+"""
+Batched guild member resolution for rendering leaderboards and stats.
+
+Member-cache misses are resolved with gateway `query_members` requests of up
+to 100 IDs instead of one `fetch_member` REST call per player. Display names
+are kept in an LRU with a TTL, and IDs that turned out to have left the guild
+are remembered (up to `maxsize` of them) so the next render skips them
+without asking Discord again.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import discord
+
+log = logging.getLogger("ca_match_logger")
+
+QUERY_CHUNK = 100  # gateway cap for user_ids per request
+NAME_TTL = 3600.0
+DEPARTED_TTL = 6 * 3600.0
+MAXSIZE = 4096
+
+Key = Tuple[int, int]  # (guild_id, user_id)
+
+
+def display_name(member: discord.Member) -> str:
+    return member.nick or member.display_name
+
+
+class MemberResolver:
+    """Resolve many user IDs to display names with as few Discord round trips as possible."""
+
+    def __init__(self, maxsize: int = MAXSIZE, ttl: float = NAME_TTL, departed_ttl: float = DEPARTED_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.departed_ttl = departed_ttl
+        self._clock = clock
+        self._names: "OrderedDict[Key, Tuple[float, str]]" = OrderedDict()
+        self._departed: "OrderedDict[Key, float]" = OrderedDict()
+
+    # ----- cache bookkeeping -----
+
+    def _cached_name(self, key: Key) -> str | None:
+        entry = self._names.get(key)
+        if entry is None:
+            return None
+        expires_at, name = entry
+        if expires_at <= self._clock():
+            del self._names[key]
+            return None
+        self._names.move_to_end(key)
+        return name
+
+    def _remember(self, key: Key, name: str):
+        self._names[key] = (self._clock() + self.ttl, name)
+        self._names.move_to_end(key)
+        self._departed.pop(key, None)
+        while len(self._names) > self.maxsize:
+            self._names.popitem(last=False)
+
+    def is_departed(self, guild_id: int, user_id: int) -> bool:
+        key = (guild_id, user_id)
+        expires_at = self._departed.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= self._clock():
+            del self._departed[key]
+            return False
+        return True
+
+    def mark_departed(self, guild_id: int, user_id: int):
+        key = (guild_id, user_id)
+        self._names.pop(key, None)
+        self._departed[key] = self._clock() + self.departed_ttl
+        self._departed.move_to_end(key)
+        while len(self._departed) > self.maxsize:
+            self._departed.popitem(last=False)
+
+    def departed(self, guild_id: int) -> List[int]:
+        """IDs currently recorded as gone from this guild."""
+        return sorted(uid for (gid, uid) in list(self._departed) if gid == guild_id and self.is_departed(gid, uid))
+
+    def forget(self, guild_id: int, user_id: int):
+        """Drop anything known about a user (e.g. they rejoined or changed nickname)."""
+        self._names.pop((guild_id, user_id), None)
+        self._departed.pop((guild_id, user_id), None)
+
+    # ----- resolution -----
+
+    async def _query(self, guild: discord.Guild, ids: List[int]) -> List[discord.Member]:
+        try:
+            return await guild.query_members(user_ids=ids, limit=len(ids), cache=True)
+        except (discord.ClientException, asyncio.TimeoutError) as e:
+            # no gateway chunking available: fall back to REST, still only for the misses
+            log.warning("query_members failed (%s); falling back to fetch_member for %d ids", e, len(ids))
+            found = []
+            for uid in ids:
+                try:
+                    found.append(await guild.fetch_member(uid))
+                except discord.NotFound:
+                    continue
+                except discord.HTTPException as e:  # Forbidden and the rest: render as departed
+                    log.warning("fetch_member(%s) failed: %s", uid, e)
+            return found
+
+    async def resolve(self, guild: discord.Guild, user_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        {user_id: display name} for the IDs that are still guild members.
+        Departed members are left out (and remembered); order of `user_ids` is irrelevant.
+        """
+        out: Dict[int, str] = {}
+        missing: List[int] = []
+        for uid in dict.fromkeys(int(u) for u in user_ids):
+            key = (guild.id, uid)
+            name = self._cached_name(key)
+            if name is not None:
+                out[uid] = name
+                continue
+            member = guild.get_member(uid)
+            if member is not None:
+                out[uid] = display_name(member)
+                self._remember(key, out[uid])
+            elif not self.is_departed(guild.id, uid):
+                missing.append(uid)
+
+        for i in range(0, len(missing), QUERY_CHUNK):
+            chunk = missing[i:i + QUERY_CHUNK]
+            found = {m.id: m for m in await self._query(guild, chunk)}
+            for uid in chunk:
+                member = found.get(uid)
+                if member is None:
+                    self.mark_departed(guild.id, uid)
+                    continue
+                out[uid] = display_name(member)
+                self._remember((guild.id, uid), out[uid])
+        return out
+
+
+member_resolver = MemberResolver()
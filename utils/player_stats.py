@@ -0,0 +1,189 @@
+# utils/player_stats.py
+"""
+/playerstats as one aggregation: a single $match on individual_results (served by
+ir_player_date_desc / ir_player_deckkey_date_desc) feeding a $facet with the seat
+split, the top decks and, when filtering to one deck, the first page of games.
+Later dump pages are fetched lazily with keyset pagination on (date, match_id).
+/deckstats' windowed seat split and top players are the same shapes keyed by
+deck (ir_deckkey_date_desc). Pure — no config/db imports.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.match_docs import seat_summary
+from utils.text import capitalize_words, deck_key, PAGE_HEADER
+
+DRAW_WEIGHT = 0.143
+TOP_DECKS = 10
+GAMES_PER_PAGE = 8
+
+Cursor = Tuple[datetime, int]  # (date, match_id) of the last game on a page
+
+
+def _count(result: str) -> dict:
+    return {"$sum": {"$cond": [{"$eq": ["$result", result]}, 1, 0]}}
+
+
+def player_stats_pipeline(
+    player_id: int,
+    start: datetime,
+    deck: Optional[str] = None,
+    *,
+    top: int = TOP_DECKS,
+    games_limit: Optional[int] = GAMES_PER_PAGE,
+    seats: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Facets: `seats` (W/L/D per seat; skip with seats=False when they come from
+    seat_stats), `top_decks` (unfiltered only) and `games` (filtered only; the first
+    dump page, oldest first, joined with the full match).
+    """
+    match: Dict[str, Any] = {"player_id": player_id, "date": {"$gte": start}}
+    if deck:
+        match["deck_key"] = deck_key(deck)
+
+    weighted = {"$add": ["$wins", {"$multiply": ["$draws", DRAW_WEIGHT]}]}
+    facet: Dict[str, Any] = {}
+    if seats:
+        facet["seats"] = [
+            {"$group": {"_id": "$seat", "games": {"$sum": 1},
+                        "wins": _count("win"), "losses": _count("loss"), "draws": _count("draw")}},
+        ]
+    if deck:
+        facet["games"] = [{"$match": {"match_id": {"$ne": None}}}, *_games_stages(games_limit)]
+    else:
+        facet["top_decks"] = [
+            {"$group": {"_id": "$deck_key", "deck_name": {"$last": "$deck_name"}, "games_played": {"$sum": 1},
+                        "wins": _count("win"), "losses": _count("loss"), "draws": _count("draw")}},
+            {"$addFields": {
+                "win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+                "weighted_win_percentage": {"$multiply": [{"$divide": [weighted, "$games_played"]}, 100]},
+            }},
+            {"$sort": {"weighted_win_percentage": -1, "games_played": -1, "_id": 1}},
+            {"$limit": top},
+        ]
+    return [{"$match": match}, {"$facet": facet}]
+
+
+def _games_stages(limit: Optional[int]) -> List[Dict[str, Any]]:
+    stages: List[Dict[str, Any]] = [{"$sort": {"date": 1, "match_id": 1}}]
+    if limit:
+        stages.append({"$limit": limit})
+    return stages + [
+        {"$lookup": {"from": "matches", "localField": "match_id", "foreignField": "match_id", "as": "game_data"}},
+        {"$unwind": "$game_data"},
+        {"$project": {"_id": 0, "match_id": 1, "date": 1, "players": "$game_data.players"}},
+    ]
+
+
+def games_page_pipeline(
+    player_id: int,
+    start: datetime,
+    deck: str,
+    after: Optional[Cursor] = None,
+    limit: int = GAMES_PER_PAGE,
+) -> List[Dict[str, Any]]:
+    """One dump page: the `limit` games after `after`, walking ir_player_deckkey_date_desc."""
+    match: Dict[str, Any] = {
+        "player_id": player_id,
+        "deck_key": deck_key(deck),
+        "date": {"$gte": start},
+        "match_id": {"$ne": None},
+    }
+    if after is not None:
+        d, mid = after
+        match["$or"] = [{"date": {"$gt": d}}, {"date": d, "match_id": {"$gt": mid}}]
+    return [{"$match": match}, *_games_stages(limit)]
+
+
+def next_cursor(docs: List[dict], limit: int = GAMES_PER_PAGE) -> Optional[Cursor]:
+    """Cursor for the page after `docs`, or None when this was the last page."""
+    if len(docs) < limit:
+        return None
+    return docs[-1]["date"], docs[-1]["match_id"]
+
+
+def deck_seats_pipeline(deck: str, start: datetime) -> List[Dict[str, Any]]:
+    """W/L/D per seat for one deck since `start`."""
+    return [
+        {"$match": {"deck_key": deck_key(deck), "date": {"$gte": start}}},
+        {"$group": {"_id": "$seat", "games": {"$sum": 1},
+                    "wins": _count("win"), "losses": _count("loss"), "draws": _count("draw")}},
+    ]
+
+
+def deck_top_players_pipeline(deck: str, start: datetime, *, min_games: int = 5, limit: int = 10) -> List[Dict[str, Any]]:
+    """Best pilots of one deck since `start`, ranked like the leaderboards."""
+    weighted = {"$add": ["$wins", {"$multiply": ["$draws", DRAW_WEIGHT]}]}
+    return [
+        {"$match": {"deck_key": deck_key(deck), "date": {"$gte": start}}},
+        {"$group": {"_id": "$player_id", "games_played": {"$sum": 1},
+                    "wins": _count("win"), "losses": _count("loss"), "draws": _count("draw")}},
+        {"$addFields": {
+            "weighted_wins": weighted,
+            "win_percentage": {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+            "weighted_win_percentage": {"$multiply": [{"$divide": [weighted, "$games_played"]}, 100]},
+        }},
+        {"$match": {"games_played": {"$gte": min_games}}},
+        {"$sort": {"weighted_win_percentage": -1, "games_played": -1}},
+        {"$limit": limit},
+    ]
+
+
+def shape_games(docs: List[dict]) -> List[dict]:
+    return [
+        {
+            "id": g["match_id"],
+            "date": g["date"],
+            "players": [{"deck_name": capitalize_words(p.get("deck_name", "Unknown")),
+                         "winner": p.get("result") == "win"} for p in g["players"]],
+        }
+        for g in docs
+    ]
+
+
+def render_games_page(games: List[dict], target_deck: str) -> str:
+    """Dump text for one page, with the filtered deck in bold and the winner starred."""
+    target = (target_deck or "").lower()
+    out: List[str] = []
+    for g in games:
+        d = g["date"]
+        txt = f"**Game ID**: `{g['id']}` - `{d.strftime('%b')} {d.day}, {d.year}`\n"
+        for i, p in enumerate(g["players"], start=1):
+            name = p.get("deck_name", "Unknown")
+            bold = f"**{name}**" if name.lower() == target else name
+            star = "🏆" if p.get("winner") else ""
+            txt += f"Seat {i}: {bold} {star}\n"
+        out.append(txt.strip())
+    return (PAGE_HEADER + "\n".join(out)).strip()
+
+
+def shape_player_stats(doc: dict) -> Optional[dict]:
+    """
+    Flatten the facet result into the dict /playerstats renders:
+    wins/losses/draws, seatN/winseatN, top_10_decks, games_total and, when filtered,
+    the first page of games plus the cursor for the next one. None when no games.
+    """
+    seats = doc.get("seats") or []
+    if not seats:
+        return None
+    out: Dict[str, Any] = dict(seat_summary(seats))
+
+    out["top_10_decks"] = [
+        {
+            "deck_name": capitalize_words(d.get("deck_name") or "Unknown"),
+            "wins": d["wins"],
+            "losses": d["losses"],
+            "draws": d["draws"],
+            "games_played": d["games_played"],
+            "win_percentage": float(d["win_percentage"]),
+            "weighted_win_percentage": float(d["weighted_win_percentage"]),
+        }
+        for d in doc.get("top_decks") or []
+    ]
+    out["games_total"] = out["wins"] + out["losses"] + out["draws"]
+    if "games" in doc:
+        out["games"] = shape_games(doc["games"])
+        out["games_cursor"] = next_cursor(doc["games"])
+    return out
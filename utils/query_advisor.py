@@ -0,0 +1,52 @@
+# utils/query_advisor.py
+"""
+Runs the query plan advisor (see utils.query_plans) against the live data.
+
+Explains catalog entries with executionStats, using parameters sampled from
+the latest logged match. Entries marked "full" walk a whole collection by
+design and are skipped unless include_full=True, so a /reindex on a large
+database does not run every engine load and rebuild. /reindex and advise.py
+call explain_queries().
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from pymongo.errors import OperationFailure
+
+from db import db, matches
+from utils.query_plans import analyze, explain_command, query_catalog
+from utils.rollups import archive_boundary
+
+log = logging.getLogger("ca_match_logger")
+
+
+async def sample_parameters() -> Dict[str, Any]:
+    """A real player, deck and match_id from the latest match (placeholders on an empty database)."""
+    md = await matches.find_one({}, {"_id": 0, "match_id": 1, "players": 1}, sort=[("match_id", -1)])
+    seat = (md or {}).get("players", [{}])[0]
+    return {
+        "player_id": seat.get("player_id", 0),
+        "deck": seat.get("deck_name", "Unknown"),
+        "match_id": (md or {}).get("match_id", 0),
+        "boundary": await archive_boundary(),
+    }
+
+
+async def explain_queries(*, include_full: bool = False) -> List[Dict[str, Any]]:
+    """analyze() rows for the catalog entries, in catalog order ("full" entries only with include_full)."""
+    catalog = [e for e in query_catalog(await sample_parameters()) if include_full or not e.get("full")]
+    indexes = {}
+    for coll in {e["coll"] for e in catalog}:
+        info = await db[coll].index_information()
+        indexes[coll] = [list(ix["key"]) for ix in info.values()]
+
+    rows = []
+    for entry in catalog:
+        try:
+            explain = await db.command(explain_command(entry))
+        except OperationFailure as e:
+            log.warning("advise: explain failed for %s: %s", entry["name"], e)
+            continue
+        rows.append(analyze(entry, explain, indexes))
+    return rows
@@ -0,0 +1,322 @@
+# utils/query_plans.py
+"""
+Query plan advisor: the catalog of queries the bot issues, and what to make of
+their explain("executionStats") output.
+
+`query_catalog` builds every pipeline and find the cogs and background writers
+run, from the same builders they use, with representative parameters sampled
+from the data (utils.query_advisor picks them). Each entry is
+
+    {"name", "coll", "pipeline"}                        an aggregation
+    {"name", "coll", "filter", "sort"?, "limit"?}       a find / find_one
+
+plus "full": True for reads that are meant to walk a whole collection (engine
+loads, rebuilds), where a COLLSCAN is the plan, not a problem.
+
+`analyze` reduces one explain to the stages and indexes the query layer used,
+keys/docs examined vs. returned, and flags:
+
+    COLLSCAN   the query walked a collection it was not meant to
+    SORT       an in-memory sort in the query layer (no index serves the order)
+    RATIO      more than MAX_RATIO docs examined per doc returned
+
+Small reads (under MIN_EXAMINED docs) only get the COLLSCAN check. Flagged
+queries get a compound index proposal ordered by the ESR rule (equality fields,
+then the sort, then ranges) unless an existing index already starts with it.
+Pure — no config/db imports.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.archive import archive_pipeline, freeze_pipeline, month_floor
+from utils.deck_jobs import ACTIVE, BATCH_SIZE, ir_filter, match_filter
+from utils.deck_names import names_pipeline
+from utils.eras import era_seat_pipeline
+from utils.leaderboard import leaderboard_pipeline
+from utils.match_docs import deck_players_pipeline
+from utils.player_stats import (
+    deck_seats_pipeline,
+    deck_top_players_pipeline,
+    games_page_pipeline,
+    player_stats_pipeline,
+)
+from utils.ratings import ratings_filter
+from utils.text import deck_key
+from utils.time_ranges import POSTBAN_START
+
+MAX_RATIO = 10      # docs examined per doc returned before a query is flagged
+MIN_EXAMINED = 100  # below this, sorts and ratios are too small to matter
+
+IndexKey = List[Tuple[str, int]]
+
+_EQ_OPS = {"$eq", "$in"}
+
+
+# ---------- catalog ----------
+
+def query_catalog(sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Every query worth explaining. `sample` holds player_id, deck (a logged deck
+    name), match_id, boundary (archive_boundary() or None) and now.
+    """
+    now = sample.get("now") or datetime.now(timezone.utc)
+    pid, deck, mid = sample["player_id"], sample["deck"], sample["match_id"]
+    key = deck_key(deck)
+    boundary = sample.get("boundary")
+    month = now - timedelta(days=30)
+    ever = datetime.min.replace(tzinfo=timezone.utc)
+    job = {"old_key": key, "new_name": deck + " (renamed)"}
+
+    return [
+        # /leaderboard, /ratings
+        {"name": "/leaderboard players 1m", "coll": "daily_rollups",
+         "pipeline": leaderboard_pipeline("player", month, (month - timedelta(days=30), month))},
+        {"name": "/leaderboard decks 6m", "coll": "daily_rollups",
+         "pipeline": leaderboard_pipeline("deck", now - timedelta(days=180), limit=40)},
+        {"name": "/leaderboard players all (postban)", "coll": "individual_results",
+         "pipeline": archive_pipeline({}, POSTBAN_START, boundary, "player_id", limit=40)},
+        {"name": "/leaderboard decks all", "coll": "individual_results",
+         "pipeline": archive_pipeline({}, ever, boundary, "deck_key", limit=40)},
+        {"name": "/ratings players", "coll": "ratings",
+         "filter": {"kind": "player", "games": {"$gte": 10}}, "sort": [("rating", -1)], "limit": 40},
+
+        # /playerstats, /deckstats, /estousempreemultimo
+        {"name": "/playerstats 3m", "coll": "individual_results",
+         "pipeline": player_stats_pipeline(pid, now - timedelta(days=90))},
+        {"name": "/playerstats 3m with deck", "coll": "individual_results",
+         "pipeline": player_stats_pipeline(pid, now - timedelta(days=90), deck)},
+        {"name": "/playerstats all top decks", "coll": "individual_results",
+         "pipeline": archive_pipeline({"player_id": pid}, ever, boundary, "deck_key", limit=10)},
+        {"name": "/playerstats full dump page", "coll": "individual_results",
+         "pipeline": games_page_pipeline(pid, ever, deck, after=(month, mid))},
+        {"name": "/deckstats 1y seats", "coll": "individual_results",
+         "pipeline": deck_seats_pipeline(deck, now - timedelta(days=365))},
+        {"name": "/deckstats 1y top players", "coll": "individual_results",
+         "pipeline": deck_top_players_pipeline(deck, now - timedelta(days=365))},
+        {"name": "/deckstats all top players", "coll": "individual_results",
+         "pipeline": archive_pipeline({"deck_key": key}, ever, boundary, "player_id", min_games=5, limit=10)},
+        {"name": "seat split (player)", "coll": "seat_stats",
+         "filter": {"kind": "player", "key": pid, "era": {"$in": ["preban", "postban"]}}},
+        {"name": "/generalstats seat split", "coll": "seat_stats",
+         "filter": {"kind": "all"}, "sort": [("seat", 1)]},
+        {"name": "/generalstats custom eras", "coll": "individual_results",
+         "pipeline": era_seat_pipeline([POSTBAN_START]), "full": True},
+        {"name": "/estousempreemultimo", "coll": "individual_results",
+         "filter": {"player_id": pid}, "sort": [("date", -1)], "limit": 10},
+
+        # match admin and logging
+        {"name": "match by id", "coll": "matches", "filter": {"match_id": mid}, "limit": 1},
+        {"name": "max match_id", "coll": "matches", "filter": {}, "sort": [("match_id", -1)], "limit": 1},
+        {"name": "/deletetrack id list", "coll": "matches",
+         "filter": {"match_id": {"$in": [mid, mid + 1, mid + 2]}}, "sort": [("match_id", 1)]},
+        {"name": "deck by name", "coll": "decks", "filter": {"name": deck}, "limit": 1},
+        {"name": "deck by key", "coll": "decks", "filter": {"deck_key": key}, "limit": 1},
+        {"name": "ratings for a new match", "coll": "ratings",
+         "filter": ratings_filter([("player", pid), ("deck", key)])},
+        {"name": "deck players recount", "coll": "individual_results", "pipeline": deck_players_pipeline([key])},
+
+        # deck jobs and the registry
+        {"name": "job claim", "coll": "jobs",
+         "filter": {"status": {"$in": list(ACTIVE)}}, "sort": [("created_at", 1)], "limit": 1},
+        {"name": "job batch (individual_results)", "coll": "individual_results",
+         "filter": ir_filter(job), "limit": BATCH_SIZE},
+        {"name": "job batch (matches)", "coll": "matches", "filter": match_filter(job), "limit": BATCH_SIZE},
+        {"name": "deck_names recount", "coll": "individual_results", "pipeline": names_pipeline([key])},
+        {"name": "deck_names load", "coll": "deck_names", "filter": {"rows": {"$gt": 0}}, "full": True},
+
+        # monthly archive
+        {"name": "archive boundary", "coll": "archive_months", "filter": {}, "sort": [("_id", -1)], "limit": 1},
+        {"name": "freeze month", "coll": "individual_results",
+         "pipeline": freeze_pipeline(month_floor(now) - timedelta(days=1))},
+        {"name": "first logged game", "coll": "individual_results", "filter": {}, "sort": [("date", 1)], "limit": 1},
+
+        {"name": "ratings checkpoint", "coll": "rating_checkpoints", "filter": {"_id": month_floor(now)}, "limit": 1},
+        {"name": "ratings replay since a checkpoint", "coll": "matches",
+         "filter": {"date": {"$gte": month_floor(now)}}, "sort": [("date", 1), ("match_id", 1)]},
+
+        # rebuilds and engine loads walk everything by design
+        {"name": "ratings replay", "coll": "matches",
+         "filter": {}, "sort": [("date", 1), ("match_id", 1)], "full": True},
+        {"name": "analytics engine load", "coll": "individual_results", "filter": {}, "full": True},
+    ]
+
+
+def explain_command(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The `explain` database command for one catalog entry."""
+    if "pipeline" in entry:
+        inner: Dict[str, Any] = {"aggregate": entry["coll"], "pipeline": entry["pipeline"], "cursor": {}}
+    else:
+        inner = {"find": entry["coll"], "filter": entry.get("filter", {})}
+        if entry.get("sort"):
+            inner["sort"] = dict(entry["sort"])
+        if entry.get("limit"):
+            inner["limit"] = entry["limit"]
+    return {"explain": inner, "verbosity": "executionStats"}
+
+
+# ---------- explain output ----------
+
+def _plan_nodes(node: Any) -> Iterable[dict]:
+    """Every stage of a (classic or SBE) winning plan tree."""
+    if not isinstance(node, dict):
+        return
+    if "queryPlan" in node:  # SBE wraps the classic-shaped tree
+        yield from _plan_nodes(node["queryPlan"])
+        return
+    if "stage" in node:
+        yield node
+    for child in ("inputStage", "outerStage", "innerStage"):
+        yield from _plan_nodes(node.get(child))
+    for child in node.get("inputStages", []):
+        yield from _plan_nodes(child)
+
+
+def _query_layers(explain: Any) -> Iterable[dict]:
+    """Every {queryPlanner, executionStats} block in an explain: find, $cursor, $unionWith sub-pipelines."""
+    if isinstance(explain, dict):
+        if "queryPlanner" in explain:
+            yield explain
+        for k, v in explain.items():
+            if k not in ("queryPlanner", "executionStats", "command"):
+                yield from _query_layers(v)
+    elif isinstance(explain, list):
+        for v in explain:
+            yield from _query_layers(v)
+
+
+def _lookups(explain: Any) -> Iterable[dict]:
+    """$lookup stages that report their own scan counts (MongoDB 5.0+)."""
+    if isinstance(explain, dict):
+        if "$lookup" in explain and "collectionScans" in explain:
+            yield explain
+        for v in explain.values():
+            yield from _lookups(v)
+    elif isinstance(explain, list):
+        for v in explain:
+            yield from _lookups(v)
+
+
+def query_shape(entry: Dict[str, Any]) -> Tuple[Dict[str, Any], IndexKey]:
+    """(filter, sort) the query layer sees: a find's own, or an aggregation's leading $match / $sort."""
+    if "pipeline" not in entry:
+        return entry.get("filter") or {}, list(entry.get("sort") or [])
+    stages = entry["pipeline"]
+    flt: Dict[str, Any] = {}
+    sort: IndexKey = []
+    if stages and "$match" in stages[0]:
+        flt = stages[0]["$match"]
+        stages = stages[1:]
+    if stages and "$sort" in stages[0]:
+        sort = list(stages[0]["$sort"].items())
+    return flt, sort
+
+
+def analyze(entry: Dict[str, Any], explain: Dict[str, Any],
+            indexes: Optional[Dict[str, List[IndexKey]]] = None) -> Dict[str, Any]:
+    """Summarize one explain("executionStats") result and flag what needs an index."""
+    stages: List[str] = []
+    used: List[str] = []
+    keys = docs = returned = ms = 0
+    for layer in _query_layers(explain):
+        for node in _plan_nodes(layer["queryPlanner"].get("winningPlan", {})):
+            stages.append(node["stage"])
+            if node.get("indexName") and node["indexName"] not in used:
+                used.append(node["indexName"])
+        st = layer.get("executionStats", {})
+        keys += st.get("totalKeysExamined", 0)
+        docs += st.get("totalDocsExamined", 0)
+        returned += st.get("nReturned", 0)
+        ms += st.get("executionTimeMillis", 0)
+    lookup_scans = 0
+    for lk in _lookups(explain):
+        docs += lk.get("totalDocsExamined", 0)
+        keys += lk.get("totalKeysExamined", 0)
+        lookup_scans += lk.get("collectionScans", 0)
+
+    flags: List[str] = []
+    if not entry.get("full") and ("COLLSCAN" in stages or lookup_scans):
+        flags.append("COLLSCAN")
+    if max(docs, keys) >= MIN_EXAMINED:
+        if "SORT" in stages:
+            flags.append("SORT")
+        if max(docs, keys) > MAX_RATIO * max(returned, 1):
+            flags.append("RATIO")
+
+    suggest = None
+    if flags:
+        flt, sort = query_shape(entry)
+        suggest = suggest_index(flt, sort, (indexes or {}).get(entry["coll"], []))
+    return {
+        "name": entry["name"], "coll": entry["coll"], "stages": stages, "indexes": used,
+        "keys_examined": keys, "docs_examined": docs, "returned": returned, "ms": ms,
+        "flags": flags, "suggest": suggest,
+    }
+
+
+# ---------- index proposals ----------
+
+def _classify(flt: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """field -> "E" (equality / $in) or "R" (range), in filter order; $or/$and branches are merged."""
+    out: Dict[str, str] = {}
+
+    def put(field: str, kind: str):
+        out[field] = "R" if out.get(field) == "R" else kind
+
+    for field, cond in flt.items():
+        if field in ("$or", "$and"):
+            for branch in cond:
+                for f, kind in _classify(branch, prefix).items():
+                    put(f, kind)
+            continue
+        if field.startswith("$"):
+            continue  # $expr, $nor, ...: nothing an index key can state
+        path = prefix + field
+        if isinstance(cond, dict) and "$elemMatch" in cond:
+            for f, kind in _classify(cond["$elemMatch"], path + ".").items():
+                put(f, kind)
+        elif isinstance(cond, dict) and any(op.startswith("$") for op in cond):
+            put(path, "E" if set(cond) <= _EQ_OPS else "R")
+        else:
+            put(path, "E")
+    return out
+
+
+def suggest_index(flt: Dict[str, Any], sort: Sequence[Tuple[str, int]],
+                  existing: Sequence[IndexKey] = ()) -> Optional[IndexKey]:
+    """
+    ESR-ordered compound key for (filter, sort): equality fields, then the sort
+    fields, then range fields. None when there is nothing to index or an existing
+    index already starts with those fields.
+    """
+    fields = _classify(flt)
+    key: IndexKey = [(f, 1) for f, kind in fields.items() if kind == "E"]
+    key += [(f, d) for f, d in sort if f not in dict(key)]
+    key += [(f, 1) for f, kind in fields.items() if kind == "R" and f not in dict(key)]
+    if not key:
+        return None
+    names = [f for f, _ in key]
+    if any([f for f, _ in idx][:len(names)] == names for idx in existing):
+        return None
+    return key
+
+
+def index_spec(key: IndexKey) -> str:
+    return "{" + ", ".join(f"{f}: {d}" for f, d in key) + "}"
+
+
+def render_advice(rows: List[Dict[str, Any]]) -> str:
+    """Plain-text report shared by /reindex and advise.py; flagged queries first."""
+    flagged = [r for r in rows if r["flags"]]
+    lines = [f"Explained {len(rows)} queries; {len(flagged)} flagged."]
+    for r in sorted(rows, key=lambda r: not r["flags"]):
+        via = ", ".join(r["indexes"]) or ("COLLSCAN" if "COLLSCAN" in r["stages"] else "-")
+        mark = "!! " + "/".join(r["flags"]) + " " if r["flags"] else ""
+        lines.append(
+            f"- {mark}{r['name']} [{r['coll']}] via {via}: "
+            f"{r['docs_examined']} docs / {r['keys_examined']} keys examined, "
+            f"{r['returned']} returned, {r['ms']} ms"
+        )
+        if r["suggest"]:
+            lines.append(f"  ↳ suggest {r['coll']}.createIndex({index_spec(r['suggest'])})")
+    return "\n".join(lines)
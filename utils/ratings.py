@@ -0,0 +1,149 @@
+# utils/ratings.py
+"""
+Multiplayer Elo for players and decks. A pod is scored as every pair of seats
+playing a mini-game (win beats loss, equal results split the point), with K
+spread over the n-1 opponents, so one match touches only its own seats' ratings.
+
+Ratings are order-dependent: utils.match_writes applies new matches as they are
+logged, and utils.rollups.rebuild_ratings replays matches oldest first after
+edits, deletes and deck merges. The replay leaves a checkpoint (every rating as
+it stood) at the start of each month, so an edit only replays from its own
+month on. render_ratings builds the /ratings embed.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import discord
+from pymongo import UpdateOne
+
+from utils.text import deck_key
+
+BASE_RATING = 1500.0
+K_FACTOR = 32.0
+MIN_GAMES = 10
+FIELDS_PER_EMBED = 25
+
+SCORES = {"win": 1.0, "draw": 0.5, "loss": 0.0}
+
+RatingKey = Tuple[str, Any]  # (kind "player"|"deck", player_id | deck_key)
+Ratings = Dict[RatingKey, Dict[str, Any]]  # {"rating": float, "games": int[, "name": str]}
+
+
+def expected(ra: float, rb: float) -> float:
+    """Chance that a player rated `ra` beats one rated `rb`."""
+    return 1.0 / (1.0 + 10 ** ((rb - ra) / 400.0))
+
+
+def pod_deltas(ratings: List[float], scores: List[float], k: float = K_FACTOR) -> List[float]:
+    """Rating change per seat for one pod; the changes sum to zero."""
+    n = len(ratings)
+    if n < 2:
+        return [0.0] * n
+    kk = k / (n - 1)
+    out = [0.0] * n
+    for i in range(n):
+        for j in range(i + 1, n):
+            actual = 0.5 + (scores[i] - scores[j]) / 2
+            d = kk * (actual - expected(ratings[i], ratings[j]))
+            out[i] += d
+            out[j] -= d
+    return out
+
+
+def seat_keys(md: dict) -> Dict[str, List[Any]]:
+    """Per kind, the rating key of every seat in seat order."""
+    players = md.get("players") or []
+    return {
+        "player": [p["player_id"] for p in players],
+        "deck": [deck_key(p["deck_name"]) for p in players],
+    }
+
+
+def apply_match(table: Ratings, md: dict) -> List[RatingKey]:
+    """
+    Update `table` in place with one match; returns the keys it touched.
+    Matches with an unrecorded result are skipped.
+    """
+    players = md.get("players") or []
+    if len(players) < 2 or any(p.get("result") not in SCORES for p in players):
+        return []
+    scores = [SCORES[p["result"]] for p in players]
+    touched: List[RatingKey] = []
+    for kind, keys in seat_keys(md).items():
+        before = [table.get((kind, k), {}).get("rating", BASE_RATING) for k in keys]
+        for i, (k, d) in enumerate(zip(keys, pod_deltas(before, scores))):
+            row = table.setdefault((kind, k), {"rating": BASE_RATING, "games": 0})
+            row["rating"] += d
+            row["games"] += 1
+            if kind == "deck":
+                row["name"] = players[i]["deck_name"]
+            touched.append((kind, k))
+    return list(dict.fromkeys(touched))
+
+
+def replay(mds: Iterable[dict]) -> Ratings:
+    """Ratings from scratch; `mds` must be oldest first."""
+    table: Ratings = {}
+    for md in mds:
+        apply_match(table, md)
+    return table
+
+
+def rating_ops(table: Ratings, keys: Iterable[RatingKey]) -> List[UpdateOne]:
+    """Upserting $set ops for the ratings collection."""
+    return [
+        UpdateOne({"kind": kind, "key": key}, {"$set": table[(kind, key)]}, upsert=True)
+        for kind, key in keys
+    ]
+
+
+def rating_rows(table: Ratings) -> List[dict]:
+    """Documents for a full rewrite of the ratings collection."""
+    return [{"kind": kind, "key": key, **row} for (kind, key), row in table.items()]
+
+
+def checkpoint_doc(month: datetime, table: Ratings) -> dict:
+    """The rating_checkpoints document for `month`: `table` as it stood when the month began."""
+    return {"_id": month, "rows": rating_rows(table)}
+
+
+def checkpoint_table(doc: dict) -> Ratings:
+    """The table a checkpoint_doc was made from."""
+    return {(r["kind"], r["key"]): {f: v for f, v in r.items() if f not in ("kind", "key")} for r in doc["rows"]}
+
+
+def ratings_filter(keys: Iterable[RatingKey]) -> dict:
+    """Query for the stored rows of `keys` (what a new match needs to read first)."""
+    by_kind: Dict[str, List[Any]] = {}
+    for kind, key in keys:
+        by_kind.setdefault(kind, []).append(key)
+    return {"$or": [{"kind": kind, "key": {"$in": sorted(set(ks), key=str)}} for kind, ks in by_kind.items()]}
+
+
+def render_ratings(
+    title: str,
+    rows: List[dict],
+    name_of: Callable[[dict], Optional[str]],
+    *,
+    color: int,
+) -> List[discord.Embed]:
+    """Embeds of up to 25 ranked fields; rows whose `name_of` is None are skipped."""
+    embeds: List[discord.Embed] = []
+    embed = discord.Embed(title=title, color=color)
+    pos = 1
+    for d in rows:
+        name = name_of(d)
+        if name is None:
+            continue
+        medal = "🥇" if pos == 1 else "🥈" if pos == 2 else "🥉" if pos == 3 else f"{pos}."
+        embed.add_field(name=f"{medal} {name}", value=f"**{round(d['rating'])}** (Games: {d['games']})", inline=False)
+        pos += 1
+        if len(embed.fields) >= FIELDS_PER_EMBED:
+            embeds.append(embed)
+            embed = discord.Embed(color=color)
+    if embed.fields:
+        embeds.append(embed)
+    if not embeds:
+        embeds = [discord.Embed(title=title, description="No results found.", color=color)]
+    return embeds
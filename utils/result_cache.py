@@ -0,0 +1,112 @@
+# utils/result_cache.py
+"""
+Process-wide cache for read-heavy command results (/leaderboard, /deckstats,
+/generalstats). Entries expire after a TTL, the least recently used are evicted
+past `maxsize`, and every write path calls `invalidate()` so nothing computed
+before a /track or an edit is ever served afterwards.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAXSIZE = 256
+
+
+class ResultCache:
+    """Async LRU + TTL cache keyed by hashable tuples, invalidated by a generation counter."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()  # key -> (generation, expires_at, value)
+        self._inflight: dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self):
+        """Forget everything cached so far. Cheap: old entries just stop matching."""
+        self.generation += 1
+        self._entries.clear()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        gen, expires_at, value = entry
+        if gen != self.generation or expires_at <= self._clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, generation: int | None = None):
+        gen = self.generation if generation is None else generation
+        if gen != self.generation:
+            return  # computed against data that has since changed
+        self._entries[key] = (gen, self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for `key`, or await `compute()` and cache it. Concurrent callers
+        for the same key share one computation. Returned values are shared; don't mutate them.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            self.hits += 1
+            return value
+
+        gen = self.generation
+        flight_key = (gen, key)
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = fut
+        try:
+            value = await compute()
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved so a lone caller doesn't log "never retrieved"
+            raise
+        else:
+            fut.set_result(value)
+            self.put(key, value, generation=gen)
+            return value
+        finally:
+            self._inflight.pop(flight_key, None)
+
+
+def day_key(dt: datetime | None = None) -> str:
+    """UTC calendar day used in keys, so "last 30 days" keys roll over once a day."""
+    dt = dt or datetime.now(timezone.utc)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).date().isoformat()
+
+
+def period_key(period: str, postban: bool, now: datetime | None = None) -> tuple:
+    return (period, bool(postban), day_key(now))
+
+
+result_cache = ResultCache()
+
+
+def invalidate():
+    """Called by every write path after it commits."""
+    result_cache.invalidate()
@@ -0,0 +1,280 @@
+# utils/rollups.py
+"""
+Derived stats stores, kept current by utils.match_writes:
+
+- daily_rollups: W/L/D/games per (kind, key, day), kind "player" (key = player_id)
+  or "deck" (key = deck_key). Leaderboards sum these instead of scanning results.
+- seat_stats: W/L/D/games per (kind, key, era, seat), kind "all" (key None),
+  "player" or "deck"; era "preban"/"postban". Seat splits are point lookups.
+- ratings: multiplayer Elo per (kind, key), see utils.ratings. New matches are
+  applied incrementally; anything that rewrites history replays them from the
+  rating_checkpoints entry (one per month) of the earliest month it touched.
+- monthly_summaries: W/L/D/games per (month, player, deck) for closed months,
+  see utils.archive. archive_months records which months are frozen; writes
+  that land in a frozen month re-freeze it.
+- deck_names: individual_results rows per (deck_key, spelling), the orphan
+  registry behind /findmisnameddecks, see utils.deck_names.
+
+The functions here rebuild them from matches, freeze months and read them back.
+A rebuild swaps a store's rows in one step, so readers (and the result cache)
+never see it empty or half-written.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import IndexModel
+
+from db import (
+    matches, individual_results, daily_rollups, seat_stats, ratings, rating_checkpoints, monthly_summaries,
+    archive_months, deck_names, run_in_transaction,
+)
+from utils.match_docs import rollup_deltas, seat_deltas, merge_deltas, deck_display_names, ERAS, SEATS
+from utils.result_cache import invalidate as invalidate_results
+from utils.analytics import engine as analytics
+from utils.headtohead import h2h
+from utils.deck_names import names_pipeline, orphan_decks
+from utils.ratings import apply_match, checkpoint_doc, checkpoint_table, rating_rows
+from utils.archive import archive_pipeline, freeze_pipeline, month_floor, months_between, next_month
+from utils.text import deck_key
+
+BATCH_SIZE = 1000
+
+# serializes incremental rating writes (utils.match_writes) with full replays
+ratings_lock = asyncio.Lock()
+
+
+def _rollup_row(kind: str, key: Any, day: datetime, counts: dict, names: Dict[str, str]) -> dict:
+    row = {"kind": kind, "key": key, "day": day, **counts}
+    if kind == "deck":
+        row["name"] = names.get(key, key)
+    return row
+
+
+async def _replace(coll, clear: dict, rows: List[dict]) -> int:
+    """
+    Swap the rows matching `clear` for `rows` atomically. A whole collection is
+    built in a staging copy with the same indexes and renamed over the original;
+    a slice is deleted and re-inserted in one transaction. Returns rows written.
+    """
+    if not clear:
+        staging = coll.database[f"{coll.name}_rebuild"]
+        await staging.drop()  # left over from an interrupted rebuild
+        await coll.database.create_collection(staging.name)
+        indexes = [IndexModel(list(ix["key"]), name=name, unique=ix.get("unique", False))
+                   for name, ix in (await coll.index_information()).items() if name != "_id_"]
+        if indexes:
+            await staging.create_indexes(indexes)
+        for i in range(0, len(rows), BATCH_SIZE):
+            await staging.insert_many(rows[i:i + BATCH_SIZE], ordered=False)
+        await staging.rename(coll.name, dropTarget=True)
+    else:
+        async def _swap(session):
+            await coll.delete_many(clear, session=session)
+            for i in range(0, len(rows), BATCH_SIZE):
+                # insert_many stamps _id onto the dicts; copies keep a retried transaction clean
+                await coll.insert_many([dict(r) for r in rows[i:i + BATCH_SIZE]], session=session)
+
+        await run_in_transaction(_swap)
+    invalidate_results()
+    return len(rows)
+
+
+async def _rebuild(match_filter: dict, clear: dict, keep=lambda kind, key: True,
+                   stores: Iterable[str] = ("daily_rollups", "seat_stats")) -> Dict[str, int]:
+    """
+    Recount `stores` (both by default, in one pass) from the matches selected by
+    `match_filter`, replacing the rows matching `clear`. Returns rows written per collection.
+    """
+    stores = set(stores)
+    rollups: dict = {}
+    seats: dict = {}
+    names: Dict[str, str] = {}
+    async for md in matches.find(match_filter, {"_id": 0, "players": 1, "date": 1}):
+        if "daily_rollups" in stores:
+            merge_deltas(rollups, rollup_deltas([md]))
+            names.update(deck_display_names([md]))
+        if "seat_stats" in stores:
+            merge_deltas(seats, seat_deltas([md]))
+
+    counts = {}
+    if "daily_rollups" in stores:
+        counts["daily_rollups"] = await _replace(daily_rollups, clear, [
+            _rollup_row(kind, key, day, c, names)
+            for (kind, key, day), c in rollups.items() if keep(kind, key)
+        ])
+    if "seat_stats" in stores:
+        counts["seat_stats"] = await _replace(seat_stats, clear, [
+            {"kind": kind, "key": key, "era": era, "seat": seat, **c}
+            for (kind, key, era, seat), c in seats.items() if keep(kind, key)
+        ])
+    invalidate_results()
+    # deck renames/merges re-key rows; reload rather than patch
+    analytics.invalidate()
+    h2h.invalidate()
+    return counts
+
+
+async def rebuild_daily_rollups() -> int:
+    """Recount daily_rollups alone from every match. Returns rows written."""
+    return (await _rebuild({}, {}, stores=("daily_rollups",)))["daily_rollups"]
+
+
+async def rebuild_seat_stats() -> int:
+    """Recount seat_stats alone from every match. Returns rows written."""
+    return (await _rebuild({}, {}, stores=("seat_stats",)))["seat_stats"]
+
+
+async def rebuild_ratings(since: Optional[datetime] = None) -> int:
+    """
+    Replay matches oldest first into a fresh ratings collection. With `since`, start
+    from the checkpoint of since's month rather than the first match (all of them
+    when there is none). Every later month the replay enters gets a new checkpoint.
+    Returns rows written.
+    """
+    async with ratings_lock:
+        month = month_floor(since) if since else None
+        doc = await rating_checkpoints.find_one({"_id": month}) if month else None
+        table = checkpoint_table(doc) if doc else {}
+        if not doc:
+            month = None
+        # later checkpoints are about to be rewritten; ones for months left empty must not survive stale
+        await rating_checkpoints.delete_many({"_id": {"$gt": month}} if month else {})
+        query = {"date": {"$gte": month}} if month else {}
+        async for md in matches.find(query, {"_id": 0, "players": 1, "date": 1}).sort([("date", 1), ("match_id", 1)]):
+            if month_floor(md["date"]) != month:
+                month = month_floor(md["date"])
+                await rating_checkpoints.replace_one({"_id": month}, checkpoint_doc(month, table), upsert=True)
+            apply_match(table, md)
+        return await _replace(ratings, {}, rating_rows(table))
+
+
+async def rebuild_deck_names(keys: Optional[List[str]] = None) -> int:
+    """Recount deck_names from individual_results, for every deck or just these deck_keys. Returns rows written."""
+    rows = await individual_results.aggregate(names_pipeline(keys)).to_list(length=None)
+    n = await _replace(deck_names, {} if keys is None else {"deck_key": {"$in": keys}}, rows)
+    orphan_decks.invalidate()
+    return n
+
+
+async def rebuild_rollups() -> Dict[str, int]:
+    """Regenerate every derived store from matches. Returns rows written per collection."""
+    counts = await _rebuild({}, {})
+    counts["deck_names"] = await rebuild_deck_names()
+    counts["ratings"] = await rebuild_ratings()
+    counts["monthly_summaries"] = await _refreeze(await archive_months.distinct("_id"))
+    return counts
+
+
+async def rebuild_deck_rollups(deck_names: Iterable[str]) -> Dict[str, int]:
+    """
+    Re-key/recount the deck rows for these decks (after a rename, merge or correction).
+    Ratings are left to the caller: a merge changes every opponent's history, so
+    they need a full rebuild_ratings().
+    """
+    keys = sorted({deck_key(n) for n in deck_names if n})
+    if not keys:
+        return {}
+    counts = await _rebuild(
+        {"players.deck_key": {"$in": keys}},
+        {"kind": "deck", "key": {"$in": keys}},
+        keep=lambda kind, key: kind == "deck" and key in keys,
+    )
+    counts["deck_names"] = await rebuild_deck_names(keys)
+    counts["monthly_summaries"] = await _refreeze(
+        await monthly_summaries.distinct("month", {"deck_key": {"$in": keys}})
+    )
+    return counts
+
+
+# ---------- monthly archive ----------
+
+async def archive_boundary() -> Optional[datetime]:
+    """First month not frozen yet (everything before it is in monthly_summaries), or None."""
+    doc = await archive_months.find_one({}, sort=[("_id", -1)])
+    return next_month(doc["_id"]) if doc else None
+
+
+async def freeze_month(month: datetime) -> int:
+    """(Re)compact one month of individual_results into monthly_summaries. Returns rows written."""
+    month = month_floor(month)
+    rows = await individual_results.aggregate(freeze_pipeline(month)).to_list(length=None)
+    n = await _replace(monthly_summaries, {"month": month}, rows)
+    await archive_months.update_one(
+        {"_id": month}, {"$set": {"frozen_at": datetime.now(timezone.utc), "rows": n}}, upsert=True
+    )
+    return n
+
+
+async def _refreeze(months: Iterable[datetime]) -> int:
+    months = sorted({month_floor(m) for m in months})
+    n = 0
+    for m in months:
+        n += await freeze_month(m)
+    if months:
+        invalidate_results()
+    return n
+
+
+async def freeze_closed_months(now: Optional[datetime] = None) -> int:
+    """
+    Freeze every closed month past the boundary, oldest first, so frozen months
+    stay contiguous. Returns the number of months frozen.
+    """
+    boundary = await archive_boundary()
+    if boundary is None:
+        first = await individual_results.find_one({}, {"date": 1}, sort=[("date", 1)])
+        if not first:
+            return 0
+        boundary = first["date"]
+    months = months_between(boundary, now or datetime.now(timezone.utc))
+    for m in months:
+        await freeze_month(m)
+    if months:
+        invalidate_results()
+    return len(months)
+
+
+async def refreeze_dates(dates: Iterable[datetime]) -> int:
+    """Re-compact the frozen months containing `dates` (edits, deletes, back-dated logs). Returns rows written."""
+    dates = list(dates)
+    boundary = await archive_boundary() if dates else None
+    if boundary is None:
+        return 0
+    return await _refreeze(m for m in map(month_floor, dates) if m < boundary)
+
+
+async def archive_rows(match: Dict[str, Any], start: datetime, group_by: str, **kw) -> List[dict]:
+    """Ranked W/L/D per `group_by` since `start`: frozen months from the archive plus the raw head and tail."""
+    pipeline = archive_pipeline(match, start, await archive_boundary(), group_by,
+                                summaries=monthly_summaries.name, **kw)
+    return await individual_results.aggregate(pipeline).to_list(length=None)
+
+
+# ---------- seat_stats reads ----------
+
+def eras_for(postban: bool) -> List[str]:
+    return ["postban"] if postban else list(ERAS)
+
+
+async def seat_split(kind: str, key: Any, eras: Iterable[str] = ERAS) -> List[dict]:
+    """
+    Per-seat totals for one entity summed over `eras`, as rows shaped like a
+    `$group` by seat: {"_id": seat, games, wins, losses, draws}. Seats with no games are omitted.
+    """
+    acc: Dict[int, Dict[str, int]] = {}
+    async for r in seat_stats.find({"kind": kind, "key": key, "era": {"$in": list(eras)}}, {"_id": 0}):
+        row = acc.setdefault(r["seat"], {"_id": r["seat"], "games": 0, "wins": 0, "losses": 0, "draws": 0})
+        for f in ("games", "wins", "losses", "draws"):
+            row[f] += r.get(f, 0)
+    return [acc[s] for s in SEATS if acc.get(s, {}).get("games")]
+
+
+async def global_seat_split() -> Dict[str, List[dict]]:
+    """{era: seat rows} for every game logged; at most eight documents read."""
+    out: Dict[str, List[dict]] = {era: [] for era in ERAS}
+    async for r in seat_stats.find({"kind": "all"}, {"_id": 0}).sort("seat", 1):
+        if r.get("games") and r["era"] in out:
+            out[r["era"]].append({"_id": r["seat"], **{f: r.get(f, 0) for f in ("games", "wins", "losses", "draws")}})
+    return out
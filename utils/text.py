@@ -10,6 +10,10 @@ def format_deck_name(deck_name: str) -> str:
     sorted_parts = sorted(part.strip().capitalize() for part in parts)
     return "/".join(sorted_parts)
 
+def deck_key(deck_name: str) -> str:
+    """Canonical lookup key stored next to every deck name (decks, IR, matches.players)."""
+    return (deck_name or "").strip().lower()
+
 MAX_EMBED_CHARS = 4000
 MAX_MSG_CHARS = 2000
 PAGE_HEADER = "**📜 Full Game Dump:**\n"
@@ -0,0 +1,96 @@
+# utils/verification.py
+"""
+Integrity check for the denormalized match data (see utils.integrity).
+
+Streams matches and individual_results in match_id order, then decks, and
+reports every mismatch against matches. The scan is not a snapshot, so nothing
+is written from what it saw: with repair=True each flagged match is re-read and
+re-checked inside one transaction under the match write lock, and only what is
+still wrong gets fixed; a flagged deck is recounted from individual_results
+under the same lock. Repairs are skipped while a deck job is running, since its
+half-moved rows are mismatches until it finishes. Afterwards the stores derived
+from individual_results are refreshed. verify.py, /verifydata and the nightly
+run in the Admin cog call verify_data(). The report counts what the scan found
+and, separately, what was actually fixed.
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from db import decks, matches, individual_results, jobs, run_in_transaction
+from utils.integrity import Checker, pair_by_match_id
+from utils.analytics import engine as analytics
+from utils.deck_jobs import ACTIVE
+from utils.headtohead import h2h
+from utils.match_writes import recompute_deck_players, write_lock
+from utils.result_cache import invalidate as invalidate_results
+from utils.rollups import rebuild_deck_names, refreeze_dates
+
+log = logging.getLogger("ca_match_logger")
+
+
+async def _repair_match(match_id: Any) -> Optional[Checker]:
+    """Re-check one match against a fresh read and fix what is still wrong. Returns that Checker, or None if clean."""
+    async def _fix(session):
+        md = await matches.find_one({"match_id": match_id}, {"_id": 0}, session=session)
+        rows = await individual_results.find({"match_id": match_id}, {"_id": 0}, session=session).to_list(length=None)
+        fix = Checker(repair=True)
+        if not fix.check_match(match_id, md, rows):
+            return None
+        for coll in (matches, individual_results):
+            if fix.ops[coll.name]:
+                # ordered: a mismatched match's DeleteMany must run before its InsertOnes
+                await coll.bulk_write(fix.ops[coll.name], ordered=True, session=session)
+        return fix
+
+    async with write_lock:
+        return await run_in_transaction(_fix)
+
+
+async def _duplicate_deck_keys() -> list:
+    rows = await decks.aggregate([
+        {"$group": {"_id": "$deck_key", "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]).to_list(length=None)
+    return [r["_id"] for r in rows]
+
+
+async def verify_data(*, repair: bool = False) -> Dict[str, Any]:
+    """
+    Check (and optionally repair) matches / individual_results / decks.players.
+    Returns Checker.report() plus "fixed": {issue: n} for what repairs wrote
+    (empty when reporting only, or when every flagged match re-checked clean).
+    """
+    if repair and await jobs.find_one({"status": {"$in": list(ACTIVE)}}):
+        log.warning("verify: a deck job is running; reporting only")
+        repair = False
+    checker = Checker(duplicates=await _duplicate_deck_keys())
+    months: set = set()
+    fixed: Counter = Counter()
+
+    match_cur = matches.find({"match_id": {"$type": "number"}}, {"_id": 0}).sort("match_id", 1)
+    ir_cur = individual_results.find({"match_id": {"$type": "number"}}, {"_id": 0}).sort("match_id", 1)
+    async for mid, md, rows in pair_by_match_id(match_cur, ir_cur):
+        if checker.check_match(mid, md, rows) and repair:
+            fix = await _repair_match(mid)
+            if fix is not None:
+                months |= fix.months
+                fixed.update(fix.counts)
+
+    async for deck in decks.find({}, {"name": 1, "deck_key": 1, "players": 1}).sort("deck_key", 1):
+        if checker.check_deck(deck) and repair:
+            async with write_lock:
+                await recompute_deck_players([deck.get("deck_key") or deck["name"]])
+            fixed["deck_players"] += 1
+    checker.finish()
+
+    fixed = +fixed  # drop the zero counts a clean Checker contributes
+    if fixed:
+        invalidate_results()
+        analytics.invalidate()
+        h2h.invalidate()
+        await rebuild_deck_names()
+        await refreeze_dates(months)
+        log.info("verify: fixed %s", dict(fixed))
+    return {**checker.report(), "fixed": dict(fixed)}
@@ -1,3 +1,5 @@
+from typing import Any, Awaitable, Callable, Tuple
+
 import discord
 
 class PaginatorView(discord.ui.View):
@@ -36,3 +38,75 @@ class PaginatorView(discord.ui.View):
         if self.current < len(self.pages) - 1:
             self.current += 1
             await self._send(interaction)
+
+
+class LazyPaginatorView(discord.ui.View):
+    """
+    Forward-only paginator that fetches pages on demand. `fetch_page(cursor)` returns
+    (page_text, next_cursor); next_cursor None means that was the last page.
+    Visited pages are kept, so going back never refetches.
+    """
+
+    def __init__(
+        self,
+        author: discord.User,
+        fetch_page: Callable[[Any], Awaitable[Tuple[str, Any]]],
+        *,
+        total_pages: int | None = None,
+        title: str = "📜 Game Dump",
+        timeout: float = 60,
+    ):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.fetch_page = fetch_page
+        self.total_pages = total_pages
+        self.title = title
+        self.pages: list[str] = []
+        self.current = 0
+        self._cursor: Any = None
+        self._exhausted = False
+
+    def seed(self, text: str, next_cursor: Any):
+        """Install an already-fetched first page."""
+        if text:
+            self.pages.append(text)
+        self._cursor = next_cursor
+        self._exhausted = next_cursor is None
+
+    async def _load(self, index: int) -> bool:
+        while len(self.pages) <= index and not self._exhausted:
+            text, cursor = await self.fetch_page(self._cursor)
+            if text:
+                self.pages.append(text)
+            self._cursor = cursor
+            self._exhausted = cursor is None or not text
+        return index < len(self.pages)
+
+    def embed(self) -> discord.Embed:
+        total = len(self.pages) if self._exhausted else (self.total_pages or "?")
+        return discord.Embed(
+            title=f"{self.title} (Page {self.current + 1}/{total})",
+            description=self.pages[self.current] if self.pages else "_Nothing to show._",
+            color=0x00FFCC,
+        )
+
+    async def _send(self, interaction: discord.Interaction):
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message("You can't interact with this paginator.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev(self, _, interaction: discord.Interaction):
+        if self.current > 0:
+            self.current -= 1
+        await self._send(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, _, interaction: discord.Interaction):
+        if await self._load(self.current + 1):
+            self.current += 1
+        await self._send(interaction)
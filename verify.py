@@ -0,0 +1,30 @@
+# verify.py
+"""
+Integrity check for the denormalized match data; see utils.verification.
+
+    python verify.py            # report only
+    python verify.py --repair   # report and fix
+"""
+
+import asyncio
+import logging
+import sys
+
+from utils.integrity import render_report, unfixed
+from utils.verification import verify_data
+
+
+async def _main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    unknown = [a for a in argv if a != "--repair"]
+    if unknown:
+        print(f"Unknown argument(s): {', '.join(unknown)}. Usage: python verify.py [--repair]")
+        return 2
+    report = await verify_data(repair="--repair" in argv)
+    print(render_report(report))
+    # non-zero when something was wrong and left as is, so cron can alert on it
+    return 1 if unfixed(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))